@@ -54,17 +54,23 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 # Django Q
+# Tasks (blog generation) are I/O bound on LLM and image APIs, so several
+# workers share a CPU. A blog takes minutes: 'retry' must stay above 'timeout'.
+Q_TIMEOUT = int(os.environ.get('Q_TIMEOUT', '900'))
 Q_CLUSTER = {
     'name': 'pintrends',
-    'workers': 1,
+    'workers': int(os.environ.get('Q_WORKERS', '4')),
     'recycle': 500,
-    'timeout': 60,
+    'timeout': Q_TIMEOUT,
+    'retry': Q_TIMEOUT + 60,
+    'max_attempts': 1,
     'compress': True,
-    'cpu_affinity': 1,
     'save_limit': 250,
     'queue_limit': 500,
     'label': 'Django Q',
-    'orm': 'default'
+    'orm': 'default',
+    # Q_SYNC=True runs tasks inline in the request (no qcluster needed), for local development
+    'sync': os.environ.get('Q_SYNC', 'False').lower() == 'true',
 }
 
 MIDDLEWARE = [
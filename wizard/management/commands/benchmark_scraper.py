@@ -0,0 +1,52 @@
+import asyncio
+import time
+from django.core.management.base import BaseCommand
+from wizard.services.browser import PinterestBrowser
+
+
+class Command(BaseCommand):
+    help = 'Times scrape page loads with and without a resource blocking profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='https://www.pinterest.com/search/pins/?q=fall%20outfits&rs=typed')
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument('--profile', default='scrape', help='Profile name from BLOCK_PROFILES')
+
+    def handle(self, *args, **options):
+        url = options['url']
+        runs = options['runs']
+
+        results = {}
+        for profile in (None, options['profile']):
+            label = profile or 'none'
+            self.stdout.write(f"Profile '{label}': {runs} runs against {url}")
+            results[label] = asyncio.run(self._measure(url, runs, profile))
+
+        self.stdout.write("")
+        self.stdout.write(f"{'profile':<10} {'avg s':>8} {'min s':>8} {'requests':>9} {'blocked':>8}")
+        for label, timings in results.items():
+            if not timings:
+                self.stdout.write(self.style.ERROR(f"{label:<10} no successful runs"))
+                continue
+            seconds = [t['seconds'] for t in timings]
+            requests = sum(t['requests'] for t in timings) / len(timings)
+            blocked = sum(t['blocked'] for t in timings) / len(timings)
+            self.stdout.write(
+                f"{label:<10} {sum(seconds) / len(seconds):>8.2f} {min(seconds):>8.2f} {requests:>9.0f} {blocked:>8.0f}"
+            )
+
+    async def _measure(self, url, runs, profile):
+        timings = []
+        for i in range(runs):
+            browser = PinterestBrowser(headless=True, block_profile=profile)
+            try:
+                await browser.start()
+                started = time.perf_counter()
+                # 'load' waits for subresources, which is exactly what blocking saves
+                await browser.page.goto(url, wait_until="load")
+                timings.append(browser.record_timing(url, started))
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"  run {i + 1} failed: {e}"))
+            finally:
+                await browser.close()
+        return timings
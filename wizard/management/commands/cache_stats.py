@@ -0,0 +1,37 @@
+from django.db.models import Count, Sum
+from django.core.management.base import BaseCommand
+from wizard.models import CacheEntry
+from wizard.services.image_cache import ImageCache
+
+
+class Command(BaseCommand):
+    help = 'Shows entries and stored hit/miss counts per cache namespace and for the image cache, optionally clearing one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', metavar='NAMESPACE', help="Delete every entry in a namespace (e.g. 'llm')")
+        parser.add_argument('--evict-images', action='store_true', help="Drop expired and over-limit image cache entries")
+
+    def handle(self, *args, **options):
+        namespace = options['clear']
+        if namespace:
+            deleted, _ = CacheEntry.objects.filter(namespace=namespace).delete()
+            self.stdout.write(self.style.SUCCESS(f"Cleared {deleted} entries from '{namespace}'"))
+
+        image_cache = ImageCache()
+        if options['evict_images']:
+            self.stdout.write(self.style.SUCCESS(f"Evicted {image_cache.evict()} image cache entries"))
+
+        rows = CacheEntry.objects.values('namespace').annotate(
+            entries=Count('id'), hits=Sum('hit_count'), misses=Sum('miss_count')
+        ).order_by('namespace')
+        if not rows:
+            self.stdout.write("Cache is empty")
+        else:
+            self.stdout.write(f"{'namespace':<15} {'entries':>8} {'hits':>8} {'misses':>8} {'hit rate':>9}")
+            for row in rows:
+                hits, misses = row['hits'] or 0, row['misses'] or 0
+                rate = hits / (hits + misses) if hits + misses else 0.0
+                self.stdout.write(f"{row['namespace']:<15} {row['entries']:>8} {hits:>8} {misses:>8} {rate:>9.0%}")
+
+        images = image_cache.stats()
+        self.stdout.write(f"Image cache: {images['entries']} images, {images['saved_generations']} generations saved")
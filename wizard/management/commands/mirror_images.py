@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from wizard.tasks import mirror_pending_images
+
+
+class Command(BaseCommand):
+    help = "Copies stored generated images still on Fal's CDN to R2 and updates their URLs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=200, help='Most images to copy in this run')
+
+    def handle(self, *args, **options):
+        count = mirror_pending_images(options['limit'])
+        self.stdout.write(self.style.SUCCESS(f"Mirrored {count} image(s) to R2"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from wizard.tasks import poll_image_jobs
+
+
+class Command(BaseCommand):
+    help = 'Polls unresolved Fal image jobs and applies finished images to their pins'
+
+    def handle(self, *args, **options):
+        counts = poll_image_jobs()
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['completed']} completed, {counts['failed']} failed, {counts['pending']} still pending"
+        ))
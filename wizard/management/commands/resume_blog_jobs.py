@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from wizard.tasks import advance_blog_jobs
+
+
+class Command(BaseCommand):
+    help = 'Advances unfinished bulk blog jobs, e.g. after a worker crash'
+
+    def handle(self, *args, **options):
+        count = advance_blog_jobs()
+        self.stdout.write(self.style.SUCCESS(f"Advanced {count} unfinished blog job(s)"))
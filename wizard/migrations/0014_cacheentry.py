@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wizard', '0013_automationlog_mediaasset_pinterestaccount_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('namespace', models.CharField(max_length=50)),
+                ('key', models.CharField(max_length=64)),
+                ('params', models.JSONField(blank=True, default=dict, help_text='Normalized parameters the key was built from')),
+                ('value', models.JSONField(blank=True, null=True)),
+                ('hit_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_accessed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['namespace', 'last_accessed_at'], name='wizard_cach_namespa_fa09a6_idx')],
+                'unique_together': {('namespace', 'key')},
+            },
+        ),
+    ]
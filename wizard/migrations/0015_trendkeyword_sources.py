@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wizard', '0014_cacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trendkeyword',
+            name='sources',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wizard', '0015_trendkeyword_sources'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('queries', models.JSONField(blank=True, default=list, help_text='Trends queries this scrape covered')),
+                ('keyword_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trend_snapshots', to='wizard.project')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendSnapshotEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(max_length=255)),
+                ('rank', models.IntegerField()),
+                ('score', models.IntegerField(default=0)),
+                ('volume', models.CharField(blank=True, max_length=50)),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='wizard.trendsnapshot')),
+            ],
+            options={
+                'ordering': ['rank'],
+                'indexes': [models.Index(fields=['keyword'], name='wizard_tren_keyword_6ea467_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wizard', '0016_trend_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KeywordMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(max_length=255)),
+                ('country', models.CharField(default='US', max_length=20)),
+                ('dates', models.BinaryField(default=bytes)),
+                ('values', models.BinaryField(default=bytes)),
+                ('forecast', models.JSONField(blank=True, default=dict, help_text='API prediction: dates, values, upper, lower')),
+                ('last_date', models.DateField(blank=True, null=True)),
+                ('fetched_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('keyword', 'country')},
+            },
+        ),
+    ]
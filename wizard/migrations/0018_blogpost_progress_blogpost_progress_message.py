@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wizard', '0017_keywordmetrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='progress_message',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+    ]
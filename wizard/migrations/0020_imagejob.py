@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wizard', '0019_blogpost_updated_at_bloggenerationjob_blogpost_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('application', models.CharField(default='fal-ai/nano-banana', max_length=100)),
+                ('request_id', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('prompt', models.TextField()),
+                ('aspect_ratio', models.CharField(default='2:3', max_length=10)),
+                ('status_url', models.URLField(blank=True, max_length=1024)),
+                ('response_url', models.URLField(blank=True, max_length=1024)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('submitted', 'Submitted'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('image_url', models.CharField(blank=True, max_length=1024)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('pin', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='image_jobs', to='wizard.pinidea')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='image_jobs', to='wizard.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='wizard_imag_status_7e9b89_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wizard', '0020_imagejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaasset',
+            name='aspect_ratio',
+            field=models.CharField(blank=True, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='mediaasset',
+            name='last_used_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mediaasset',
+            name='model',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='mediaasset',
+            name='prompt_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='mediaasset',
+            name='reuse_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='mediaasset',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='media_assets', to='wizard.project'),
+        ),
+    ]
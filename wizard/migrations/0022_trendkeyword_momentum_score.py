@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wizard', '0021_mediaasset_aspect_ratio_mediaasset_last_used_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trendkeyword',
+            name='momentum_score',
+            field=models.IntegerField(blank=True, help_text='0-100 Trends momentum; null until scored', null=True),
+        ),
+    ]
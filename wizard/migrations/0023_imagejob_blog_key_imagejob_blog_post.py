@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wizard', '0022_trendkeyword_momentum_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagejob',
+            name='blog_key',
+            field=models.CharField(blank=True, help_text="'thumbnail' or 'item_<i>' for section i", max_length=20),
+        ),
+        migrations.AddField(
+            model_name='imagejob',
+            name='blog_post',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='image_jobs', to='wizard.blogpost'),
+        ),
+    ]
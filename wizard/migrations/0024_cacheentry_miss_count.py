@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wizard', '0023_imagejob_blog_key_imagejob_blog_post'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cacheentry',
+            name='miss_count',
+            field=models.IntegerField(default=0),
+        ),
+    ]
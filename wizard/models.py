@@ -73,14 +73,44 @@ class TrendKeyword(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='trends')
     keyword = models.CharField(max_length=255)
     trend_score = models.IntegerField(default=0)
+    momentum_score = models.IntegerField(null=True, blank=True, help_text="0-100 Trends momentum; null until scored")
     selected = models.BooleanField(default=False)
     
     # Metadata from scrape (optional)
     volume = models.CharField(max_length=50, blank=True)
+    # Trends queries ({country, preset}) this keyword appeared in
+    sources = models.JSONField(default=list, blank=True)
     
     def __str__(self):
         return f"{self.keyword} ({self.project.name})"
 
+class TrendSnapshot(models.Model):
+    """One Trends scrape for a project; entries keep each keyword's rank at that time."""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='trend_snapshots')
+    queries = models.JSONField(default=list, blank=True, help_text="Trends queries this scrape covered")
+    keyword_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.project.name} snapshot {self.created_at:%Y-%m-%d %H:%M}"
+
+class TrendSnapshotEntry(models.Model):
+    snapshot = models.ForeignKey(TrendSnapshot, on_delete=models.CASCADE, related_name='entries')
+    keyword = models.CharField(max_length=255)
+    rank = models.IntegerField()  # 1-based position in the scrape
+    score = models.IntegerField(default=0)
+    volume = models.CharField(max_length=50, blank=True)
+
+    class Meta:
+        ordering = ['rank']
+        indexes = [models.Index(fields=['keyword'])]
+
+    def __str__(self):
+        return f"#{self.rank} {self.keyword}"
+
 class Suggestion(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='suggestions')
     base_keyword = models.CharField(max_length=255) # The trend keyword this came from
@@ -173,10 +203,37 @@ class PinIdea(models.Model):
     def is_posted(self):
         return self.status == 'posted'
 
+class BlogGenerationJob(models.Model):
+    """A project-wide "generate blogs for all article ideas" run, see services/blog_batch.py."""
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='blog_jobs')
+    article_ids = models.JSONField(default=list, help_text="Article ideas this job generates, in order")
+    skipped = models.IntegerField(default=0)  # already had a blog (or one in flight) when the job started
+    status = models.CharField(
+        max_length=20,
+        default='queued',
+        choices=[
+            ('queued', 'Queued'),
+            ('running', 'Running'),
+            ('completed', 'Completed'),
+            ('failed', 'Failed')
+        ]
+    )
+    error_message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Blog job {self.id} ({self.project.name}): {self.status}"
+
 class BlogPost(models.Model):
     """Represents a complete AI-generated blog post with images."""
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='blog_posts')
     article_idea = models.ForeignKey(ArticleIdea, on_delete=models.CASCADE, related_name='blog_posts')
+    job = models.ForeignKey(BlogGenerationJob, on_delete=models.SET_NULL, null=True, blank=True, related_name='blog_posts')
     
     # Content
     topic = models.CharField(max_length=500)  # From article title
@@ -193,6 +250,7 @@ class BlogPost(models.Model):
     
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # heartbeat while generating
     generation_status = models.CharField(
         max_length=20, 
         default='pending',
@@ -203,6 +261,9 @@ class BlogPost(models.Model):
             ('failed', 'Failed')
         ]
     )
+    # Set by the background generation task while status is pending/generating
+    progress = models.PositiveSmallIntegerField(default=0)  # 0-100
+    progress_message = models.CharField(max_length=200, blank=True)
     error_message = models.TextField(blank=True)
     is_selected = models.BooleanField(default=False)
     slug = models.SlugField(max_length=500, blank=True, null=True)
@@ -230,6 +291,44 @@ class BlogSection(models.Model):
     def __str__(self):
         return f"{self.order}. {self.title}"
 
+class ImageJob(models.Model):
+    """
+    One image request on the Fal queue, see services/fal_jobs.py. Submitted
+    without waiting and resolved by the Fal webhook or by polling; the result
+    is then applied to `pin`, or to `blog_post`'s thumbnail or section.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, blank=True, related_name='image_jobs')
+    pin = models.ForeignKey(PinIdea, on_delete=models.SET_NULL, null=True, blank=True, related_name='image_jobs')
+    blog_post = models.ForeignKey(BlogPost, on_delete=models.SET_NULL, null=True, blank=True, related_name='image_jobs')
+    blog_key = models.CharField(max_length=20, blank=True, help_text="'thumbnail' or 'item_<i>' for section i")
+    application = models.CharField(max_length=100, default='fal-ai/nano-banana')
+    request_id = models.CharField(max_length=100, blank=True, db_index=True)
+    prompt = models.TextField()
+    aspect_ratio = models.CharField(max_length=10, default='2:3')
+    status_url = models.URLField(max_length=1024, blank=True)
+    response_url = models.URLField(max_length=1024, blank=True)
+    status = models.CharField(
+        max_length=20,
+        default='pending',
+        choices=[
+            ('pending', 'Pending'),  # created, not accepted by Fal yet
+            ('submitted', 'Submitted'),
+            ('completed', 'Completed'),
+            ('failed', 'Failed')
+        ]
+    )
+    image_url = models.CharField(max_length=1024, blank=True)
+    error_message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"Image job {self.id} ({self.request_id or 'unsubmitted'}): {self.status}"
+
 # --- NEW MODELS FOR ENHANCED ARCHITECTURE ---
 
 class PinterestAccount(models.Model):
@@ -256,8 +355,11 @@ class PinterestBoard(models.Model):
         return f"{self.name} ({self.account.email})"
 
 class MediaAsset(models.Model):
-    """Centralized storage for AI generated and uploaded images."""
-    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='media_assets')
+    """
+    Centralized storage for AI generated and uploaded images. Generated images
+    with a prompt_hash double as the image cache (services/image_cache.py).
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, null=True, blank=True, related_name='media_assets')
     image_file = models.ImageField(upload_to='media_assets/%Y/%m/%d/', blank=True, null=True)
     remote_url = models.URLField(max_length=1024, blank=True)
     prompt = models.TextField(blank=True)
@@ -273,7 +375,13 @@ class MediaAsset(models.Model):
         default='external'
     )
     is_vertical = models.BooleanField(default=True, help_text="True for Pins, False for Blogs")
+    # Image cache: sha256 of (model, prompt, aspect ratio, output format)
+    prompt_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    model = models.CharField(max_length=100, blank=True)  # e.g. 'fal-ai/nano-banana'
+    aspect_ratio = models.CharField(max_length=10, blank=True)
+    reuse_count = models.IntegerField(default=0)  # generations saved by reusing this image
     created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Asset {self.id} ({self.source})"
@@ -301,3 +409,43 @@ class AutomationLog(models.Model):
 
     def __str__(self):
         return f"[{self.status.upper()}] {self.action} at {self.timestamp}"
+
+class KeywordMetrics(models.Model):
+    """
+    Stored Trends metrics for one keyword, shared across projects.
+
+    History is kept columnar as packed arrays (day ordinals as int32,
+    normalized counts as float32) so new weeks can be appended without
+    re-downloading the year. The API's prediction is replaced on each fetch.
+    """
+    keyword = models.CharField(max_length=255)  # lowercased
+    country = models.CharField(max_length=20, default='US')
+    dates = models.BinaryField(default=bytes)  # int32 day ordinals since 1970-01-01
+    values = models.BinaryField(default=bytes)  # float32 normalized counts
+    forecast = models.JSONField(default=dict, blank=True, help_text="API prediction: dates, values, upper, lower")
+    last_date = models.DateField(null=True, blank=True)  # newest historical point
+    fetched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('keyword', 'country')
+
+    def __str__(self):
+        return f"{self.keyword} ({self.country}) to {self.last_date}"
+
+class CacheEntry(models.Model):
+    """Persistent key/value cache for expensive external calls (scrapes, LLM responses)."""
+    namespace = models.CharField(max_length=50)  # e.g. 'trends', 'suggestions'
+    key = models.CharField(max_length=64)  # sha256 of the normalized parameters
+    params = models.JSONField(default=dict, blank=True, help_text="Normalized parameters the key was built from")
+    value = models.JSONField(null=True, blank=True)
+    hit_count = models.IntegerField(default=0)  # lookups served from this entry
+    miss_count = models.IntegerField(default=0)  # times the value was fetched and stored
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('namespace', 'key')
+        indexes = [models.Index(fields=['namespace', 'last_accessed_at'])]
+
+    def __str__(self):
+        return f"{self.namespace}:{self.key[:12]}"
@@ -0,0 +1,176 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import ArticleIdea, BlogGenerationJob, BlogPost
+
+IN_FLIGHT = ('pending', 'generating')
+
+
+def stale_after() -> timedelta:
+    """A generating blog without a heartbeat for this long was interrupted (worker crash or timeout)."""
+    default = settings.Q_CLUSTER.get('retry', 960)
+    return timedelta(seconds=int(os.getenv("BLOG_STALE_SECONDS", default)))
+
+
+class BlogBatchService:
+    """
+    Generates blogs for every article idea of a project as one resumable job.
+
+    All state lives in the database: BlogGenerationJob holds the articles to
+    generate and each BlogPost its own status, so nothing is lost when a
+    worker dies. advance() tops the job up to `concurrency` blogs in flight by
+    enqueuing wizard.tasks.generate_blog; every finished blog calls it again,
+    and so does the status endpoint, so an interrupted job picks up where it
+    stopped. Provider calls are additionally capped per process through
+    rate_limit.get_concurrency_limit.
+    """
+
+    def __init__(self, project, concurrency: int = None):
+        self.project = project
+        self.concurrency = concurrency or int(os.getenv("BULK_BLOG_CONCURRENCY", "3"))
+
+    @staticmethod
+    def _latest_blogs(article_ids) -> dict:
+        """{article_id: most recent BlogPost} for the given articles."""
+        latest = {}
+        for blog in BlogPost.objects.filter(article_idea_id__in=article_ids).order_by('id'):
+            latest[blog.article_idea_id] = blog
+        return latest
+
+    @staticmethod
+    def _is_stale(blog) -> bool:
+        # Only a running task heartbeats; a 'pending' blog may just be waiting
+        # in the queue behind busy workers, and its task will still run
+        return blog.generation_status == 'generating' and blog.updated_at < timezone.now() - stale_after()
+
+    def start(self) -> BlogGenerationJob:
+        """
+        Returns the project's unfinished job (advancing it, in case it was
+        interrupted) or creates a new one for every article without a
+        completed or in-flight blog.
+        """
+        job = BlogGenerationJob.objects.filter(project=self.project, status__in=('queued', 'running')).first()
+        if job:
+            self.advance(job.id)
+            return job
+
+        article_ids = list(ArticleIdea.objects.filter(project=self.project).order_by('id').values_list('id', flat=True))
+        latest = self._latest_blogs(article_ids)
+        todo = []
+        for article_id in article_ids:
+            blog = latest.get(article_id)
+            if blog is None or blog.generation_status == 'failed' or self._is_stale(blog):
+                todo.append(article_id)
+
+        job = BlogGenerationJob.objects.create(
+            project=self.project,
+            article_ids=todo,
+            skipped=len(article_ids) - len(todo),
+        )
+        self.advance(job.id)
+        job.refresh_from_db()
+        return job
+
+    def advance(self, job_id: int):
+        """Enqueues the next blogs of a job up to the concurrency cap, or finishes the job."""
+        from django_q.tasks import async_task
+
+        to_enqueue = []
+        with transaction.atomic():
+            job = BlogGenerationJob.objects.select_for_update().get(pk=job_id)
+            if job.status not in ('queued', 'running'):
+                return
+
+            latest = self._latest_blogs(job.article_ids)
+            in_flight, waiting, todo = 0, 0, []
+            for article_id in job.article_ids:
+                blog = latest.get(article_id)
+                owned = blog is not None and blog.job_id == job.id
+
+                if blog is None:
+                    todo.append((article_id, None))
+                elif blog.generation_status in IN_FLIGHT:
+                    if not self._is_stale(blog):
+                        if owned:
+                            in_flight += 1
+                        else:
+                            waiting += 1  # someone else is generating it; don't duplicate
+                    elif owned:
+                        # Interrupted mid-run; reported as failed, a new job retries it
+                        blog.generation_status = 'failed'
+                        blog.error_message = "Interrupted before finishing"
+                        blog.save(update_fields=['generation_status', 'error_message', 'updated_at'])
+                    else:
+                        todo.append((article_id, blog))
+                elif blog.generation_status == 'failed' and not owned:
+                    todo.append((article_id, blog))
+
+            if not job.started_at:
+                job.started_at = timezone.now()
+            job.status = 'running'
+
+            for article_id, blog in todo[:max(0, self.concurrency - in_flight)]:
+                if blog is None:
+                    article = ArticleIdea.objects.get(pk=article_id)
+                    blog = BlogPost(project=job.project, article_idea=article, topic=article.title,
+                                    intro="", conclusion="")
+                blog.job = job
+                blog.generation_status = 'pending'
+                blog.progress = 0
+                blog.progress_message = "Queued..."
+                blog.error_message = ""
+                blog.save()
+                to_enqueue.append(blog.id)
+
+            if not to_enqueue and in_flight == 0 and waiting == 0 and not todo:
+                job.status = 'completed'
+                job.finished_at = timezone.now()
+            job.save()
+
+        # After commit, so workers (or sync mode) see the rows and the job lock is released
+        for blog_id in to_enqueue:
+            async_task('wizard.tasks.generate_blog', blog_id, False,
+                       task_name=f'blog-{blog_id}', group=f'blog-job-{job_id}')
+
+    @staticmethod
+    def summary(job: BlogGenerationJob) -> dict:
+        """Aggregate progress and ETA for a job."""
+        latest = BlogBatchService._latest_blogs(job.article_ids)
+        counts = {'completed': 0, 'failed': 0, 'generating': 0, 'queued': 0}
+        progress_units = 0
+        for article_id in job.article_ids:
+            blog = latest.get(article_id)
+            # A blog from another request counts by its own status, unless advance() will redo it
+            redo = blog is not None and blog.job_id != job.id and (
+                blog.generation_status == 'failed' or BlogBatchService._is_stale(blog))
+            if blog is None or redo:
+                counts['queued'] += 1
+            elif blog.generation_status in ('completed', 'failed'):
+                counts[blog.generation_status] += 1
+                progress_units += 100
+            elif blog.generation_status == 'generating':
+                counts['generating'] += 1
+                progress_units += blog.progress
+            else:
+                counts['queued'] += 1
+
+        total = len(job.article_ids)
+        fraction = progress_units / (100 * total) if total else 1.0
+        eta_seconds = None
+        if job.status in ('queued', 'running') and job.started_at and fraction > 0:
+            elapsed = (timezone.now() - job.started_at).total_seconds()
+            eta_seconds = int(elapsed * (1 - fraction) / fraction)
+
+        return {
+            'id': job.id,
+            'status': job.status,
+            'total': total,
+            'skipped': job.skipped,
+            **counts,
+            'percent': int(fraction * 100),
+            'eta_seconds': eta_seconds,
+        }
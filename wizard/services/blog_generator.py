@@ -2,13 +2,19 @@ import os
 import json
 import re
 import uuid
+import time
+import threading
 import random
-from typing import List, Dict, Tuple
+from queue import Queue, Empty
+from typing import Iterator, List, Dict, Tuple
 from io import BytesIO
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from pathlib import Path
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from .fal_jobs import FalJobService
+from .llm_cache import LLMCache
+from .rate_limit import get_concurrency_limit, get_rate_limiter
 
 # Load env from root
 env_path = Path(__file__).resolve().parent.parent.parent / '.env'
@@ -422,20 +428,156 @@ OUTPUT FORMAT:
 '''
 
 
+# Section markers in the blog content format
+INTRO_MARKER = "---INTRO---"
+IDEAS_MARKER = "---IDEAS---"
+CONCLUSION_MARKER = "---CONCLUSION---"
+
+ITEM_PATTERN = re.compile(r'^(\d+)[.):\-\s]+(.+)$')
+
+
+class BlogStreamParser:
+    """
+    Incremental parser for the ---INTRO--- / ---IDEAS--- / ---CONCLUSION---
+    blog format, producing the same result as parse_blog_content.
+    
+    feed() takes text chunks as they stream in and returns the events
+    completed so far: ('intro', str), ('item', {'title', 'description'}) and
+    ('conclusion', str). An item is complete once the next one starts, so
+    item N is emitted while item N+1 is still being written. close() flushes
+    whatever is left.
+    """
+    
+    def __init__(self):
+        self.state = 'intro'  # intro -> ideas -> conclusion -> done
+        self.buffer = ""
+        self.current_item = None
+        self.current_description = []
+        self.intro = ""
+        self.items = []
+        self.conclusion = ""
+    
+    def feed(self, text: str) -> List[tuple]:
+        self.buffer += text
+        events = []
+        
+        if self.state == 'intro':
+            end = self.buffer.find(IDEAS_MARKER)
+            if end == -1:
+                return events
+            events.append(self._finish_intro(self.buffer[:end]))
+            self.buffer = self.buffer[end + len(IDEAS_MARKER):]
+            self.state = 'ideas'
+        
+        if self.state == 'ideas':
+            ends = [i for i in (self.buffer.find(CONCLUSION_MARKER), self.buffer.find(IDEAS_MARKER)) if i != -1]
+            if ends:
+                end = min(ends)
+                events += self._ideas_lines(self.buffer[:end])
+                events += self._flush_item()
+                if self.buffer.startswith(CONCLUSION_MARKER, end):
+                    self.buffer = self.buffer[end + len(CONCLUSION_MARKER):]
+                    self.state = 'conclusion'
+                else:
+                    # A second ---IDEAS--- ends the content, as in parse_blog_content
+                    self.buffer = ""
+                    self.state = 'done'
+            else:
+                # Only whole lines; the last one may still be growing (or be a partial marker)
+                complete, _, self.buffer = self.buffer.rpartition('\n')
+                events += self._ideas_lines(complete)
+        
+        if self.state == 'conclusion':
+            end = self.buffer.find(IDEAS_MARKER)
+            if end != -1:
+                events.append(self._finish_conclusion(self.buffer[:end]))
+                self.buffer = ""
+                self.state = 'done'
+        
+        return events
+    
+    def close(self) -> List[tuple]:
+        events = []
+        if self.state == 'intro':
+            events.append(self._finish_intro(self.buffer))
+        elif self.state == 'ideas':
+            events += self._ideas_lines(self.buffer)
+            events += self._flush_item()
+        elif self.state == 'conclusion':
+            events.append(self._finish_conclusion(self.buffer))
+        self.buffer = ""
+        self.state = 'done'
+        return events
+    
+    def _finish_intro(self, section: str) -> tuple:
+        if INTRO_MARKER in section:
+            self.intro = section.split(INTRO_MARKER)[1].strip()
+        else:
+            self.intro = section.strip()
+        return ('intro', self.intro)
+    
+    def _finish_conclusion(self, section: str) -> tuple:
+        self.conclusion = section.strip()
+        return ('conclusion', self.conclusion)
+    
+    def _ideas_lines(self, text: str) -> List[tuple]:
+        events = []
+        for line in text.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            
+            match = ITEM_PATTERN.match(line)
+            if match:
+                events += self._flush_item()
+                self.current_item = match.group(2).strip()
+                self.current_description = []
+            elif self.current_item:
+                self.current_description.append(line)
+        return events
+    
+    def _flush_item(self) -> List[tuple]:
+        if not self.current_item:
+            return []
+        item = {
+            'title': self.current_item,
+            'description': ' '.join(self.current_description).strip()
+        }
+        self.items.append(item)
+        self.current_item = None
+        self.current_description = []
+        return [('item', item)]
+
+
 class BlogGeneratorService:
     """
     AI-powered blog generation service using exact BLOG_GEN prompts and configuration.
     Generates complete blogs with AI-generated images using multiple AI providers.
     """
     
-    def __init__(self):
+    def __init__(self, bypass_cache: bool = False, force_new_images: bool = False):
         # API Keys
         self.gemini_key = os.getenv("GEMINI_API_KEY")
         self.together_key = os.getenv("TOGETHER_API_KEY")
-        self.fal_key = os.getenv("FAL_KEY")
         
         # Initialize clients
         self._init_clients()
+        
+        # LLM response cache; bypass_cache forces fresh responses (regenerations)
+        self.llm_cache = LLMCache(bypass=bypass_cache)
+        # Generated images reused for identical prompts (see ImageCache) unless force_new_images
+        self.force_new_images = force_new_images
+        
+        # Image prompts requested at once (Together/Qwen) by generate_blog_streamed
+        self.prompt_concurrency = int(os.getenv("IMAGE_PROMPT_CONCURRENCY", "6"))
+        # Fal image jobs in flight at once per blog, and seconds without any finished job before giving up
+        self.image_concurrency = int(os.getenv("IMAGE_GEN_CONCURRENCY", "4"))
+        self.image_timeout = int(os.getenv("IMAGE_GEN_TIMEOUT", "90"))
+        # Pins worked on at once (prompt then image each); provider caps still apply
+        self.pin_concurrency = int(os.getenv("PIN_IMAGE_CONCURRENCY", "8"))
+    
+    def cache_stats(self) -> dict:
+        return self.llm_cache.stats()
     
     def _init_clients(self):
         """Initialize AI service clients."""
@@ -460,149 +602,136 @@ class BlogGeneratorService:
                 self.together_client = None
         else:
             self.together_client = None
-        
-        # Fal client for image generation
-        if self.fal_key:
-            try:
-                import fal_client
-                os.environ["FAL_KEY"] = self.fal_key  # Fal uses env var
-                self.fal_available = True
-            except Exception as e:
-                print(f"Failed to initialize Fal client: {e}")
-                self.fal_available = False
-        else:
-            self.fal_available = False
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((Exception,))
-    )
-    def generate_blog_content(self, topic: str) -> str:
+    def stream_blog_content(self, topic: str) -> Iterator[str]:
         """
-        Generate blog content using Google Gemini - exact BLOG_GEN implementation.
-        Returns formatted blog content with ---INTRO---, ---IDEAS---, ---CONCLUSION---.
+        Yield blog text chunks as Gemini writes them - exact BLOG_GEN prompt.
+        A cached response comes back as a single chunk; a fresh one is
+        validated and cached once the stream ends.
         """
         if not self.gemini_client:
             raise Exception("Gemini API key not configured. Please set GEMINI_API_KEY in .env file.")
         
+        # Use gemini-2.0-flash-exp which has available quota
+        # (gemini-3-pro-preview quota exceeded)
+        model = 'gemini-3-flash-preview'
+        cache_params = LLMCache.params("gemini", model, "blog_content", {"topic": topic})
+        cached = self.llm_cache.lookup(cache_params)
+        if cached is not None:
+            yield cached
+            return
+        
         from google.genai import types
         
         formatted_system_prompt = BLOG_SYSTEM_PROMPT.replace("{topic}", topic)
         user_prompt = f"topic: {topic}"
         
-        try:
-            # Gemini 3 Pro supports system role in contents
-            contents = [
-                types.Content(
-                    role="system",
-                    parts=[
-                        types.Part.from_text(text=formatted_system_prompt),
-                    ],
-                ),
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_text(text=user_prompt),
-                    ],
-                ),
-            ]
-            
-            generate_content_config = types.GenerateContentConfig()
-            
+        # Gemini 3 Pro supports system role in contents
+        contents = [
+            types.Content(
+                role="system",
+                parts=[
+                    types.Part.from_text(text=formatted_system_prompt),
+                ],
+            ),
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part.from_text(text=user_prompt),
+                ],
+            ),
+        ]
+        
+        generate_content_config = types.GenerateContentConfig()
+        
+        full_text_parts = []
+        with get_concurrency_limit("gemini"):
             print("\n📝 Generating blog content with Gemini Flash...")
-            
-            # Use gemini-2.0-flash-exp which has available quota
-            # (gemini-3-pro-preview quota exceeded)
-            full_text_parts = []
             for chunk in self.gemini_client.models.generate_content_stream(
-                model='gemini-3-flash-preview',
+                model=model,
                 contents=contents,
                 config=generate_content_config,
             ):
                 if chunk.text:
                     full_text_parts.append(chunk.text)
-            
-            full_text = ''.join(full_text_parts)
-            
-            if not full_text or len(full_text) < 100:
-                raise ValueError(f"Generated content too short ({len(full_text)} chars)")
-            
-            return full_text
-            
+                    yield chunk.text
+        
+        full_text = ''.join(full_text_parts)
+        
+        if not full_text or len(full_text) < 100:
+            raise ValueError(f"Generated content too short ({len(full_text)} chars)")
+        
+        self.llm_cache.store(cache_params, full_text)
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_exception_type((Exception,))
+    )
+    def generate_blog_content(self, topic: str) -> str:
+        """
+        Generate blog content using Google Gemini - exact BLOG_GEN implementation.
+        Returns formatted blog content with ---INTRO---, ---IDEAS---, ---CONCLUSION---.
+        """
+        try:
+            return ''.join(self.stream_blog_content(topic))
         except Exception as e:
             print(f"Blog generation error: {e}")
             raise
     
+    def stream_blog_events(self, topic: str, attempts: int = 3) -> Iterator[tuple]:
+        """
+        Yield BlogStreamParser events ('intro', 'item', 'conclusion') while
+        the blog content is still streaming. Failures before the first event
+        are retried with backoff; once events have been handed out the error
+        is raised, since a restarted stream would produce different sections.
+        """
+        for attempt in range(1, attempts + 1):
+            parser = BlogStreamParser()
+            emitted = False
+            try:
+                for chunk in self.stream_blog_content(topic):
+                    for event in parser.feed(chunk):
+                        emitted = True
+                        yield event
+                yield from parser.close()
+                return
+            except Exception as e:
+                print(f"Blog generation error: {e}")
+                if emitted or attempt == attempts:
+                    raise
+                time.sleep(min(2 ** attempt, 10))
+    
     def parse_blog_content(self, content: str) -> Tuple[str, List[Dict[str, str]], str]:
         """
         Parse generated blog content - exact BLOG_GEN parsing logic.
         Returns: (intro, items_list, conclusion)
         """
-        intro = ""
-        items = []
-        conclusion = ""
-        
-        # Split by main sections
-        parts = content.split("---IDEAS---")
-        
-        # Parse Intro
-        if len(parts) > 0:
-            intro_section = parts[0]
-            if "---INTRO---" in intro_section:
-                intro = intro_section.split("---INTRO---")[1].strip()
-            else:
-                intro = intro_section.strip()
-                
-        # Parse Ideas and Conclusion
-        if len(parts) > 1:
-            remaining = parts[1]
-            if "---CONCLUSION---" in remaining:
-                ideas_part, conclusion_part = remaining.split("---CONCLUSION---")
-                conclusion = conclusion_part.strip()
-            else:
-                ideas_part = remaining
-                
-            # Parse individual ideas
-            lines = ideas_part.strip().split('\n')
-            current_item = None
-            current_description = []
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                # Check for numbered item
-                match = re.match(r'^(\d+)[.):\-\s]+(.+)$', line)
-                
-                if match:
-                    # Save previous item
-                    if current_item:
-                        items.append({
-                            'title': current_item,
-                            'description': ' '.join(current_description).strip()
-                        })
-                    
-                    # Start new item
-                    current_item = match.group(2).strip()
-                    current_description = []
-                elif current_item:
-                    current_description.append(line)
-            
-            # Add last item
-            if current_item:
-                items.append({
-                    'title': current_item,
-                    'description': ' '.join(current_description).strip()
-                })
-                
-        return intro, items, conclusion
+        parser = BlogStreamParser()
+        parser.feed(content)
+        parser.close()
+        return parser.intro, parser.items, parser.conclusion
     
     @retry(
         stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        reraise=True
     )
+    def _request_image_prompt(self, model: str, system_message: str, user_message: str, sampling: dict) -> str:
+        """One Together/Qwen completion, retried on failure and rate limited per provider."""
+        get_rate_limiter("together").acquire()
+        with get_concurrency_limit("together"):
+            response = self.together_client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": user_message}
+                ],
+                **sampling,
+            )
+        generated_prompt = response.choices[0].message.content.strip()
+        return ' '.join(generated_prompt.split())
+    
     def generate_image_prompt(self, title: str, description: str, prompt_type: str = "image", blog_topic: str = None) -> str:
         """Generate AI image prompt using Together AI with Qwen model - exact BLOG_GEN implementation."""
         if not self.together_client:
@@ -639,19 +768,14 @@ Description: {description}"""
             print(f"   Main Blog Title: {dominant_title}")
             print(f"   Section Title: {section_title}")
             
-            response = self.together_client.chat.completions.create(
-                model="Qwen/Qwen3-Next-80B-A3B-Instruct", # Authentically using Qwen as per reference
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message}
-                ],
-                max_tokens=1000,
-                temperature=0.7,
-                top_p=0.9,
-            )
+            model = "Qwen/Qwen3-Next-80B-A3B-Instruct" # Authentically using Qwen as per reference
+            sampling = {"max_tokens": 1000, "temperature": 0.7, "top_p": 0.9}
             
-            generated_prompt = response.choices[0].message.content.strip()
-            generated_prompt = ' '.join(generated_prompt.split())
+            generated_prompt = self.llm_cache.cached(
+                LLMCache.params("together", model, "image_prompt",
+                                {"system": system_message, "user": user_message}, sampling),
+                lambda: self._request_image_prompt(model, system_message, user_message, sampling)
+            )
             
             print(f"✅ Generated prompt: {generated_prompt[:150]}...")
             
@@ -660,69 +784,233 @@ Description: {description}"""
             print(f"Error generating {prompt_type} prompt: {e}")
             return f"Lifestyle photography of {section_title}, professional editorial style, natural lighting"
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=3, max=15)
-    )
-    def generate_image(self, prompt: str, aspect_ratio: str = "3:4") -> str:
-        """Generate image using Fal AI with nano-banana model - exact BLOG_GEN implementation."""
-        if not self.fal_available:
-            raise Exception("FAL_KEY not configured. Please set FAL_KEY in .env file.")
+    def generate_blog_streamed(self, topic: str, on_content=None, on_ready=None, blog_post=None) -> dict:
+        """
+        Stream blog content from Gemini and pipeline the image work behind it.
         
-        try:
-            import fal_client
-            
-            # Convert aspect ratio format
-            if aspect_ratio == "2:3":
-                fal_aspect = "2:3"
-            elif aspect_ratio == "16:9":
-                fal_aspect = "16:9"
+        The thumbnail prompt starts as soon as the intro is parsed, and each
+        section's prompt as soon as that section is complete, while Gemini is
+        still writing the rest. Each image is submitted to the Fal queue as an
+        ImageJob when its prompt is ready (at most image_concurrency at once)
+        and polled from this thread, like pin images.
+        
+        Callbacks run in the calling thread, so they can write to the database:
+            on_content(kind, value): 'intro' (str), 'item' ({'title', 'description'},
+                in order) and 'conclusion' (str), as they are parsed
+            on_ready(key, prompt, image_url): once per image, keyed 'thumbnail'
+                or 'item_<i>'; image_url is "" when it failed or is still on Fal
+        
+        Jobs still on Fal after image_timeout seconds without progress are
+        left to the webhook / poll_image_jobs, which apply them to
+        `blog_post`'s thumbnail and sections once they finish.
+        
+        Returns:
+            {'intro', 'items', 'conclusion', 'images': {key: {'prompt', 'image_url'}}}
+        
+        Raises whatever the content stream raised, abandoning started image jobs.
+        """
+        results = {'intro': "", 'items': [], 'conclusion': "", 'images': {}}
+        messages = Queue()
+        prompt_pool = ThreadPoolExecutor(max_workers=max(1, self.prompt_concurrency))
+        fal = FalJobService(force_new=self.force_new_images)
+        
+        def prompt_done(key, future):
+            if future.cancelled():
+                return
+            try:
+                prompt = future.result()
+            except Exception as e:
+                print(f"✗ Error generating prompt for {key}: {e}")
+                prompt = ""
+            messages.put(('prompt', key, prompt, None))
+        
+        def produce():
+            try:
+                item_count = 0
+                for kind, value in self.stream_blog_events(topic):
+                    key, request = None, None
+                    if kind == 'intro':
+                        key = 'thumbnail'
+                        request = {'title': topic, 'description': value, 'prompt_type': 'thumbnail'}
+                    elif kind == 'item':
+                        key = f'item_{item_count}'
+                        item_count += 1
+                        request = {
+                            'title': value['title'],
+                            'description': value['description'],
+                            'prompt_type': 'image',
+                            'blog_topic': topic,
+                        }
+                    # Announce the key before its job can possibly finish
+                    messages.put(('content', kind, value, key))
+                    if key:
+                        prompt_pool.submit(self.generate_image_prompt, **request).add_done_callback(
+                            lambda f, key=key: prompt_done(key, f)
+                        )
+            except Exception as e:
+                messages.put(('error', e, None, None))
             else:
-                fal_aspect = "2:3"
-            
-            print(f"🎨 Generating Image with Fal AI (Aspect Ratio: {fal_aspect})...")
-            
-            result = fal_client.subscribe(
-                "fal-ai/nano-banana",
-                arguments={
-                    "prompt": prompt,
-                    "num_images": 1,
-                    "aspect_ratio": fal_aspect,
-                    "output_format": "png"
-                }
-            )
-            
-            if result and 'images' in result and len(result['images']) > 0:
-                image_url = result['images'][0]['url']
-                print(f"✅ Image Generated: {image_url[:80]}...")
-                return image_url
+                messages.put(('done', None, None, None))
+        
+        expected, finished = set(), set()
+        prompts = {}
+        queued = []  # keys with a prompt, waiting for a free job slot
+        jobs = {}
+        
+        def finish(key, image_url):
+            finished.add(key)
+            results['images'][key] = {'prompt': prompts.get(key, ""), 'image_url': image_url}
+            if on_ready:
+                on_ready(key, prompts.get(key, ""), image_url)
+        
+        def finish_job(job):
+            if job.status == 'completed':
+                print(f"✓ Generated image for {job.blog_key}")
             else:
-                raise Exception("No image generated")
-        except Exception as e:
-            print(f"Image generation error: {e}")
-            raise
-    
-    def generate_all_images_parallel(self, prompts: Dict[str, str]) -> Dict[str, str]:
-        """Generate all blog images in parallel."""
-        images = {}
+                print(f"✗ Error generating image for {job.blog_key}: {job.error_message}")
+            finish(job.blog_key, job.image_url if job.status == 'completed' else "")
         
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures = {}
-            
-            for key, prompt in prompts.items():
-                if prompt:
-                    aspect_ratio = "16:9" if key == 'thumbnail' else "2:3"
-                    futures[key] = executor.submit(self.generate_image, prompt, aspect_ratio)
-            
-            for key, future in futures.items():
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        
+        streaming = True
+        last_progress = last_poll = time.monotonic()
+        try:
+            while streaming or len(finished) < len(expected):
                 try:
-                    images[key] = future.result(timeout=90)
-                    print(f"✓ Generated image for {key}")
-                except Exception as e:
-                    print(f"✗ Error generating image for {key}: {e}")
-                    images[key] = ""
+                    kind, a, b, c = messages.get(timeout=fal.poll_interval if jobs else self.image_timeout)
+                    last_progress = time.monotonic()
+                except Empty:
+                    kind = None
+                
+                if kind == 'error':
+                    raise a
+                elif kind == 'done':
+                    streaming = False
+                elif kind == 'content':
+                    if c:
+                        expected.add(c)
+                    if a == 'item':
+                        results['items'].append(b)
+                    else:
+                        results[a] = b
+                    if on_content:
+                        on_content(a, b)
+                elif kind == 'prompt':
+                    prompts[a] = b
+                    if b:
+                        queued.append(a)
+                    else:
+                        finish(a, "")
+                
+                while queued and len(jobs) < self.image_concurrency:
+                    key = queued.pop(0)
+                    job = fal.submit(
+                        prompts[key],
+                        aspect_ratio="16:9" if key == 'thumbnail' else "2:3",
+                        project=blog_post.project if blog_post else None,
+                        blog_post_id=blog_post.id if blog_post else None,
+                        blog_key=key,
+                    )
+                    if job.status in ('completed', 'failed'):
+                        finish_job(job)
+                    else:
+                        jobs[job.id] = job
+                
+                if jobs and time.monotonic() - last_poll >= fal.poll_interval:
+                    last_poll = time.monotonic()
+                    for job in fal.refresh(jobs.values()):
+                        if job.status in ('completed', 'failed'):
+                            del jobs[job.id]
+                            finish_job(job)
+                            last_progress = time.monotonic()
+                
+                if time.monotonic() - last_progress >= self.image_timeout:
+                    if streaming:
+                        raise TimeoutError(f"Blog content stream stalled for {self.image_timeout}s")
+                    print(f"✗ Nothing finished in {self.image_timeout}s, giving up on {len(expected - finished)} images")
+                    for key in sorted(expected - finished):
+                        finish(key, "")
+                    break
+        finally:
+            # Don't wait on prompts abandoned after an error or timeout
+            prompt_pool.shutdown(wait=False, cancel_futures=True)
+        
+        return results
+    
+    def generate_pin_images_streamed(self, pins: List[Dict], project=None) -> Iterator[Dict]:
+        """
+        Generate prompts and images for many pins concurrently.
+        
+        Prompts run on a thread pool; each image is submitted to the Fal queue
+        as an ImageJob as soon as its prompt is ready, and the jobs are then
+        polled from this one thread. Finished jobs are applied to their pins
+        by FalJobService, including jobs that outlive this generator.
+        
+        Args:
+            pins: [{'id', 'title', 'description', 'topic'}]
         
-        return images
+        Yields:
+            One result per pin as soon as it finishes, in completion order:
+            {'id', 'prompt', 'image_url'}, {'id', 'prompt', 'error'}, or
+            {'id', 'prompt', 'pending': job_id} for images still on Fal after
+            FAL_WAIT_TIMEOUT.
+        """
+        if not pins:
+            return
+        
+        fal = FalJobService(force_new=self.force_new_images)
+        
+        def prompt_for(pin):
+            return self.generate_image_prompt(
+                title=pin['title'],
+                description=pin['description'],
+                prompt_type="pin",
+                blog_topic=pin['topic']
+            )
+        
+        def result_for(job):
+            if job.status == 'completed':
+                return {'id': job.pin_id, 'prompt': job.prompt, 'image_url': job.image_url}
+            print(f"Error generating image for pin {job.pin_id}: {job.error_message}")
+            return {'id': job.pin_id, 'prompt': job.prompt, 'error': job.error_message}
+        
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.pin_concurrency, len(pins))))
+        try:
+            prompts = {pool.submit(prompt_for, pin): pin for pin in pins}
+            jobs = {}
+            deadline = None
+            last_poll = time.monotonic()
+            while prompts or jobs:
+                if prompts:
+                    done, _ = wait(prompts, timeout=fal.poll_interval if jobs else None, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pin = prompts.pop(future)
+                        job = fal.submit(future.result(), aspect_ratio="2:3", project=project, pin_id=pin['id'])
+                        if job.status in ('completed', 'failed'):
+                            yield result_for(job)
+                        else:
+                            jobs[job.id] = job
+                    if not prompts:
+                        deadline = time.monotonic() + fal.wait_timeout
+                else:
+                    time.sleep(max(0, last_poll + fal.poll_interval - time.monotonic()))
+                
+                if jobs and time.monotonic() - last_poll >= fal.poll_interval:
+                    last_poll = time.monotonic()
+                    for job in fal.refresh(jobs.values()):
+                        if job.status in ('completed', 'failed'):
+                            del jobs[job.id]
+                            yield result_for(job)
+                
+                if jobs and deadline is not None and time.monotonic() >= deadline:
+                    # Left to the webhook / poll_image_jobs; they still update the pins
+                    for job in jobs.values():
+                        yield {'id': job.pin_id, 'prompt': job.prompt, 'pending': job.id}
+                    return
+        finally:
+            # Stops queued prompts if the consumer goes away (e.g. the client disconnected)
+            pool.shutdown(wait=False, cancel_futures=True)
     
     def download_image(self, url: str) -> BytesIO:
         """Download image from URL to BytesIO stream."""
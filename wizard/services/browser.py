@@ -1,35 +1,311 @@
 import asyncio
+import atexit
 import random
+import re
+import threading
+import time
 from playwright.async_api import async_playwright
 import os
 
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+VIEWPORT = {"width": 1280, "height": 800}
+LAUNCH_ARGS = ["--disable-blink-features=AutomationControlled"]
+
+# Route-interception profiles. Matching requests are aborted before they hit the
+# network; scrapes only read text, so images, video, fonts and trackers are dead weight.
+BLOCK_PROFILES = {
+    "scrape": {
+        "resource_types": {"image", "media", "font"},
+        "url_patterns": [
+            r"google-analytics\.com",
+            r"googletagmanager\.com",
+            r"doubleclick\.net",
+            r"facebook\.(net|com)/tr",
+            r"ct\.pinterest\.com",
+            r"/v3/callback/event",
+            r"sentry",
+            r"v1\.pinimg\.com/videos",
+        ],
+    },
+}
+
+
+# Winning selector per wait key, so the next scrape of the same page tries it first
+_selector_wins = {}
+
+
+class _PooledBrowser:
+    """Bookkeeping for one launched Chromium inside a BrowserPool."""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.uses = 0
+        self.active = 0
+        self.retired = False
+
+    @property
+    def healthy(self) -> bool:
+        return not self.retired and self.browser.is_connected()
+
+
+class BrowserPool:
+    """
+    Process-wide, size-bounded pool of warm Chromium instances.
+
+    Playwright objects are bound to the event loop that created them, while
+    `async_to_sync` gives every Django request a fresh loop. The pool therefore
+    owns a private loop on a daemon thread; scrapes are handed to it with
+    `run()`, which can be awaited from any other loop.
+
+    Each lease gets a fresh BrowserContext seeded from `auth_file`, so cookies
+    never leak between scrapes. Browsers are health-checked on every lease and
+    recycled after `max_uses` contexts.
+    """
+
+    def __init__(self, size: int = 2, max_uses: int = 25, contexts_per_browser: int = 4,
+                 headless: bool = True, auth_file: str = "auth.json"):
+        self.size = size
+        self.max_uses = max_uses
+        self.contexts_per_browser = contexts_per_browser
+        self.headless = headless
+        self.auth_file = auth_file
+
+        self._loop = None
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._playwright = None
+        self._browsers = []
+        self._launching = 0
+        self._cond = None
+        self._leases = {}
+
+    # ---------- Loop management ----------
+
+    def _ensure_loop(self):
+        with self._thread_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="browser-pool", daemon=True
+                )
+                self._thread.start()
+        return self._loop
+
+    async def run(self, coro):
+        """Runs `coro` on the pool loop and awaits its result from the caller's loop."""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        return await asyncio.wrap_future(future)
+
+    # ---------- Leasing (pool loop only) ----------
+
+    async def acquire_context(self):
+        """Leases a fresh BrowserContext. Must be awaited on the pool loop."""
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+
+        pooled = await self._acquire_browser()
+        try:
+            context = await self._new_context(pooled.browser)
+        except Exception:
+            await self._release_browser(pooled)
+            raise
+        self._leases[id(context)] = pooled
+        return context
+
+    async def release_context(self, context):
+        """Closes a leased context and hands its browser back to the pool."""
+        pooled = self._leases.pop(id(context), None)
+        try:
+            await context.close()
+        except Exception as e:
+            print(f"Error closing browser context: {e}")
+        if pooled:
+            await self._release_browser(pooled)
+
+    async def _acquire_browser(self) -> _PooledBrowser:
+        async with self._cond:
+            while True:
+                await self._prune()
+
+                # Prefer an idle browser, then grow the pool, then share a busy one
+                pooled = next((b for b in self._browsers if b.healthy and b.active == 0), None)
+                if pooled:
+                    break
+                if len(self._browsers) + self._launching < self.size:
+                    self._launching += 1
+                    break
+                open_slots = [b for b in self._browsers if b.healthy and b.active < self.contexts_per_browser]
+                if open_slots:
+                    pooled = min(open_slots, key=lambda b: b.active)
+                    break
+                await self._cond.wait()
+
+            if pooled:
+                self._checkout(pooled)
+                return pooled
+
+        try:
+            browser = await self._launch()
+        except Exception:
+            async with self._cond:
+                self._launching -= 1
+                self._cond.notify_all()
+            raise
+
+        async with self._cond:
+            self._launching -= 1
+            pooled = _PooledBrowser(browser)
+            self._browsers.append(pooled)
+            self._checkout(pooled)
+            return pooled
+
+    def _checkout(self, pooled: _PooledBrowser):
+        pooled.active += 1
+        pooled.uses += 1
+        if pooled.uses >= self.max_uses:
+            # Let in-flight leases finish, but stop handing this browser out
+            pooled.retired = True
+
+    async def _release_browser(self, pooled: _PooledBrowser):
+        async with self._cond:
+            pooled.active -= 1
+            await self._prune()
+            self._cond.notify_all()
+
+    async def _prune(self):
+        """Drops disconnected browsers and closes retired ones once idle."""
+        for pooled in list(self._browsers):
+            if not pooled.browser.is_connected() or (pooled.retired and pooled.active == 0):
+                self._browsers.remove(pooled)
+                await self._close_browser(pooled.browser)
+
+    async def _launch(self):
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        print(f"Launching pooled Chromium ({len(self._browsers) + 1}/{self.size})")
+        return await self._playwright.chromium.launch(headless=self.headless, args=LAUNCH_ARGS)
+
+    async def _new_context(self, browser):
+        if os.path.exists(self.auth_file):
+            try:
+                return await browser.new_context(
+                    storage_state=self.auth_file, viewport=VIEWPORT, user_agent=USER_AGENT
+                )
+            except Exception as e:
+                print(f"Invalid auth file {self.auth_file}, starting fresh: {e}")
+        return await browser.new_context(viewport=VIEWPORT, user_agent=USER_AGENT)
+
+    async def _close_browser(self, browser):
+        try:
+            if browser.is_connected():
+                await browser.close()
+        except Exception as e:
+            print(f"Error closing pooled browser: {e}")
+
+    # ---------- Shutdown ----------
+
+    async def _shutdown(self):
+        for pooled in self._browsers:
+            await self._close_browser(pooled.browser)
+        self._browsers = []
+        self._leases = {}
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def shutdown(self, timeout: float = 30):
+        """Closes every browser and stops the pool loop. Safe to call more than once."""
+        with self._thread_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout)
+        except Exception as e:
+            print(f"Error shutting down browser pool: {e}")
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            loop.close()
+            self._cond = None
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_browser_pool(headless: bool = True, auth_file: str = "auth.json") -> BrowserPool:
+    """Returns the process-wide pool for the given launch options, creating it on first use."""
+    key = (headless, auth_file)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = BrowserPool(
+                size=int(os.getenv("SCRAPER_POOL_SIZE", "2")),
+                max_uses=int(os.getenv("SCRAPER_POOL_MAX_USES", "25")),
+                contexts_per_browser=int(os.getenv("SCRAPER_POOL_CONTEXTS", "4")),
+                headless=headless,
+                auth_file=auth_file,
+            )
+            _pools[key] = pool
+        return pool
+
+
+@atexit.register
+def shutdown_browser_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
 class PinterestBrowser:
-    def __init__(self, headless: bool = False, auth_file: str = "auth.json"):
+    def __init__(self, headless: bool = False, auth_file: str = "auth.json", pool: BrowserPool = None,
+                 block_profile=None, jitter: tuple = None):
         self.headless = headless
         self.auth_file = auth_file
+        self.pool = pool
+        # Optional (min, max) seconds of human-like pause after navigation
+        self.jitter = jitter
+        # Name from BLOCK_PROFILES, a profile dict, or None to load everything
+        self.block_profile = BLOCK_PROFILES[block_profile] if isinstance(block_profile, str) else block_profile
+        self._block_patterns = [re.compile(p) for p in (self.block_profile or {}).get("url_patterns", [])]
         self.browser = None
         self.context = None
         self.page = None
         self.playwright = None
 
+        # Per-session request counters and navigation timings
+        self.stats = {"requests": 0, "blocked": 0}
+        self.timings = []
+
     async def start(self):
-        """Initializes the Playwright browser instance."""
+        """Initializes the Playwright browser instance, or leases a context from the pool."""
+        if self.pool:
+            self.context = await self.pool.acquire_context()
+            await self._apply_block_profile()
+            self.page = await self.context.new_page()
+            return
+
         self.playwright = await async_playwright().start()
         self.browser = await self.playwright.chromium.launch(
             headless=self.headless,
-            args=["--disable-blink-features=AutomationControlled"]
+            args=LAUNCH_ARGS
         )
-        
+
         # Ensure auth file path is absolute if needed, or relative to project
         # In Django, probably best to keep it in root or a var folder.
         # For now, we assume root.
-        
+
         try:
             if os.path.exists(self.auth_file):
                 self.context = await self.browser.new_context(
                     storage_state=self.auth_file,
-                    viewport={"width": 1280, "height": 800},
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+                    viewport=VIEWPORT,
+                    user_agent=USER_AGENT
                 )
                 print(f"Loaded auth state from {self.auth_file}")
             else:
@@ -37,19 +313,54 @@ class PinterestBrowser:
         except Exception:
             print("No auth file found or invalid, starting fresh.")
             self.context = await self.browser.new_context(
-                viewport={"width": 1280, "height": 800},
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+                viewport=VIEWPORT,
+                user_agent=USER_AGENT
             )
-        
+
+        await self._apply_block_profile()
         self.page = await self.context.new_page()
 
+    async def _apply_block_profile(self):
+        if self.block_profile:
+            await self.context.route("**/*", self._route_request)
+
+    async def _route_request(self, route):
+        request = route.request
+        self.stats["requests"] += 1
+        if request.resource_type in self.block_profile.get("resource_types", ()) or any(
+            p.search(request.url) for p in self._block_patterns
+        ):
+            self.stats["blocked"] += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def record_timing(self, url: str, started: float) -> dict:
+        """Stores how long a page took to become usable, with the request counters at that point."""
+        timing = {
+            "url": url,
+            "seconds": round(time.perf_counter() - started, 3),
+            "requests": self.stats["requests"],
+            "blocked": self.stats["blocked"],
+        }
+        self.timings.append(timing)
+        print(f"Page ready in {timing['seconds']}s ({timing['blocked']}/{timing['requests']} requests blocked)")
+        return timing
+
     async def save_state(self):
         """Saves the current browser state to file."""
         if self.context:
             await self.context.storage_state(path=self.auth_file)
 
     async def close(self):
-        """Closes the browser resources."""
+        """Closes the browser resources. Pooled browsers are returned, not closed."""
+        if self.pool:
+            if self.context:
+                await self.pool.release_context(self.context)
+            self.context = None
+            self.page = None
+            return
+
         if self.context:
             await self.context.close()
         if self.browser:
@@ -59,8 +370,53 @@ class PinterestBrowser:
 
     async def navigate(self, url: str):
         if not self.page: raise RuntimeError("Browser not started.")
+        started = time.perf_counter()
         await self.page.goto(url, wait_until="domcontentloaded")
-        await self.random_delay(2, 4)
+        self.record_timing(url, started)
+        await self.human_pause()
+
+    async def human_pause(self):
+        """Sleeps for the configured jitter window; a no-op when jitter is off."""
+        if self.jitter:
+            await self.random_delay(*self.jitter)
+
+    async def wait_for_any(self, selectors: list, timeout: float = 15, key: str = None):
+        """Races all `selectors` and returns the first one attached to the DOM, or None.
+        
+        With a `key`, the winner is remembered and preferred when several
+        selectors match in the same tick on later calls.
+        """
+        if not self.page or not selectors: return None
+
+        remembered = _selector_wins.get(key)
+        ordered = sorted(selectors, key=lambda s: s != remembered)
+        tasks = {
+            asyncio.ensure_future(
+                self.page.wait_for_selector(s, state="attached", timeout=timeout * 1000)
+            ): s
+            for s in ordered
+        }
+
+        winner = None
+        pending = set(tasks)
+        deadline = time.perf_counter() + timeout
+        try:
+            while pending and winner is None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                matched = [t for t in done if not t.cancelled() and t.exception() is None]
+                if matched:
+                    winner = min((tasks[t] for t in matched), key=ordered.index)
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        if winner and key:
+            _selector_wins[key] = winner
+        return winner
 
     async def scroll_to_bottom(self, times: int = 3):
         if not self.page: return
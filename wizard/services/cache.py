@@ -0,0 +1,86 @@
+import hashlib
+import json
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from ..models import CacheEntry
+
+
+class PersistentCache:
+    """
+    DB-backed cache with TTL expiry and least-recently-used eviction.
+
+    Entries are keyed on a hash of the normalized parameters, so equivalent
+    requests from different projects share one entry. Each entry counts the
+    lookups it served (hit_count) and the times its value had to be fetched
+    and stored (miss_count), so the stats cover every process using the
+    database.
+    """
+
+    def __init__(self, namespace: str, ttl: int = 86400, max_entries: int = 2000):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @staticmethod
+    def make_key(params: dict) -> str:
+        raw = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, params: dict):
+        """Returns the cached value for `params`, or None on a miss or expired entry."""
+        key = self.make_key(params)
+        entry = CacheEntry.objects.filter(
+            namespace=self.namespace, key=key, created_at__gte=timezone.now() - timedelta(seconds=self.ttl)
+        ).first()
+        if entry is None:
+            # An expired row is left for set() to refresh, keeping its counts
+            return None
+
+        CacheEntry.objects.filter(pk=entry.pk).update(
+            hit_count=F('hit_count') + 1, last_accessed_at=timezone.now()
+        )
+        return entry.value
+
+    def set(self, params: dict, value):
+        """
+        Stores `value` for `params` (a fetch after a miss or forced refresh),
+        evicting the least recently used entries over the limit.
+        """
+        now = timezone.now()
+        key = self.make_key(params)
+        fields = {'params': params, 'value': value, 'created_at': now, 'last_accessed_at': now}
+        entries = CacheEntry.objects.filter(namespace=self.namespace, key=key)
+        if not entries.update(miss_count=F('miss_count') + 1, **fields):
+            try:
+                with transaction.atomic():
+                    CacheEntry.objects.create(namespace=self.namespace, key=key, miss_count=1, **fields)
+            except IntegrityError:
+                # Another process stored it first
+                entries.update(miss_count=F('miss_count') + 1, **fields)
+        self._evict()
+
+    def invalidate(self, params: dict):
+        CacheEntry.objects.filter(namespace=self.namespace, key=self.make_key(params)).delete()
+
+    def _evict(self):
+        entries = CacheEntry.objects.filter(namespace=self.namespace)
+        overflow = entries.count() - self.max_entries
+        if overflow > 0:
+            stale_ids = list(entries.order_by('last_accessed_at').values_list('id', flat=True)[:overflow])
+            CacheEntry.objects.filter(id__in=stale_ids).delete()
+        entries.filter(created_at__lt=timezone.now() - timedelta(seconds=self.ttl)).delete()
+
+    def stats(self) -> dict:
+        """Hits and misses of the namespace's current entries (evicted entries take theirs along)."""
+        totals = CacheEntry.objects.filter(namespace=self.namespace).aggregate(
+            hits=Sum('hit_count'), misses=Sum('miss_count'), entries=Count('id')
+        )
+        hits, misses = totals['hits'] or 0, totals['misses'] or 0
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            'entries': totals['entries'],
+        }
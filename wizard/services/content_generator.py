@@ -1,16 +1,53 @@
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 from dotenv import load_dotenv
 from openai import OpenAI
 from pathlib import Path
+from .llm_cache import LLMCache
+from .rate_limit import get_rate_limiter
 
 # Load env from root
 env_path = Path(__file__).resolve().parent.parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+# Shared by the single-keyword and batched prompts
+ARTICLE_TITLE_REQUIREMENTS = """# Title Requirements (SEO & Style Guidelines)
+1. **Keyword Placement:** naturally place the main keyword as close to the beginning of the title as possible (Front-loading).
+2. **Length:** Keep titles between 50-60 characters to prevent truncation in SERPs (Search Engine Results Pages).
+3. **Tone (Gen-Z Style):**
+    - Use casual, authentic, and snappy language.
+    - Avoid "corporate" or overly formal phrasing.
+    - Focus on "vibes," "hacks," "truth," or "aesthetic."
+    - Avoid "cringe" clickbait; keep it honest but catchy.
+4. **Formatting:**
+    - Use numbers (odd numbers like 7, 9, 13 often perform better).
+    - Use brackets or parentheses for context (e.g., [2024 Guide], (Tried & Tested)).
+5. **SEO Hygiene:** Do not over-optimize or "keyword stuff." The title must read naturally to a human."""
+
+PIN_REQUIREMENTS = """### Titles
+1. Must be Pinterest SEO optimized and contain the main keyword or a close variation.
+2. Must follow a listicle or power-word format that is visually appealing and click-worthy.
+3. Keep titles concise, punchy, and scroll-stopping.
+
+### Descriptions
+1. **Every single description** must include the exact main keyword: **{keyword}**.
+2. Naturally incorporate relevant secondary keywords and annotations from the bank above, varying them across descriptions.
+3. Writing tone must feel **modern, fun, and relatable**, as if written by a trend-savvy 18-year-old who knows fashion.
+4. Descriptions must be **engaging, conversational, and scroll-stopping** while remaining SEO-friendly and informative.
+5. End every description with a **clear, strong call to action** (e.g., "Read the full list," "Tap to see all 17 outfits," "Save this for date night," etc.). Vary the CTAs across pins.
+6. End each description with **3 to 5 relevant hashtags** related to the main keyword and Pinterest trending topics. Hashtags should feel natural, not spammy.
+
+### Strict Rules
+- **Do NOT** use emojis anywhere.
+- **Do NOT** use dashes (hyphens or em dashes) anywhere.
+- **Do NOT** include filler, fluff, or generic statements that add no value.
+- **Do NOT** clone or repeat the same sentence structures across descriptions. Each one must feel unique.
+- Every description must be **substantive and distinct** from the others."""
+
 class ContentGeneratorService:
-    def __init__(self):
+    def __init__(self, bypass_cache: bool = False):
         # OpenRouter only
         self.api_key = os.getenv("OPENROUTER_API_KEY")
         self.base_url = "https://openrouter.ai/api/v1"
@@ -26,6 +63,37 @@ class ContentGeneratorService:
             except Exception as e:
                 print(f"Failed to initialize OpenRouter client: {e}")
 
+        # Shared across threads and service instances (OPENROUTER_RPM)
+        self.rate_limiter = get_rate_limiter("openrouter")
+        self.concurrency = int(os.getenv("CONTENT_GEN_CONCURRENCY", "4"))
+        self.batch_size = int(os.getenv("CONTENT_GEN_BATCH_SIZE", "5"))
+        # bypass_cache skips lookups (deliberate regenerations) but still stores the new responses
+        self.llm_cache = LLMCache(bypass=bypass_cache)
+
+    def _cache_params(self, template: str, inputs: dict) -> dict:
+        return LLMCache.params("openrouter", self.model, template, inputs)
+
+    def _article_params(self, keyword: str, count: int) -> dict:
+        return self._cache_params("article_titles", {"keyword": keyword, "count": count})
+
+    def _pin_params(self, keyword: str, article_title: str, suggestions: list, count: int) -> dict:
+        return self._cache_params("pin_ideas", {
+            "keyword": keyword, "article_title": article_title, "suggestions": suggestions, "count": count,
+        })
+
+    def cache_stats(self) -> dict:
+        return self.llm_cache.stats()
+
+    def _complete(self, prompt: str) -> str:
+        """Single chat completion through the OpenRouter rate limiter."""
+        self.rate_limiter.acquire()
+        completion = self.client.chat.completions.create(
+            extra_headers={"X-Title": "PinTrends Wizard"},
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return completion.choices[0].message.content
+
     def generate_seo_keywords(self, trend: str, suggestions: List[str]) -> List[str]:
         """
         Combines trend + suggestions for SEO.
@@ -54,13 +122,7 @@ class ContentGeneratorService:
                 "Return ONLY titles, one per line."
             )
             
-            completion = self.client.chat.completions.create(
-                extra_headers={"X-Title": "PinTrends Wizard"},
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            content = completion.choices[0].message.content.strip()
+            content = self._complete(prompt).strip()
             # Clean list
             titles = []
             for line in content.split('\n'):
@@ -82,12 +144,7 @@ class ContentGeneratorService:
                 "Include hashtags."
             )
             
-            completion = self.client.chat.completions.create(
-                extra_headers={"X-Title": "PinTrends Wizard"},
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return completion.choices[0].message.content.strip()
+            return self._complete(prompt).strip()
         except Exception as e:
             return f"Error Generating Description: {e}"
 
@@ -98,6 +155,14 @@ class ContentGeneratorService:
         if not self.client:
             return [{'title': f"{i} Ways to Rock {keyword}", 'hook': "Viral Hook"} for i in range(1, count+1)]
             
+        try:
+            return self._article_titles(keyword, count)
+        except Exception as e:
+            print(f"Article Gen Error: {e}")
+            return []
+
+    def _article_titles(self, keyword: str, count: int, lookup: bool = True) -> list:
+        """generate_article_titles() without the error handling."""
         prompt = f"""# Role
 Act as a Senior SEO Strategist and Content Creator specializing in Gen-Z search trends and viral content.
 
@@ -111,34 +176,17 @@ Generate a list of {count} high-converting listicle article titles based on the
 1. **Competitor Analysis:** Search the web for the top 5 ranking articles for this keyword. Analyze their titles for patterns, gaps, and emotional hooks.
 2. **differentiation:** Create titles that stand out from these competitors (e.g., if they all use "Top 10," you use "7 Essential" or "The Ultimate List").
 
-# Title Requirements (SEO & Style Guidelines)
-1. **Keyword Placement:** naturally place the main keyword as close to the beginning of the title as possible (Front-loading).
-2. **Length:** Keep titles between 50-60 characters to prevent truncation in SERPs (Search Engine Results Pages).
-3. **Tone (Gen-Z Style):**
-    - Use casual, authentic, and snappy language.
-    - Avoid "corporate" or overly formal phrasing.
-    - Focus on "vibes," "hacks," "truth," or "aesthetic."
-    - Avoid "cringe" clickbait; keep it honest but catchy.
-4. **Formatting:**
-    - Use numbers (odd numbers like 7, 9, 13 often perform better).
-    - Use brackets or parentheses for context (e.g., [2024 Guide], (Tried & Tested)).
-5. **SEO Hygiene:** Do not over-optimize or "keyword stuff." The title must read naturally to a human.
+{ARTICLE_TITLE_REQUIREMENTS}
 
 # Output Format
 Return ONLY a JSON array of objects with these keys: "title", "hook" (brief explanation or hook).
 Example: [{{"title": "...", "hook": "..."}}]
 """
-        try:
-            completion = self.client.chat.completions.create(
-                extra_headers={"X-Title": "PinTrends Wizard"},
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            content = self._clean_json(completion.choices[0].message.content)
-            return json.loads(content)
-        except Exception as e:
-            print(f"Article Gen Error: {e}")
-            return []
+        return self.llm_cache.cached(
+            self._article_params(keyword, count),
+            lambda: json.loads(self._clean_json(self._complete(prompt))),
+            lookup=lookup
+        )
 
     def generate_pin_ideas(self, keyword: str, article_title: str, suggestions: list, count: int = 10) -> list:
         """
@@ -147,6 +195,15 @@ Example: [{{"title": "...", "hook": "..."}}]
         if not self.client:
             return [{'title': f"Pin {i} for {keyword}", 'description': f"Desc {i} for {keyword}"} for i in range(1, count+1)]
             
+        try:
+            return self._pin_ideas(keyword, article_title, suggestions, count)
+        except Exception as e:
+            print(f"Pin Gen Error: {e}")
+            return []
+
+    def _pin_ideas(self, keyword: str, article_title: str, suggestions: list, count: int,
+                   lookup: bool = True) -> list:
+        """generate_pin_ideas() without the error handling."""
         suggestions_text = ", ".join(suggestions)
         
         prompt = f"""## **Role**
@@ -168,42 +225,221 @@ Naturally weave in the following words and phrases where contextually relevant.
 ---
 ## **Requirements**
 
-### Titles
-1. Must be Pinterest SEO optimized and contain the main keyword or a close variation.
-2. Must follow a listicle or power-word format that is visually appealing and click-worthy.
-3. Keep titles concise, punchy, and scroll-stopping.
-
-### Descriptions
-1. **Every single description** must include the exact main keyword: **{keyword}**.
-2. Naturally incorporate relevant secondary keywords and annotations from the bank above, varying them across descriptions.
-3. Writing tone must feel **modern, fun, and relatable**, as if written by a trend-savvy 18-year-old who knows fashion.
-4. Descriptions must be **engaging, conversational, and scroll-stopping** while remaining SEO-friendly and informative.
-5. End every description with a **clear, strong call to action** (e.g., "Read the full list," "Tap to see all 17 outfits," "Save this for date night," etc.). Vary the CTAs across pins.
-6. End each description with **3 to 5 relevant hashtags** related to the main keyword and Pinterest trending topics. Hashtags should feel natural, not spammy.
-
-### Strict Rules
-- **Do NOT** use emojis anywhere.
-- **Do NOT** use dashes (hyphens or em dashes) anywhere.
-- **Do NOT** include filler, fluff, or generic statements that add no value.
-- **Do NOT** clone or repeat the same sentence structures across descriptions. Each one must feel unique.
-- Every description must be **substantive and distinct** from the others.
+{PIN_REQUIREMENTS.format(keyword=keyword)}
 
 ---
 ## **Output Format**
 Return ONLY a JSON array of objects with these keys: "title", "description".
 Example: [{{"title": "...", "description": "..."}}]
 """
-        try:
-            completion = self.client.chat.completions.create(
-                extra_headers={"X-Title": "PinTrends Wizard"},
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}]
+        return self.llm_cache.cached(
+            self._pin_params(keyword, article_title, suggestions, count),
+            lambda: json.loads(self._clean_json(self._complete(prompt))),
+            lookup=lookup
+        )
+
+    def _article_titles_batch(self, jobs: List[dict], count: int) -> dict:
+        """Article titles for several keywords in one request; returns {job_id: titles}."""
+        prompt_parts = [
+            "# Role",
+            "Act as a Senior SEO Strategist and Content Creator specializing in Gen-Z search trends and viral content.",
+            "",
+            "# Task",
+            f"For EACH of the {len(jobs)} primary keywords below, generate {count} high-converting listicle article titles. "
+            "Treat every keyword as a separate brief and do not mix topics.",
+            "",
+            "# Input Data",
+        ]
+        for i, job in enumerate(jobs):
+            prompt_parts.append(f'KEYWORD {i+1}: "{job["keyword"]}"')
+        prompt_parts += [
+            "",
+            "# Differentiation",
+            "Make titles stand out from typical top-ranking articles (e.g., if they all use \"Top 10,\" you use \"7 Essential\" or \"The Ultimate List\").",
+            "",
+            ARTICLE_TITLE_REQUIREMENTS,
+            "",
+            "# Output Format",
+            "Return ONLY a JSON object whose keys are the keywords exactly as given, each mapping to an array of objects "
+            "with these keys: \"title\", \"hook\" (brief explanation or hook).",
+            'Example: {"keyword one": [{"title": "...", "hook": "..."}], "keyword two": [...]}',
+        ]
+        data = json.loads(self._clean_json(self._complete("\n".join(prompt_parts))))
+        return self._split_keyed(jobs, data, count, required=('title',))
+
+    def _pin_ideas_batch(self, jobs: List[dict], count: int) -> dict:
+        """Pin ideas for several keywords in one request; returns {job_id: pins}."""
+        prompt_parts = [
+            "## **Role**",
+            "Act as a professional Pinterest content strategist with deep expertise in Pinterest SEO, pin copywriting, and visual content marketing.",
+            "",
+            "---",
+            "## **Context**",
+            f"I have published {len(jobs)} blog articles. For EACH article below, create **{count} Pinterest listicle pin titles "
+            "and descriptions** to drive traffic from Pinterest to it. Treat every article as a separate brief.",
+            "Each article has its own secondary keyword bank: weave those words in naturally where relevant, "
+            "spread across that article's pins. Do not force every word into every pin.",
+            "",
+        ]
+        for i, job in enumerate(jobs):
+            prompt_parts.append(
+                f'ARTICLE {i+1}: Main Keyword: "{job["keyword"]}" | Article Title: {job["article_title"]} '
+                f'| Keyword Bank: {", ".join(job.get("suggestions", []))}'
             )
-            content = self._clean_json(completion.choices[0].message.content)
-            return json.loads(content)
-        except Exception as e:
-            print(f"Pin Gen Error: {e}")
-            return []
+        prompt_parts += [
+            "",
+            "---",
+            "## **Requirements**",
+            "",
+            PIN_REQUIREMENTS.format(keyword="that article's Main Keyword"),
+            "",
+            "---",
+            "## **Output Format**",
+            "Return ONLY a JSON object whose keys are the Main Keywords exactly as given, each mapping to an array of "
+            "objects with these keys: \"title\", \"description\".",
+            'Example: {"keyword one": [{"title": "...", "description": "..."}], "keyword two": [...]}',
+        ]
+        data = json.loads(self._clean_json(self._complete("\n".join(prompt_parts))))
+        return self._split_keyed(jobs, data, count, required=('title', 'description'))
+
+    @staticmethod
+    def _split_keyed(jobs: List[dict], data, count: int, required: tuple) -> dict:
+        """
+        Validates a keyword-keyed batch response and maps it back to job ids.
+        Keys are matched case- and whitespace-insensitively; keywords with no
+        usable items are left out so the caller can retry them on their own.
+        """
+        if not isinstance(data, dict):
+            return {}
+        by_key = {' '.join(str(k).lower().split()): v for k, v in data.items()}
+
+        results = {}
+        for job in jobs:
+            items = by_key.get(' '.join(job['keyword'].lower().split()))
+            if not isinstance(items, list):
+                continue
+            valid = [
+                item for item in items
+                if isinstance(item, dict) and all(str(item.get(field) or '').strip() for field in required)
+            ]
+            if valid:
+                results[job['id']] = valid[:count]
+        return results
+
+    def _run_stage(self, executor, jobs: List[dict], results: dict, field: str,
+                   batch_fn, single_fn, batch_size: int, cache_params=None):
+        """
+        Fills results[job_id][field] for every job: cached responses first,
+        then batches of `batch_size`, then each job missing from its batch
+        response on its own. Batch results are cached per keyword under
+        cache_params(job), the same key the single-keyword path uses.
+        """
+        if self.client and cache_params:
+            uncached = []
+            for job in jobs:
+                hit = self.llm_cache.lookup(cache_params(job))
+                if hit is not None:
+                    results[job['id']][field] = hit
+                else:
+                    uncached.append(job)
+            jobs = uncached
+
+        missing = jobs
+        if self.client and batch_size > 1 and len(jobs) > 1:
+            chunks = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+            # A leftover single keyword uses the full single-keyword prompt
+            batches = [chunk for chunk in chunks if len(chunk) > 1]
+            singles = [chunk[0] for chunk in chunks if len(chunk) == 1]
+
+            def run_batch(batch):
+                try:
+                    return batch_fn(batch)
+                except Exception as e:
+                    print(f"Batch {field} error for {len(batch)} keywords: {e}")
+                    return {}
+
+            missing = []
+            for batch, found in zip(batches, executor.map(run_batch, batches)):
+                for job in batch:
+                    if job['id'] in found:
+                        results[job['id']][field] = found[job['id']]
+                        if cache_params:
+                            self.llm_cache.store(cache_params(job), found[job['id']])
+                    else:
+                        missing.append(job)
+            if missing:
+                print(f"Retrying {field} for {len(missing)} keywords individually")
+            missing += singles
+
+        def run_single(job):
+            try:
+                return single_fn(job), None
+            except Exception as e:
+                print(f"Content Gen Error for '{job['keyword']}': {e}")
+                return [], str(e)
+
+        for job, (value, error) in zip(missing, executor.map(run_single, missing)):
+            results[job['id']][field] = value
+            if error:
+                results[job['id']]['error'] = error
+
+    def generate_for_keywords(self, jobs: List[dict], article_count: int = 5, pin_count: int = 5,
+                              gen_type: str = 'all', concurrency: int = None, batch_size: int = None) -> dict:
+        """
+        Generates article titles and/or pin ideas for many keywords concurrently.
+        
+        Args:
+            jobs: Dicts with 'id', 'keyword', 'suggestions' and optionally
+                'article_title' (pin context when articles aren't regenerated).
+            gen_type: 'all', 'articles' or 'pins'.
+            concurrency: Requests in flight at once; defaults to CONTENT_GEN_CONCURRENCY.
+                Requests are additionally paced by the OpenRouter rate limiter.
+            batch_size: Keywords packed into one prompt; defaults to
+                CONTENT_GEN_BATCH_SIZE. 1 sends one prompt per keyword.
+        
+        Returns:
+            {job_id: {'articles': [...], 'pins': [...], 'error': str or None}}
+            A failed keyword keeps whatever finished before the error.
+        """
+        results = {job['id']: {'articles': [], 'pins': [], 'error': None} for job in jobs}
+        if not jobs:
+            return results
+        batch_size = max(1, batch_size or self.batch_size)
+
+        def single_articles(job):
+            if not self.client:
+                return self.generate_article_titles(job['keyword'], article_count)
+            # _run_stage has already checked the cache
+            return self._article_titles(job['keyword'], article_count, lookup=False)
+
+        def single_pins(job):
+            args = (job['keyword'], job['article_title'], job.get('suggestions', []), pin_count)
+            return self._pin_ideas(*args, lookup=False) if self.client else self.generate_pin_ideas(*args)
+
+        workers = max(1, min(concurrency or self.concurrency, len(jobs)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            if gen_type in ('all', 'articles'):
+                self._run_stage(executor, jobs, results, 'articles',
+                                lambda batch: self._article_titles_batch(batch, article_count),
+                                single_articles, batch_size,
+                                cache_params=lambda job: self._article_params(job['keyword'], article_count))
+
+            if gen_type in ('all', 'pins'):
+                pin_jobs = []
+                for job in jobs:
+                    if results[job['id']]['error']:
+                        continue
+                    # Pins are written for the first article, as in the single-keyword flow
+                    articles = results[job['id']]['articles']
+                    context_title = articles[0].get('title') if articles and isinstance(articles[0], dict) else job.get('article_title')
+                    pin_jobs.append({**job, 'article_title': context_title or job['keyword']})
+                self._run_stage(executor, pin_jobs, results, 'pins',
+                                lambda batch: self._pin_ideas_batch(batch, pin_count),
+                                single_pins, batch_size,
+                                cache_params=lambda job: self._pin_params(
+                                    job['keyword'], job['article_title'], job.get('suggestions', []), pin_count))
+
+        return results
 
     def _clean_json(self, content):
         import json
@@ -260,22 +496,18 @@ Example: [{{"title": "...", "description": "..."}}]
 
             prompt = "\n".join(prompt_parts)
 
-            completion = self.client.chat.completions.create(
-                extra_headers={"X-Title": "PinTrends Wizard"},
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}]
-            )
+            def request_expansion():
+                content = self._complete(prompt).strip()
+                if content.startswith("```"):
+                    content = content.split("```")[1]
+                    if content.startswith("json"):
+                        content = content[4:]
+                return json.loads(content.strip())
             
-            content = completion.choices[0].message.content.strip()
-            
-            import json
-            if content.startswith("```"):
-                content = content.split("```")[1]
-                if content.startswith("json"):
-                    content = content[4:]
-            content = content.strip()
-            
-            expanded = json.loads(content)
+            expanded = self.llm_cache.cached(
+                self._cache_params("keyword_expansion", {"items": items, "niche": niche, "count": count}),
+                request_expansion
+            )
             
             # Fallback validation to ensure 'base' is present, though prompt asks for it
             # If missing, we might assume order? But prompt is explicit. 
@@ -0,0 +1,263 @@
+import os
+import time
+from datetime import timedelta
+from typing import Iterable, Iterator, List
+
+import requests
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+
+from ..models import BlogPost, BlogSection, ImageJob, PinIdea
+from .image_cache import ImageCache
+
+FAL_APPLICATION = "fal-ai/nano-banana"
+FAL_ASPECT_RATIOS = ("2:3", "16:9")
+
+
+def webhook_token(job_id: int) -> str:
+    """Per-job secret carried in the webhook URL, so only Fal can resolve the job."""
+    return salted_hmac("wizard.fal-webhook", str(job_id)).hexdigest()
+
+
+def check_webhook_token(job_id: int, token: str) -> bool:
+    return constant_time_compare(webhook_token(job_id), token or "")
+
+
+def _is_transient(error: BaseException) -> bool:
+    """Rate limits, Fal server errors and network failures; anything else won't succeed on a retry."""
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else 0
+        return status == 429 or status >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class FalJobService:
+    """
+    Submits images to the Fal queue without waiting for them.
+
+    Each request is an ImageJob row holding Fal's request ID and status/result
+    URLs, so no thread is tied up while Fal works and a restarted worker can
+    pick the job up again. Jobs are resolved by the Fal webhook (when
+    FAL_WEBHOOK_BASE_URL makes this app reachable) or by polling; either way
+    the image is applied once to the job's pin or blog image. Identical requests reuse a
+    cached image (see ImageCache) unless force_new is set.
+    """
+
+    def __init__(self, force_new: bool = False):
+        self.fal_key = os.getenv("FAL_KEY")
+        self.queue_url = os.getenv("FAL_QUEUE_URL", "https://queue.fal.run").rstrip("/")
+        self.webhook_base_url = os.getenv("FAL_WEBHOOK_BASE_URL", "").rstrip("/")
+        self.poll_interval = float(os.getenv("FAL_POLL_INTERVAL", "2"))
+        self.wait_timeout = int(os.getenv("FAL_WAIT_TIMEOUT", "300"))
+        self.expire_after = timedelta(seconds=int(os.getenv("FAL_JOB_EXPIRY", "3600")))
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Key {self.fal_key}"
+        self.image_cache = ImageCache(bypass=force_new)
+
+    @property
+    def available(self) -> bool:
+        return bool(self.fal_key)
+
+    def webhook_url(self, job: ImageJob) -> str:
+        if not self.webhook_base_url:
+            return ""
+        path = reverse('wizard:fal_webhook', args=[job.id])
+        return f"{self.webhook_base_url}{path}?token={webhook_token(job.id)}"
+
+    def submit(self, prompt: str, aspect_ratio: str = "2:3", project=None, pin_id: int = None,
+               blog_post_id: int = None, blog_key: str = "") -> ImageJob:
+        """
+        Queues one image on Fal and returns its job, already 'completed' when
+        the image cache had it or 'failed' if Fal refused it. The image goes
+        to pin `pin_id`, or to blog `blog_post_id` under `blog_key`
+        ('thumbnail' or 'item_<i>').
+        """
+        job = ImageJob.objects.create(
+            project=project,
+            pin_id=pin_id,
+            blog_post_id=blog_post_id,
+            blog_key=blog_key,
+            application=FAL_APPLICATION,
+            prompt=prompt,
+            aspect_ratio=aspect_ratio if aspect_ratio in FAL_ASPECT_RATIOS else "2:3",
+        )
+        cached_url = self.image_cache.lookup(self._cache_key(job))
+        if cached_url:
+            return self.resolve(job, result={"images": [{"url": cached_url}]}, cached=True)
+        if not self.available:
+            return self.resolve(job, error="FAL_KEY not configured. Please set FAL_KEY in .env file.")
+
+        try:
+            data = self._post(job)
+        except Exception as e:
+            print(f"✗ Fal submit failed for image job {job.id}: {e}")
+            return self.resolve(job, error=f"Submit failed: {e}")
+
+        ImageJob.objects.filter(pk=job.pk).update(
+            request_id=data["request_id"],
+            status_url=data.get("status_url", ""),
+            response_url=data.get("response_url", ""),
+            updated_at=timezone.now(),
+        )
+        # Leaves alone a job a fast webhook already resolved
+        ImageJob.objects.filter(pk=job.pk, status='pending').update(status='submitted')
+        job.refresh_from_db()
+        return job
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=10),
+        retry=retry_if_exception(_is_transient),
+        reraise=True
+    )
+    def _post(self, job: ImageJob) -> dict:
+        """Queues the job's request on Fal, retrying rate limits, 5xx and network errors."""
+        params = {}
+        webhook_url = self.webhook_url(job)
+        if webhook_url:
+            params["fal_webhook"] = webhook_url
+        response = self.session.post(
+            f"{self.queue_url}/{job.application}",
+            params=params,
+            json={
+                "prompt": job.prompt,
+                "num_images": 1,
+                "aspect_ratio": job.aspect_ratio,
+                "output_format": "png"
+            },
+            timeout=15
+        )
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _cache_key(job: ImageJob) -> str:
+        return ImageCache.make_key(job.application, job.prompt, job.aspect_ratio)
+
+    def _base_url(self, job: ImageJob) -> str:
+        return f"{self.queue_url}/{job.application}/requests/{job.request_id}"
+
+    def poll(self, job: ImageJob) -> ImageJob:
+        """Checks a submitted job on Fal and resolves it if Fal is done."""
+        if job.status != 'submitted':
+            return job
+        try:
+            response = self.session.get(job.status_url or f"{self._base_url(job)}/status", timeout=15)
+            response.raise_for_status()
+            if response.json().get("status") != "COMPLETED":
+                return job
+            response = self.session.get(job.response_url or self._base_url(job), timeout=15)
+            if response.status_code >= 400:
+                return self.resolve(job, error=f"Fal error {response.status_code}: {response.text[:500]}")
+            return self.resolve(job, result=response.json())
+        except Exception as e:
+            # Transient; the next poll tries again
+            print(f"Polling image job {job.id} failed: {e}")
+            return job
+
+    def handle_webhook(self, job: ImageJob, payload: dict) -> ImageJob:
+        """Resolves a job from a Fal webhook body."""
+        if payload.get("request_id") != job.request_id and job.request_id:
+            raise ValueError("Request ID does not match the job")
+        if payload.get("status") == "OK":
+            if payload.get("payload") is None:
+                # Result too large for the webhook ('payload_error'); fetch it instead
+                return self.poll(job)
+            return self.resolve(job, result=payload["payload"])
+        detail = payload.get("error") or "Fal reported an error"
+        if isinstance(payload.get("payload"), dict) and payload["payload"].get("detail"):
+            detail = f"{detail}: {payload['payload']['detail']}"
+        return self.resolve(job, error=str(detail))
+
+    def resolve(self, job: ImageJob, result: dict = None, error: str = None, cached: bool = False) -> ImageJob:
+        """
+        Records a finished job and applies its image to the pin or blog; new
+        images also go into the image cache. Webhook and polling may both report the
+        same job; only the first one counts.
+        """
+        image_url = ""
+        if result is not None:
+            images = result.get("images") or []
+            image_url = images[0].get("url", "") if images else ""
+            if not image_url:
+                error = "No image generated"
+
+        fields = {'completed_at': timezone.now(), 'updated_at': timezone.now()}
+        if error:
+            fields.update(status='failed', error_message=error[:2000])
+        else:
+            fields.update(status='completed', image_url=image_url)
+        claimed = ImageJob.objects.filter(pk=job.pk, status__in=('pending', 'submitted')).update(**fields)
+        job.refresh_from_db()
+
+        if claimed and job.status == 'completed':
+            if job.pin_id:
+                PinIdea.objects.filter(pk=job.pin_id).update(image_url=job.image_url, image_prompt=job.prompt)
+            if job.blog_post_id:
+                self._apply_to_blog(job)
+            if not cached:
+                self.image_cache.store(self._cache_key(job), job.image_url, job.application, job.prompt,
+                                       job.aspect_ratio, project=job.project)
+        if claimed:
+            print(f"{'✅' if job.status == 'completed' else '✗'} Image job {job.id} {job.status}")
+        return job
+
+    @staticmethod
+    def _apply_to_blog(job: ImageJob):
+        # The section may not be saved yet; the blog task then saves it with this image itself
+        if job.blog_key == 'thumbnail':
+            BlogPost.objects.filter(pk=job.blog_post_id).update(thumbnail_url=job.image_url, thumbnail_prompt=job.prompt)
+        elif job.blog_key.startswith('item_'):
+            BlogSection.objects.filter(
+                blog_post_id=job.blog_post_id, order=int(job.blog_key.split('_')[1]) + 1
+            ).update(image_url=job.image_url, image_prompt=job.prompt)
+
+        # Arrived after the blog finished: its JSON export was written without this image
+        blog = BlogPost.objects.filter(pk=job.blog_post_id, generation_status='completed').first()
+        if blog:
+            from ..tasks import export_blog_json
+            from .blog_generator import BlogGeneratorService
+            export_blog_json(blog, BlogGeneratorService())
+            blog.save(update_fields=['json_file', 'updated_at'])
+
+    def refresh(self, jobs: Iterable[ImageJob]) -> List[ImageJob]:
+        """
+        Current state of `jobs`: rows resolved meanwhile (e.g. by the webhook)
+        are reloaded, the rest are polled on Fal.
+        """
+        jobs = list(jobs)
+        current = ImageJob.objects.in_bulk([job.id for job in jobs])
+        return [self.poll(current[job.id]) if job.id in current else job for job in jobs]
+
+    def wait(self, jobs: Iterable[ImageJob], timeout: float = None) -> Iterator[ImageJob]:
+        """
+        Yields each job once it is completed or failed. Jobs still unresolved
+        after `timeout` seconds are left to the webhook or poll_pending().
+        """
+        outstanding = {job.id: job for job in jobs}
+        deadline = time.monotonic() + (self.wait_timeout if timeout is None else timeout)
+        while outstanding:
+            for job in self.refresh(outstanding.values()):
+                if job.status in ('completed', 'failed'):
+                    del outstanding[job.id]
+                    yield job
+            if not outstanding or time.monotonic() >= deadline:
+                return
+            time.sleep(self.poll_interval)
+
+    def poll_pending(self) -> dict:
+        """
+        Polls every unresolved job once; jobs older than FAL_JOB_EXPIRY are
+        failed. Safe to run on a schedule.
+        """
+        cutoff = timezone.now() - self.expire_after
+        counts = {'completed': 0, 'failed': 0, 'pending': 0}
+        for job in ImageJob.objects.filter(status__in=('pending', 'submitted')).order_by('created_at'):
+            if job.created_at < cutoff:
+                job = self.resolve(job, error="Expired before Fal finished")
+            else:
+                job = self.poll(job)
+            counts[job.status if job.status in counts else 'pending'] += 1
+        return counts
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+from datetime import timedelta
+
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from ..models import MediaAsset
+
+
+class ImageCache:
+    """
+    Reuses generated images for identical requests instead of paying for a
+    new one.
+
+    Entries are MediaAsset rows keyed by prompt_hash, a hash of model,
+    prompt, aspect ratio and output format, pointing at the stored image URL.
+    Only entries already mirrored to R2 are reused: Fal's own URLs expire, so
+    an entry becomes reusable once ImageMirrorService has swapped in its copy.
+    Each reuse bumps reuse_count (the generations saved) and last_used_at;
+    entries expire after IMAGE_CACHE_TTL and the least recently used are
+    evicted beyond IMAGE_CACHE_MAX_ENTRIES. bypass=True skips lookups
+    (forced new images) but still records the new image.
+    """
+
+    def __init__(self, bypass: bool = False):
+        self.bypass = bypass
+        self.enabled = os.getenv("IMAGE_CACHE_ENABLED", "1") != "0"
+        self.ttl = timedelta(seconds=int(os.getenv("IMAGE_CACHE_TTL", str(30 * 86400))))
+        self.max_entries = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "5000"))
+        self.r2_base_url = os.getenv("R2_BASE_URL", "").rstrip("/")
+
+    @staticmethod
+    def make_key(model: str, prompt: str, aspect_ratio: str, output_format: str = "png") -> str:
+        raw = json.dumps([model, prompt.strip(), aspect_ratio, output_format])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _entries(self):
+        return MediaAsset.objects.exclude(prompt_hash='')
+
+    def lookup(self, key: str):
+        """Stored R2 image URL for `key`, or None on a miss (always None when bypassed)."""
+        if not self.enabled or self.bypass or not self.r2_base_url:
+            return None
+        asset = (
+            self._entries()
+            .filter(prompt_hash=key, created_at__gte=timezone.now() - self.ttl,
+                    remote_url__startswith=self.r2_base_url + "/")
+            .order_by('-created_at')
+            .first()
+        )
+        if asset is None:
+            return None
+        MediaAsset.objects.filter(pk=asset.pk).update(reuse_count=F('reuse_count') + 1, last_used_at=timezone.now())
+        print(f"♻️ Reusing cached image for prompt {key[:12]} (asset {asset.id})")
+        return asset.remote_url
+
+    def store(self, key: str, image_url: str, model: str, prompt: str, aspect_ratio: str, project=None):
+        """
+        Records a newly generated image under `key`. It is reused once
+        mirroring has replaced remote_url with its R2 copy.
+        """
+        if not self.enabled or not image_url:
+            return None
+        asset = MediaAsset.objects.create(
+            project=project,
+            remote_url=image_url,
+            prompt=prompt,
+            source='fal-ai',
+            is_vertical=aspect_ratio != "16:9",
+            prompt_hash=key,
+            model=model,
+            aspect_ratio=aspect_ratio,
+            last_used_at=timezone.now(),
+        )
+        self.evict()
+        return asset
+
+    def evict(self) -> int:
+        """
+        Drops expired entries and the least recently used ones over the limit.
+        Only the cache rows go; images already on pins and blogs are untouched.
+        """
+        entries = self._entries()
+        deleted, _ = entries.filter(created_at__lt=timezone.now() - self.ttl).delete()
+        overflow = entries.count() - self.max_entries
+        if overflow > 0:
+            stale_ids = list(entries.order_by('last_used_at').values_list('id', flat=True)[:overflow])
+            deleted += MediaAsset.objects.filter(id__in=stale_ids).delete()[0]
+        return deleted
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        return {
+            'entries': entries.count(),
+            'saved_generations': entries.aggregate(saved=Sum('reuse_count'))['saved'] or 0,
+        }
@@ -0,0 +1,114 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List
+from urllib.parse import urlparse
+
+import requests
+from django.db.models import Q
+
+from ..models import BlogPost, BlogSection, ImageJob, MediaAsset, PinIdea
+from .s3_service import S3Service
+
+
+class ImageMirrorService:
+    """
+    Copies generated images from Fal's CDN into R2 and points every stored
+    reference at the copy, so downloads and Pinterest posting no longer
+    depend on Fal's temporary URLs.
+
+    Each image is streamed from Fal straight into R2 (no temp files), at most
+    IMAGE_MIRROR_CONCURRENCY at a time. A failed copy leaves the original URL
+    in place for the next run.
+    """
+
+    def __init__(self, concurrency: int = None):
+        self.s3 = S3Service()
+        self.enabled = os.getenv("IMAGE_MIRROR_ENABLED", "1") != "0"
+        self.concurrency = concurrency or int(os.getenv("IMAGE_MIRROR_CONCURRENCY", "4"))
+        self.session = requests.Session()
+
+    @property
+    def available(self) -> bool:
+        return self.enabled and self.s3.s3 is not None
+
+    def needs_mirror(self, url: str) -> bool:
+        if not url or not url.startswith(("http://", "https://")):
+            return False
+        return not (self.s3.base_url and url.startswith(self.s3.base_url + "/"))
+
+    def mirror_url(self, url: str) -> str:
+        """Streams one image into R2 and returns its R2 URL."""
+        filename = os.path.basename(urlparse(url).path) or "image.png"
+        with self.session.get(url, stream=True, timeout=(10, 60)) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            content_type = response.headers.get("Content-Type", "image/png").split(";")[0]
+            return self.s3.upload_file(response.raw, filename, content_type=content_type)
+
+    def mirror(self, urls: Iterable[str]) -> Dict[str, str]:
+        """
+        Mirrors `urls` (skipping ones already on R2) and swaps the stored URLs
+        as each copy finishes.
+
+        Returns:
+            {original_url: r2_url} for the images copied.
+        """
+        urls = list(dict.fromkeys(url for url in urls if self.needs_mirror(url)))
+        if not urls or not self.available:
+            return {}
+
+        mirrored = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(self.concurrency, len(urls)))) as executor:
+            futures = {executor.submit(self.mirror_url, url): url for url in urls}
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    mirrored[url] = future.result()
+                except Exception as e:
+                    print(f"✗ Mirroring {url[:80]} failed: {e}")
+                    continue
+                self.swap(url, mirrored[url])
+        print(f"✅ Mirrored {len(mirrored)}/{len(urls)} images to R2")
+        return mirrored
+
+    @staticmethod
+    def swap(old_url: str, new_url: str) -> int:
+        """Replaces `old_url` everywhere it is stored. Returns the rows updated."""
+        # Saved blog JSON (edits, publishing) embeds the URLs too
+        posts = BlogPost.objects.filter(
+            Q(thumbnail_url=old_url) | Q(sections__image_url=old_url)
+        ).exclude(structured_content={}).distinct()
+        for post in posts:
+            content = json.dumps(post.structured_content)
+            if old_url in content:
+                post.structured_content = json.loads(content.replace(old_url, new_url))
+                post.save(update_fields=['structured_content', 'updated_at'])
+
+        return (
+            BlogSection.objects.filter(image_url=old_url).update(image_url=new_url)
+            + BlogPost.objects.filter(thumbnail_url=old_url).update(thumbnail_url=new_url)
+            + PinIdea.objects.filter(image_url=old_url).update(image_url=new_url)
+            + MediaAsset.objects.filter(remote_url=old_url).update(remote_url=new_url)
+            + ImageJob.objects.filter(image_url=old_url).update(image_url=new_url)
+        )
+
+    @staticmethod
+    def blog_urls(blog_post: BlogPost) -> List[str]:
+        return [blog_post.thumbnail_url] + [section.image_url for section in blog_post.sections.all()]
+
+    def pending_urls(self, limit: int = 200) -> List[str]:
+        """Stored generated image URLs not on R2 yet, newest first."""
+        def recent(queryset, field):
+            queryset = queryset.filter(**{f"{field}__startswith": "http"})
+            if self.s3.base_url:
+                queryset = queryset.exclude(**{f"{field}__startswith": self.s3.base_url + "/"})
+            return list(queryset.order_by('-id').values_list(field, flat=True)[:limit])
+
+        urls = (
+            recent(BlogPost.objects.filter(generation_status='completed'), 'thumbnail_url')
+            + recent(BlogSection.objects.filter(blog_post__generation_status='completed'), 'image_url')
+            + recent(PinIdea.objects.all(), 'image_url')
+            + recent(MediaAsset.objects.exclude(prompt_hash=''), 'remote_url')
+        )
+        return list(dict.fromkeys(urls))[:limit]
@@ -0,0 +1,72 @@
+import os
+from .cache import PersistentCache
+
+# Bump a template's version whenever its prompt text changes so stale
+# responses stop matching.
+PROMPT_VERSIONS = {
+    'article_titles': 1,
+    'pin_ideas': 1,
+    'keyword_expansion': 1,
+    'blog_content': 1,
+    'image_prompt': 1,
+}
+
+
+class LLMCache:
+    """
+    Content-addressed cache for LLM responses, stored in the 'llm' namespace
+    of PersistentCache.
+
+    Keys cover provider, model, prompt template and version, the inputs and
+    any sampling parameters, so a change to any of them is a miss. Only
+    successful responses are stored.
+    """
+
+    namespace = 'llm'
+
+    def __init__(self, bypass: bool = False):
+        self.bypass = bypass
+        self.enabled = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+        self.cache = PersistentCache(
+            self.namespace,
+            ttl=int(os.getenv("LLM_CACHE_TTL", str(7 * 86400))),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+        )
+
+    @staticmethod
+    def params(provider: str, model: str, template: str, inputs: dict, sampling: dict = None) -> dict:
+        return {
+            'provider': provider,
+            'model': model,
+            'template': template,
+            'version': PROMPT_VERSIONS.get(template, 1),
+            'inputs': inputs,
+            'sampling': sampling or {},
+        }
+
+    def lookup(self, params: dict):
+        """Cached value for `params`, or None on a miss (always None when bypassed)."""
+        if not self.enabled or self.bypass:
+            return None
+        hit = self.cache.get(params)
+        return hit['value'] if hit else None
+
+    def store(self, params: dict, value):
+        """Stores a non-empty value; when bypassed this refreshes the entry."""
+        if self.enabled and value:
+            self.cache.set(params, {'value': value})
+
+    def cached(self, params: dict, compute, lookup: bool = True):
+        """
+        Returns the cached value for `params`, or compute() and stores it.
+        lookup=False is for callers that already checked the cache.
+        """
+        value = self.lookup(params) if lookup else None
+        if value is not None:
+            return value
+        value = compute()
+        self.store(params, value)
+        return value
+
+    def stats(self) -> dict:
+        return self.cache.stats()
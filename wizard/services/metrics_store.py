@@ -0,0 +1,316 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import List
+
+import numpy as np
+from django.utils import timezone
+
+from ..models import KeywordMetrics
+from .prediction_service import PredictionService
+
+MONTH_NAMES = np.array(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])
+
+# Weeks the Trends API normally forecasts (predicted_days=91)
+FORECAST_WEEKS = 13
+
+
+def _pack(array: np.ndarray, dtype) -> bytes:
+    return np.ascontiguousarray(array, dtype=dtype).tobytes()
+
+
+def _unpack(blob, dtype) -> np.ndarray:
+    return np.frombuffer(bytes(blob or b''), dtype=dtype)
+
+
+def split_counts(data) -> dict:
+    """
+    Converts a metrics payload into sorted NumPy columns.
+
+    Returns:
+        {'dates', 'values'} for history and {'forecast_dates', 'forecast',
+        'upper', 'lower'} for the API's prediction. Dates are datetime64[D].
+    """
+    counts = data.get('counts', []) if data else []
+    dates = np.array([p.get('date') or 'NaT' for p in counts], dtype='datetime64[D]')
+    normalized = np.array([p.get('normalizedCount') for p in counts], dtype=float)
+    raw = np.array([p.get('count', 0) for p in counts], dtype=float)
+    values = np.where(np.isnan(normalized), raw, normalized)
+    upper = np.array([p.get('predictedUpperBoundNormalizedCount') for p in counts], dtype=float)
+    lower = np.array([p.get('predictedLowerBoundNormalizedCount') for p in counts], dtype=float)
+
+    valid = ~np.isnat(dates)
+    order = np.argsort(dates[valid], kind='stable')
+    dates, values, upper, lower = (a[valid][order] for a in (dates, values, upper, lower))
+
+    predicted = ~np.isnan(upper)
+    return {
+        'dates': dates[~predicted],
+        'values': values[~predicted],
+        'forecast_dates': dates[predicted],
+        'forecast': values[predicted],
+        'upper': upper[predicted],
+        'lower': np.where(np.isnan(lower[predicted]), values[predicted], lower[predicted]),
+    }
+
+
+def format_labels(dates: np.ndarray) -> List[str]:
+    """'Jan 05, 2026' style chart labels for a datetime64[D] array."""
+    if not len(dates):
+        return []
+    months = dates.astype('datetime64[M]')
+    years = dates.astype('datetime64[Y]').astype(int) + 1970
+    days = (dates - months).astype(int) + 1
+    month_names = MONTH_NAMES[months.astype(int) % 12]
+    return [f"{m} {d:02d}, {y}" for m, d, y in zip(month_names, days, years)]
+
+
+def local_forecast(dates: np.ndarray, values: np.ndarray, weeks: int = FORECAST_WEEKS, window: int = 26) -> dict:
+    """
+    Linear-trend forecast over the last `window` points with a widening
+    95% band from the fit residuals. Values are clipped to the 0-100 scale.
+    """
+    if len(values) < 3:
+        return {'dates': np.array([], dtype='datetime64[D]'), 'values': np.array([]), 'upper': np.array([]), 'lower': np.array([])}
+
+    x = np.arange(len(values), dtype=float)[-window:]
+    y = values[-window:]
+    slope, intercept = np.polyfit(x, y, 1)
+    sigma = np.std(y - (slope * x + intercept))
+
+    step = np.median(np.diff(dates[-window:]).astype(int)) or 7
+    ahead = np.arange(1, weeks + 1)
+    future_x = x[-1] + ahead
+    predicted = slope * future_x + intercept
+    spread = 1.96 * sigma * np.sqrt(ahead)
+
+    return {
+        'dates': dates[-1] + (ahead * int(step)).astype('timedelta64[D]'),
+        'values': np.clip(predicted, 0, 100),
+        'upper': np.clip(predicted + spread, 0, 100),
+        'lower': np.clip(predicted - spread, 0, 100),
+    }
+
+
+def growth_rate(values: np.ndarray, weeks: int) -> float:
+    """Percent change of the latest 4-point mean against the 4 points `weeks` earlier."""
+    if len(values) < weeks + 4:
+        return 0.0
+    recent = values[-4:].mean()
+    earlier = values[-weeks - 4:-weeks].mean()
+    if earlier <= 0:
+        return 100.0 if recent > 0 else 0.0
+    return float((recent - earlier) / earlier * 100)
+
+
+class KeywordMetricsStore:
+    """
+    Local copy of Trends metrics per keyword.
+
+    A record is reused until it is older than METRICS_MAX_AGE_HOURS; then only
+    the weeks since its last point are requested and appended, rescaled onto
+    the stored series using the overlapping weeks (the API normalizes each
+    response to its own window).
+    """
+
+    def __init__(self, country: str = 'US', service: PredictionService = None):
+        self.country = country
+        self.service = service or PredictionService()
+        self.max_age = timedelta(hours=int(os.getenv('METRICS_MAX_AGE_HOURS', '24')))
+        # Weeks re-requested before the last stored point, used to align the scales
+        self.overlap_weeks = int(os.getenv('METRICS_OVERLAP_WEEKS', '4'))
+
+    def _is_fresh(self, record: KeywordMetrics) -> bool:
+        return bool(record.fetched_at and record.last_date and timezone.now() - record.fetched_at < self.max_age)
+
+    def _days_to_fetch(self, record: KeywordMetrics) -> int:
+        if not record or not record.last_date:
+            return 365
+        gap = (timezone.now().date() - record.last_date).days
+        return min(365, max(gap + 7 * self.overlap_weeks, 28))
+
+    def get(self, keyword: str, refresh: bool = False) -> KeywordMetrics:
+        result = self.get_many([keyword], refresh=refresh)
+        if keyword in result['errors']:
+            raise ValueError(result['errors'][keyword])
+        return result['records'][keyword]
+
+    def get_many(self, keywords: List[str], refresh: bool = False, concurrency: int = 6) -> dict:
+        """
+        Returns stored metrics for `keywords`, fetching only stale or missing ones.
+
+        Returns:
+            {'records': {keyword: KeywordMetrics}, 'errors': {keyword: message}}
+        """
+        keywords = list(dict.fromkeys(k for k in keywords if k))
+        existing = {
+            r.keyword: r for r in KeywordMetrics.objects.filter(
+                country=self.country, keyword__in=[k.lower() for k in keywords]
+            )
+        }
+
+        # Stale keywords are fetched once per lowercased key
+        records, errors, stale = {}, {}, {}
+        for keyword in keywords:
+            record = existing.get(keyword.lower())
+            if record and not refresh and self._is_fresh(record):
+                records[keyword] = record
+            else:
+                stale.setdefault(keyword.lower(), keyword)
+
+        if stale:
+            stale = list(stale.values())
+
+            def fetch_one(keyword):
+                days = 365 if refresh else self._days_to_fetch(existing.get(keyword.lower()))
+                return self.service.fetch_trends_data(keyword, days=days)
+
+            with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+                fetched = dict(zip(stale, executor.map(fetch_one, stale)))
+
+            to_create, to_update = [], []
+            for keyword, data in fetched.items():
+                record = existing.get(keyword.lower())
+                if not data:
+                    # Serve what we have rather than nothing
+                    if record and record.last_date:
+                        records[keyword] = record
+                    else:
+                        errors[keyword] = "No trend data"
+                    continue
+                if record is None:
+                    record = KeywordMetrics(keyword=keyword.lower(), country=self.country)
+                    existing[record.keyword] = record
+                    to_create.append(record)
+                else:
+                    to_update.append(record)
+                self._merge(record, split_counts(data), replace=refresh)
+                records[keyword] = record
+
+            # Other spellings of a fetched keyword share its result
+            for keyword in keywords:
+                if keyword in records or keyword in errors:
+                    continue
+                fetched_as = next(k for k in stale if k.lower() == keyword.lower())
+                if fetched_as in records:
+                    records[keyword] = records[fetched_as]
+                else:
+                    errors[keyword] = errors[fetched_as]
+
+            KeywordMetrics.objects.bulk_create(to_create)
+            KeywordMetrics.objects.bulk_update(to_update, ['dates', 'values', 'forecast', 'last_date', 'fetched_at'])
+
+        return {'records': records, 'errors': errors}
+
+    def _merge(self, record: KeywordMetrics, columns: dict, replace: bool = False):
+        old_dates, old_values = self.history(record)
+        # One point per date (the first), so dates can be matched one to one
+        new_dates, first = np.unique(columns['dates'], return_index=True)
+        new_values = columns['values'][first]
+        scale = 1.0
+
+        if not replace and len(old_dates) and len(new_dates):
+            _, old_index, new_index = np.intersect1d(old_dates, new_dates, return_indices=True)
+            old_overlap, new_overlap = old_values[old_index], new_values[new_index]
+            # Weeks at 0 on either side say nothing about the ratio
+            usable = (old_overlap > 0) & (new_overlap > 0)
+            if usable.any():
+                ratio = float(np.median(old_overlap[usable] / new_overlap[usable]))
+                if np.isfinite(ratio) and ratio > 0:
+                    scale = ratio
+            appended = new_dates > old_dates[-1]
+            dates = np.concatenate([old_dates, new_dates[appended]])
+            values = np.concatenate([old_values, new_values[appended] * scale])
+        else:
+            dates, values = new_dates, new_values
+
+        # Keep the 0-100 scale and a rolling year of history
+        peak = max(values.max() if len(values) else 0, (columns['upper'] * scale).max(initial=0))
+        rescale = 100.0 / peak if peak > 100 else 1.0
+        keep = dates > (dates[-1] - np.timedelta64(365, 'D')) if len(dates) else slice(None)
+        dates, values = dates[keep], values[keep] * rescale
+
+        record.dates = _pack(dates.astype('datetime64[D]').astype(np.int64), np.int32)
+        record.values = _pack(values, np.float32)
+        record.last_date = dates[-1].astype(object) if len(dates) else None
+        record.forecast = {
+            'dates': [str(d) for d in columns['forecast_dates']],
+            'values': (columns['forecast'] * scale * rescale).round(2).tolist(),
+            'upper': (columns['upper'] * scale * rescale).round(2).tolist(),
+            'lower': (columns['lower'] * scale * rescale).round(2).tolist(),
+        }
+        record.fetched_at = timezone.now()
+
+    @staticmethod
+    def history(record: KeywordMetrics):
+        """(dates as datetime64[D], values as float64) for a stored record."""
+        dates = _unpack(record.dates, np.int32).astype('datetime64[D]')
+        values = _unpack(record.values, np.float32).astype(float)
+        return dates, values
+
+    def forecast(self, record: KeywordMetrics) -> dict:
+        """The API prediction as arrays, or local_forecast() when there is none."""
+        stored = record.forecast or {}
+        if stored.get('dates'):
+            forecast = {k: np.array(stored[k], dtype=float) for k in ('values', 'upper', 'lower')}
+            forecast['dates'] = np.array(stored['dates'], dtype='datetime64[D]')
+            return forecast
+        return local_forecast(*self.history(record))
+
+    def to_chart(self, record: KeywordMetrics) -> dict:
+        """
+        Chart.js series: 'dates'/'labels' plus aligned 'history', 'prediction',
+        'upper' and 'lower' lists (None outside their segment). Falls back to
+        local_forecast() when the API returned no prediction.
+        """
+        dates, values = self.history(record)
+        forecast = self.forecast(record)
+        f_dates, f_values, f_upper, f_lower = (forecast[k] for k in ('dates', 'values', 'upper', 'lower'))
+
+        n, m = len(dates), len(f_dates)
+        blank_hist, blank_future = np.full(n, np.nan), np.full(m, np.nan)
+        history = np.concatenate([values, blank_future])
+        prediction = np.concatenate([blank_hist, f_values])
+        upper = np.concatenate([blank_hist, f_upper])
+        lower = np.concatenate([blank_hist, f_lower])
+
+        separation_index = n - 1
+        # Connect the lines
+        if n and m:
+            prediction[n - 1] = upper[n - 1] = lower[n - 1] = values[-1]
+
+        def to_list(a):
+            return [None if np.isnan(v) else round(float(v), 2) for v in a]
+
+        all_dates = np.concatenate([dates, f_dates])
+        return {
+            'dates': [str(d) for d in all_dates],
+            'labels': format_labels(all_dates),
+            'history': to_list(history),
+            'prediction': to_list(prediction),
+            'upper': to_list(upper),
+            'lower': to_list(lower),
+            'separation_index': separation_index,
+        }
+
+    def growth(self, record: KeywordMetrics) -> dict:
+        """Week, month and quarter growth (percent) from the stored history."""
+        _, values = self.history(record)
+        return {
+            'week': round(growth_rate(values, 1), 1),
+            'month': round(growth_rate(values, 4), 1),
+            'quarter': round(growth_rate(values, 13), 1),
+        }
+
+    def rank_by_growth(self, keywords: List[str], period: str = 'month') -> List[dict]:
+        """
+        Ranks stored keywords by growth without fetching anything.
+
+        Returns:
+            [{'keyword', 'growth': {...}}] sorted by the chosen period, best first.
+            Keywords with no stored metrics are left out.
+        """
+        records = KeywordMetrics.objects.filter(country=self.country, keyword__in=[k.lower() for k in keywords])
+        ranked = [{'keyword': r.keyword, 'growth': self.growth(r)} for r in records]
+        ranked.sort(key=lambda item: -item['growth'][period])
+        return ranked
@@ -0,0 +1,189 @@
+import warnings
+from typing import Dict, List
+
+import numpy as np
+
+from ..models import ExpandedKeyword, TrendKeyword
+from .metrics_store import FORECAST_WEEKS, KeywordMetricsStore
+
+# Weeks of history each feature looks at
+HISTORY_WEEKS = 52
+SLOPE_WEEKS = 12
+ACCEL_WEEKS = 6
+# Fewer points than this and a slope is treated as 0 (too noisy to trust)
+MIN_SLOPE_POINTS = 6
+
+# Score weights; each term is scaled to 0-1 before weighting
+WEIGHTS = {'slope': 0.40, 'acceleration': 0.20, 'peak': 0.25, 'level': 0.15}
+
+
+def _right_aligned(rows: List[np.ndarray], width: int) -> np.ndarray:
+    """Stacks the last `width` points of each row, left-padded with NaN."""
+    matrix = np.full((len(rows), width), np.nan)
+    for i, row in enumerate(rows):
+        tail = row[-width:]
+        if len(tail):
+            matrix[i, width - len(tail):] = tail
+    return matrix
+
+
+def _slopes(y: np.ndarray) -> np.ndarray:
+    """Least-squares slope per row, ignoring NaN; 0 where fewer than MIN_SLOPE_POINTS."""
+    x = np.arange(y.shape[1], dtype=float)
+    mask = ~np.isnan(y)
+    count = mask.sum(axis=1)
+    safe_count = np.maximum(count, 1)
+    x_mean = np.where(mask, x, 0).sum(axis=1) / safe_count
+    y_mean = np.where(mask, y, 0).sum(axis=1) / safe_count
+    dx = np.where(mask, x - x_mean[:, None], 0)
+    dy = np.where(mask, y - y_mean[:, None], 0)
+    denom = (dx * dx).sum(axis=1)
+    return np.where((count >= MIN_SLOPE_POINTS) & (denom > 0), (dx * dy).sum(axis=1) / np.where(denom > 0, denom, 1), 0.0)
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-x))
+
+
+def momentum_features(histories: List[np.ndarray], forecasts: List[np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Computes momentum features for many keywords at once.
+
+    Args:
+        histories: Weekly normalized values per keyword, oldest first.
+        forecasts: Predicted weekly values per keyword following the history.
+
+    Returns:
+        Arrays (one entry per keyword) of:
+        slope: relative weekly change over the last SLOPE_WEEKS (0.05 = +5%/week)
+        acceleration: recent ACCEL_WEEKS slope minus the previous ACCEL_WEEKS slope
+        seasonality: 0 for flat interest, towards 1 when it is concentrated in a peak
+        peak_weeks: weeks until the predicted peak, NaN when no rise is predicted
+        level: latest value on the 0-100 scale
+    """
+    history = _right_aligned(histories, HISTORY_WEEKS)
+    forecast = _right_aligned([f[:FORECAST_WEEKS] for f in forecasts], FORECAST_WEEKS)
+
+    # All-NaN rows (short histories, no forecast) are expected; they resolve to 0 below
+    with warnings.catch_warnings(), np.errstate(all='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        recent = history[:, -SLOPE_WEEKS:]
+        base = np.maximum(np.nan_to_num(np.nanmean(recent, axis=1)), 1.0)
+        slope = _slopes(recent) / base
+
+        late = _slopes(history[:, -ACCEL_WEEKS:])
+        early = _slopes(history[:, -2 * ACCEL_WEEKS:-ACCEL_WEEKS])
+        acceleration = (late - early) / base
+
+        peak = np.nan_to_num(np.nanmax(history, axis=1))
+        mean = np.nan_to_num(np.nanmean(history, axis=1))
+        seasonality = np.where(peak > 0, 1 - mean / np.where(peak > 0, peak, 1), 0.0)
+
+        level = np.nan_to_num(history[:, -1])
+
+        has_forecast = ~np.isnan(forecast).all(axis=1)
+        forecast_peak = np.where(has_forecast, np.nanmax(np.where(has_forecast[:, None], forecast, 0), axis=1), 0)
+        # Weeks are counted from the first predicted point (1 = next week)
+        peak_index = np.argmax(np.nan_to_num(forecast, nan=-np.inf), axis=1)
+        pad = np.isnan(forecast).sum(axis=1)
+        rising = has_forecast & (forecast_peak > level)
+        peak_weeks = np.where(rising, peak_index - pad + 1, np.nan)
+
+    return {
+        'slope': slope,
+        'acceleration': acceleration,
+        'seasonality': seasonality,
+        'peak_weeks': peak_weeks,
+        'level': level,
+    }
+
+
+def momentum_scores(features: Dict[str, np.ndarray]) -> np.ndarray:
+    """Combines momentum_features() into 0-100 integer scores."""
+    slope = _sigmoid(features['slope'] * 20)
+    acceleration = _sigmoid(features['acceleration'] * 40)
+    # Sooner peaks score higher, and matter more for strongly seasonal keywords
+    proximity = np.where(np.isnan(features['peak_weeks']), 0.0,
+                         1 - np.nan_to_num(features['peak_weeks']) / (FORECAST_WEEKS + 1))
+    peak = proximity * (0.5 + 0.5 * features['seasonality'])
+    level = np.clip(features['level'], 0, 100) / 100
+
+    score = (
+        WEIGHTS['slope'] * slope
+        + WEIGHTS['acceleration'] * acceleration
+        + WEIGHTS['peak'] * peak
+        + WEIGHTS['level'] * level
+    )
+    return np.clip(np.rint(score * 100), 0, 100).astype(int)
+
+
+class MomentumScorer:
+    """
+    Scores keywords on real Trends momentum using the local metrics store,
+    fetching only missing or stale series.
+    """
+
+    def __init__(self, store: KeywordMetricsStore = None, batch_size: int = 50):
+        self.store = store or KeywordMetricsStore()
+        self.batch_size = batch_size
+
+    def score_keywords(self, keywords: List[str], refresh: bool = False) -> Dict[str, dict]:
+        """
+        Returns:
+            {keyword_lower: {'score': int, 'slope', 'acceleration', 'seasonality',
+            'peak_weeks', 'level'}}. Keywords without trend data are left out.
+        """
+        keywords = list(dict.fromkeys(k.lower() for k in keywords if k))
+        results = {}
+        for start in range(0, len(keywords), self.batch_size):
+            batch = keywords[start:start + self.batch_size]
+            records = self.store.get_many(batch, refresh=refresh)['records']
+            if not records:
+                continue
+
+            names = list(records)
+            histories = [self.store.history(records[k])[1] for k in names]
+            forecasts = [self.store.forecast(records[k])['values'] for k in names]
+            features = momentum_features(histories, forecasts)
+            scores = momentum_scores(features)
+
+            for i, keyword in enumerate(names):
+                row = {name: float(values[i]) for name, values in features.items()}
+                if np.isnan(row['peak_weeks']):
+                    row['peak_weeks'] = None
+                row['score'] = int(scores[i])
+                results[keyword] = row
+        return results
+
+    def score_project(self, project, refresh: bool = False) -> dict:
+        """
+        Scores the project's trend keywords and expanded keywords and writes
+        the results to TrendKeyword.momentum_score (trend_score keeps the
+        scraped growth %) and ExpandedKeyword.score.
+
+        Returns:
+            {'scored': n, 'missing': n} counted over distinct keywords.
+        """
+        trends = list(TrendKeyword.objects.filter(project=project))
+        expanded = list(ExpandedKeyword.objects.filter(project=project))
+        keywords = {row.keyword.lower() for row in trends + expanded if row.keyword}
+
+        scores = self.score_keywords(sorted(keywords), refresh=refresh)
+
+        trends_to_update = []
+        for row in trends:
+            result = scores.get(row.keyword.lower())
+            if result and row.momentum_score != result['score']:
+                row.momentum_score = result['score']
+                trends_to_update.append(row)
+
+        expanded_to_update = []
+        for row in expanded:
+            result = scores.get(row.keyword.lower())
+            if result and row.score != result['score']:
+                row.score = result['score']
+                expanded_to_update.append(row)
+
+        TrendKeyword.objects.bulk_update(trends_to_update, ['momentum_score'], batch_size=500)
+        ExpandedKeyword.objects.bulk_update(expanded_to_update, ['score'], batch_size=500)
+        return {'scored': len(scores), 'missing': len(keywords) - len(scores)}
@@ -1,15 +1,170 @@
 import asyncio
+import os
+import time
 from typing import List
+from asgiref.sync import sync_to_async
 from bs4 import BeautifulSoup
 import requests
 import re
-from .browser import PinterestBrowser
+from .browser import PinterestBrowser, get_browser_pool
+from .cache import PersistentCache
+
+# Legacy string names accepted for trendsPreset
+PRESET_NAMES = {"growing": "3", "seasonal": "4", "monthly": "1", "yearly": "2"}
+
+# XHR endpoints the Trends table is rendered from
+TRENDS_API_MARKERS = ("top_trends", "trends_filtered")
+
+# Growth column that matches each trendsPreset (1=monthly, 2=yearly, 3=growing, 4=seasonal)
+PRESET_CHANGE_KEYS = {
+    "1": "monthlyChange",
+    "2": "yearlyChange",
+    "3": "weeklyChange",
+    "4": "yearlyChange",
+}
+CHANGE_KEYS = ("weeklyChange", "monthlyChange", "yearlyChange")
+TERM_KEYS = ("term", "keyword", "query", "name")
+VOLUME_KEYS = ("volume", "searchVolume", "normalizedCount")
+
+TRENDS_TABLE_SELECTOR = 'div[data-test-id="trends-table-term"]'
+
+# Suggestion chip selectors, most specific first. They are raced, so whichever
+# renders first wins; ties go to the earlier (or previously winning) entry.
+SUGGESTION_SELECTORS = [
+    '.KvKvqR > div > div',  # Legacy selector (users reported this working)
+    '[data-test-id="guided-search-guide"] div[role="button"]',  # Search bubbles
+    'div[role="button"] .tBJ',  # Common chip class
+    'div[data-test-id="scrollable-container"] div[role="button"]',  # Chips at top of results
+    'a[href*="/search/pins/?q="]',  # Generic pill links
+]
+
+
+def normalize_preset(trend_type) -> str:
+    """Handles both preset numbers and legacy string names."""
+    trend_type = str(trend_type).strip().lower()
+    return PRESET_NAMES.get(trend_type, trend_type)
+
+
+def trends_cache_params(country, trend_type, interests, age, gender) -> dict:
+    """Normalized scrape parameters, so equivalent queries share one cache entry."""
+    interest_ids = re.split(r"%7C|\|", interests or "")
+    return {
+        "country": (country or "US").strip().upper(),
+        "preset": normalize_preset(trend_type),
+        "interests": sorted(i.strip() for i in interest_ids if i.strip()),
+        "age": (age or "").strip(),
+        "gender": (gender or "").strip().lower(),
+    }
+
+
+def suggestions_cache_params(keyword: str) -> dict:
+    return {"keyword": " ".join(keyword.lower().split())}
+
+
+def build_trend_queries(countries: List[str], presets: List[str], interests: str = "",
+                        age: str = "", gender: str = "") -> List[dict]:
+    """Expands countries x presets into get_top_trends kwargs sharing the same filters."""
+    return [
+        {"country": country, "trend_type": preset, "interests": interests, "age": age, "gender": gender}
+        for country in dict.fromkeys(countries)
+        for preset in dict.fromkeys(presets)
+    ]
+
+
+def _find_trend_rows(data):
+    """Returns the first list of term dicts found anywhere in a Trends API payload."""
+    if isinstance(data, list):
+        if data and all(isinstance(item, dict) for item in data) and any(k in data[0] for k in TERM_KEYS):
+            return data
+        for item in data:
+            rows = _find_trend_rows(item)
+            if rows:
+                return rows
+    elif isinstance(data, dict):
+        for value in data.values():
+            rows = _find_trend_rows(value)
+            if rows:
+                return rows
+    return []
+
+
+def _as_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_trends_payload(data, preset: str = "3") -> List[dict]:
+    """Converts a captured Trends API payload into [{'keyword', 'score', 'volume'}].
+    
+    `score` is the growth % for the preset's window (what the table shows),
+    `volume` a compact label suitable for TrendKeyword.volume.
+    """
+    trends = []
+    for row in _find_trend_rows(data):
+        keyword = next((str(row[k]).strip() for k in TERM_KEYS if row.get(k)), "")
+        if not keyword:
+            continue
+
+        changes = {k: _as_number(row.get(k)) for k in CHANGE_KEYS}
+        primary = changes.get(PRESET_CHANGE_KEYS.get(str(preset), "weeklyChange"))
+        if primary is None:
+            primary = next((v for v in changes.values() if v is not None), None)
+        if primary is None:
+            primary = _as_number(row.get("score")) or 0
+
+        volume = next((row[k] for k in VOLUME_KEYS if row.get(k) is not None), None)
+        if volume is None:
+            volume = " / ".join(
+                f"{k[0].upper()} {v:+.0f}%" for k, v in changes.items() if v is not None
+            )
+
+        trends.append({
+            "keyword": keyword,
+            "score": int(round(primary)),
+            "volume": str(volume)[:50],
+        })
+    return trends
+
 
 class PinterestScraperService:
-    def __init__(self, headless: bool = False):
+    def __init__(self, headless: bool = False, use_pool: bool = True, trends_mode: str = "network",
+                 block_profile="scrape", jitter: tuple = None):
         self.headless = headless
+        # Requests aborted on scrape pages (see BLOCK_PROFILES); None loads everything
+        self.block_profile = block_profile
+        # Optional (min, max) human-like pause after each navigation
+        self.jitter = jitter
+        # 'network' reads the Trends API response; 'dom' parses the rendered table
+        self.trends_mode = trends_mode
+        # Warm Chromium instances shared across scrapes in this process
+        self.pool = get_browser_pool(headless=headless) if use_pool else None
+
+        # Scrape results shared across projects, keyed on normalized parameters
+        ttl = int(os.getenv("SCRAPE_CACHE_TTL", "86400"))
+        max_entries = int(os.getenv("SCRAPE_CACHE_MAX_ENTRIES", "2000"))
+        self.trends_cache = PersistentCache("trends", ttl=ttl, max_entries=max_entries)
+        self.suggestions_cache = PersistentCache("suggestions", ttl=ttl, max_entries=max_entries)
 
-    async def get_top_trends(self, country="US", trend_type="3", interests="", age="", gender="") -> List[dict]:
+    def _new_browser(self) -> PinterestBrowser:
+        return PinterestBrowser(headless=self.headless, pool=self.pool, block_profile=self.block_profile,
+                               jitter=self.jitter)
+
+    async def _run(self, coro):
+        """Pooled browsers live on the pool's loop, so scrapes must run there too."""
+        if self.pool:
+            return await self.pool.run(coro)
+        return await coro
+
+    def cache_stats(self) -> dict:
+        return {
+            "trends": self.trends_cache.stats(),
+            "suggestions": self.suggestions_cache.stats(),
+        }
+
+    async def get_top_trends(self, country="US", trend_type="3", interests="", age="", gender="",
+                             force_refresh: bool = False) -> List[dict]:
         """Scrapes trending keywords from Pinterest Trends.
         
         Args:
@@ -18,17 +173,71 @@ class PinterestScraperService:
             interests: Interest IDs joined by %7C (e.g., '918105274631%7C961238559656')
             age: Age bucket (e.g., '18-24', '25-34')
             gender: Gender filter ('female', 'male', 'unspecified')
+            force_refresh: Skip the scrape cache and overwrite it with fresh results
+        """
+        params = trends_cache_params(country, trend_type, interests, age, gender)
+        if not force_refresh:
+            cached = await sync_to_async(self.trends_cache.get)(params)
+            if cached is not None:
+                print(f"Trends cache hit: {params}")
+                return cached
+
+        trends = await self._run(self._scrape_top_trends(country, trend_type, interests, age, gender))
+        if trends:
+            await sync_to_async(self.trends_cache.set)(params, trends)
+        return trends
+
+    async def get_top_trends_many(self, queries: List[dict], concurrency: int = 3,
+                                  force_refresh: bool = False) -> dict:
+        """Scrapes a grid of Trends queries and merges the results.
+        
+        Args:
+            queries: Dicts of get_top_trends kwargs ('country', 'trend_type',
+                'interests', 'age', 'gender'); see build_trend_queries().
+            concurrency: Queries scraped at once, each in a leased pool context.
+        
+        Returns:
+            {'trends': [{'keyword', 'score', 'volume', 'queries': [query, ...]}],
+             'errors': [{'query': query, 'error': message}]}
+            Keywords are deduplicated case-insensitively; those found by more
+            queries come first, then by score.
         """
-        browser = PinterestBrowser(headless=self.headless)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        errors = []
+
+        async def scrape_one(query):
+            async with semaphore:
+                try:
+                    return await self.get_top_trends(**query, force_refresh=force_refresh)
+                except Exception as e:
+                    print(f"Trends scrape error for {query}: {e}")
+                    errors.append({'query': query, 'error': str(e)})
+                    return []
+
+        batches = await asyncio.gather(*(scrape_one(q) for q in queries))
+
+        merged = {}
+        for query, trends in zip(queries, batches):
+            label = {'country': query.get('country', 'US'), 'preset': normalize_preset(query.get('trend_type', '3'))}
+            for t in trends:
+                key = t['keyword'].lower()
+                entry = merged.get(key)
+                if entry is None:
+                    entry = merged[key] = {**t, 'queries': []}
+                elif t.get('score', 0) > entry.get('score', 0):
+                    entry.update(score=t['score'], volume=t.get('volume', ''))
+                if label not in entry['queries']:
+                    entry['queries'].append(label)
+
+        ranked = sorted(merged.values(), key=lambda t: (-len(t['queries']), -t.get('score', 0)))
+        return {'trends': ranked, 'errors': errors}
+
+    async def _scrape_top_trends(self, country, trend_type, interests, age, gender) -> List[dict]:
+        browser = self._new_browser()
         try:
             await browser.start()
             
-            # Handle both preset numbers and legacy string names
-            preset_map = {"growing": "3", "seasonal": "4", "monthly": "1", "yearly": "2"}
-            if trend_type in preset_map:
-                preset = preset_map[trend_type]
-            else:
-                preset = trend_type  # Already a number
+            preset = normalize_preset(trend_type)
             
             # Build URL with base params
             url = f"https://trends.pinterest.com/search/?country={country}&trendsPreset={preset}"
@@ -42,8 +251,18 @@ class PinterestScraperService:
                 url += f"&gender={gender}"
             
             print(f"Scraping trends from: {url}")
-            await browser.navigate(url)
-            await asyncio.sleep(8) # Wait for table load
+            if self.trends_mode == "network":
+                trends = await self._capture_trends_payload(browser, url, preset)
+                if trends:
+                    print(f"Captured {len(trends)} trends from network payload")
+                    return self._dedupe_trends(trends)
+                print("No trends payload captured, falling back to DOM scrape")
+            else:
+                await browser.navigate(url)
+            
+            if not await browser.wait_for_any([TRENDS_TABLE_SELECTOR], timeout=15, key="trends"):
+                print("Trends table did not render before timeout")
+                return []
             
             html = await browser.get_content()
             soup = BeautifulSoup(html, "html.parser")
@@ -63,67 +282,128 @@ class PinterestScraperService:
                 except:
                     continue
             
-            # Deduplicate
-            unique = []
-            seen = set()
-            for t in trends:
-                if t['keyword'] not in seen:
-                    unique.append(t)
-                    seen.add(t['keyword'])
-            
-            return unique
+            return self._dedupe_trends(trends)
             
         finally:
             await browser.close()
 
-    async def get_suggestions(self, keyword: str) -> List[str]:
+    async def _capture_trends_payload(self, browser: PinterestBrowser, url: str, preset: str, timeout: float = 20) -> List[dict]:
+        """Loads the Trends page and returns as soon as the table's JSON payload arrives."""
+        captured = asyncio.get_running_loop().create_future()
+
+        async def on_response(response):
+            if captured.done() or not any(marker in response.url for marker in TRENDS_API_MARKERS):
+                return
+            try:
+                data = await response.json()
+            except Exception:
+                return
+            trends = parse_trends_payload(data, preset)
+            if trends and not captured.done():
+                captured.set_result(trends)
+
+        browser.page.on("response", on_response)
+        started = time.perf_counter()
+        try:
+            await browser.page.goto(url, wait_until="commit")
+            trends = await asyncio.wait_for(captured, timeout)
+            browser.record_timing(url, started)
+            return trends
+        except asyncio.TimeoutError:
+            return []
+        finally:
+            browser.page.remove_listener("response", on_response)
+
+    def _dedupe_trends(self, trends: List[dict]) -> List[dict]:
+        unique = []
+        seen = set()
+        for t in trends:
+            if t['keyword'] not in seen:
+                unique.append(t)
+                seen.add(t['keyword'])
+        return unique
+
+    async def get_suggestions(self, keyword: str, force_refresh: bool = False) -> List[str]:
         """Scrapes suggestions for a specific keyword."""
-        browser = PinterestBrowser(headless=self.headless)
+        batch = await self.get_suggestions_many([keyword], concurrency=1, force_refresh=force_refresh)
+        if keyword in batch['errors']:
+            print(f"Suggestion scrape error: {batch['errors'][keyword]}")
+        return batch['results'].get(keyword, [])
+
+    async def get_suggestions_many(self, keywords: List[str], concurrency: int = 4,
+                                   force_refresh: bool = False) -> dict:
+        """Scrapes suggestions for several keywords at once.
+        
+        Cached keywords are answered without a browser; the rest run up to
+        `concurrency` pages in parallel, each in its own leased context.
+        
+        Returns:
+            {'results': {keyword: [suggestions]}, 'errors': {keyword: error message}}
+        """
+        keywords = list(dict.fromkeys(keywords))
+        results = {}
+        if not force_refresh:
+            for keyword in keywords:
+                cached = await sync_to_async(self.suggestions_cache.get)(suggestions_cache_params(keyword))
+                if cached is not None:
+                    results[keyword] = cached
+
+        misses = [kw for kw in keywords if kw not in results]
+        if misses:
+            print(f"Suggestions cache: {len(results)} hits, {len(misses)} to scrape")
+            try:
+                scraped = await self._run(self._scrape_suggestions_many(misses, concurrency))
+            except Exception as e:
+                return {'results': results, 'errors': {kw: str(e) for kw in misses}}
+
+            for keyword, suggestions in scraped['results'].items():
+                if suggestions:
+                    await sync_to_async(self.suggestions_cache.set)(suggestions_cache_params(keyword), suggestions)
+            results.update(scraped['results'])
+            return {'results': results, 'errors': scraped['errors']}
+
+        return {'results': results, 'errors': {}}
+
+    async def _scrape_suggestions_many(self, keywords: List[str], concurrency: int) -> dict:
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        results = {}
+        errors = {}
+
+        async def scrape_one(keyword):
+            async with semaphore:
+                try:
+                    results[keyword] = await self._scrape_suggestions(keyword)
+                except Exception as e:
+                    print(f"Suggestion scrape error for '{keyword}': {e}")
+                    errors[keyword] = str(e)
+
+        await asyncio.gather(*(scrape_one(kw) for kw in dict.fromkeys(keywords)))
+        return {'results': results, 'errors': errors}
+
+    async def _scrape_suggestions(self, keyword: str) -> List[str]:
+        browser = self._new_browser()
         try:
             await browser.start()
             url = f"https://www.pinterest.com/search/pins/?q={keyword}&rs=typed"
             print(f"Scraping suggestions for: {keyword}")
             
             await browser.navigate(url)
-            await asyncio.sleep(4)
             
             if not browser.page: return []
             
-            suggestions = []
+            winner = await browser.wait_for_any(SUGGESTION_SELECTORS, timeout=10, key="suggestions")
+            print(f"Suggestion selector matched first: {winner}")
             
-            # Selector logic - Updated for reliability
-            
-            # Selector 0: Legacy selector (users reported this working)
-            results = browser.page.locator('.KvKvqR > div > div') 
-            count = await results.count()
-            print(f"Selector 0 (.KvKvqR > div > div) found: {count}")
-
-            if count == 0:
-                # Selector 1: Common class for search bubbles (Target chilren buttons)
-                results = browser.page.locator('[data-test-id="guided-search-guide"] div[role="button"]') 
+            # Count the winner first, then the rest in priority order in case it detached
+            candidates = [winner] + [s for s in SUGGESTION_SELECTORS if s != winner] if winner else []
+            count = 0
+            for selector in candidates:
+                results = browser.page.locator(selector)
                 count = await results.count()
-                print(f"Selector 1 (guided-search-guide buttons) found: {count}")
-            
-            if count == 0:
-                 # Selector 2: Fallback to common class
-                 # Often these are in a scrollable container at top
-                 results = browser.page.locator('div[role="button"] .tBJ') 
-                 count = await results.count()
-                 print(f"Selector 2 (div role=button .tBJ) found: {count}")
-
-            if count == 0:
-                 # Selector 3: Try looking for text within specific container types
-                 # This targets the chips at the top of search results
-                 results = browser.page.locator('div[data-test-id="scrollable-container"] div[role="button"]')
-                 count = await results.count()
-                 print(f"Selector 3 (scrollable container buttons) found: {count}")
-            
-            # Selector 4: Fallback for generic pill buttons (if nothing else matched)
-            if count == 0:
-                results = browser.page.locator('a[href*="/search/pins/?q="]')
-                count = await results.count()
-                print(f"Selector 4 (search links) found: {count}")
-
+                print(f"Selector ({selector}) found: {count}")
+                if count:
+                    break
+            
             suggestions = []
             for i in range(count):
                 try:
@@ -150,8 +430,5 @@ class PinterestScraperService:
             print(f"Total unique suggestions found: {len(set(suggestions))}")
             return list(dict.fromkeys(suggestions))
             
-        except Exception as e:
-            print(f"Suggestion scrape error: {e}")
-            return []
         finally:
             await browser.close()
@@ -1,80 +1,117 @@
-import requests
-import json
+import os
+import threading
+import time
 from datetime import datetime, timedelta
+from urllib.parse import quote_plus
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Pinterest publishes Trends data weekly, keyed on a Friday end date
+FRIDAY_FALLBACKS = 4
+
+_session = None
+_session_lock = threading.Lock()
+
+# endpoint -> (friday, remembered_at); the last end date that returned data
+_good_fridays = {}
+_fridays_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Shared keep-alive session with retry/backoff on throttling and server errors."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=int(os.getenv("PREDICTION_HTTP_RETRIES", "3")),
+                backoff_factor=float(os.getenv("PREDICTION_HTTP_BACKOFF", "0.5")),
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET"]),
+                respect_retry_after_header=True,
+            )
+            adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=16)
+            session = requests.Session()
+            session.headers.update(HEADERS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def get_last_friday(date):
+    days_behind = (date.weekday() - 4) % 7
+    return date - timedelta(days=days_behind)
+
 
 class PredictionService:
-    def fetch_trends_data(self, keyword):
-        # Calculate dates (dynamic based on current time)
-        # The legacy code used hardcoded dates, let's make it relative to now for "future prediction" context
-        # However, the URL parameters in legacy were specific: end_date=2026-01-30, days=365, etc.
-        # Let's stick reasonably close to the legacy URL structure but maybe update the end_date if needed to be "current"
-        # actually, the legacy URL has predicted_days=91, implies it gets future data.
-        
-        # Let's try to use a recent date or just the raw URL structure from legacy if it works.
-        # The user said "legacy/test_prediction_fetch.py" has the logic.
-        
-        
-        def get_last_friday(date):
-            days_behind = (date.weekday() - 4) % 7
-            return date - timedelta(days=days_behind)
-
-        # Start from the most recent Friday
-        current_date = get_last_friday(datetime.now())
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-
-        from urllib.parse import quote_plus
-        encoded_keyword = quote_plus(keyword)
-        
-        # Try up to 4 previous Fridays
-        for _ in range(4):
-            end_date_str = current_date.strftime('%Y-%m-%d')
-            url = f"https://trends.pinterest.com/metrics/?terms={encoded_keyword}&country=US&end_date={end_date_str}&days=365&aggregation=2&shouldMock=false&normalize_against_group=true&predicted_days=91"
-            
+    def __init__(self):
+        self.session = get_session()
+        # (connect, read) seconds
+        self.timeout = (
+            float(os.getenv("PREDICTION_CONNECT_TIMEOUT", "5")),
+            float(os.getenv("PREDICTION_READ_TIMEOUT", "20")),
+        )
+        # How long a known-good Friday is trusted before the newest one is tried again
+        self.friday_ttl = int(os.getenv("PREDICTION_FRIDAY_TTL", "21600"))
+
+    def _candidate_fridays(self, endpoint):
+        """Fridays to try, newest first, with the last one that worked moved to the front."""
+        current_date = get_last_friday(datetime.now()).date()
+        fridays = [current_date - timedelta(weeks=i) for i in range(FRIDAY_FALLBACKS)]
+
+        with _fridays_lock:
+            remembered = _good_fridays.get(endpoint)
+        if remembered:
+            friday, remembered_at = remembered
+            if friday in fridays and time.time() - remembered_at < self.friday_ttl:
+                fridays.remove(friday)
+                fridays.insert(0, friday)
+        return fridays
+
+    def _remember_friday(self, endpoint, friday):
+        with _fridays_lock:
+            _good_fridays[endpoint] = (friday, time.time())
+
+    def _walk_fridays(self, endpoint, build_url, accept):
+        """GETs build_url(end_date) for each candidate Friday until accept(data) returns a value."""
+        for friday in self._candidate_fridays(endpoint):
+            end_date_str = friday.strftime('%Y-%m-%d')
             try:
-                resp = requests.get(url, headers=headers)
+                resp = self.session.get(build_url(end_date_str), timeout=self.timeout)
                 if resp.status_code == 200:
-                    data = resp.json()
-                    if isinstance(data, list) and len(data) > 0:
-                        return data[0]
+                    result = accept(resp.json())
+                    if result:
+                        self._remember_friday(endpoint, friday)
+                        return result
             except Exception as e:
-                print(f"Error fetching for date {end_date_str}: {e}")
-            
-            # If failed, go back one week
-            current_date -= timedelta(weeks=1)
-            
+                print(f"Error fetching {endpoint} for date {end_date_str}: {e}")
         return None
 
+    def fetch_trends_data(self, keyword, days: int = 365):
+        """Fetch the metrics series (with prediction) for a keyword over the last `days` days."""
+        encoded_keyword = quote_plus(keyword)
+
+        def build_url(end_date_str):
+            return f"https://trends.pinterest.com/metrics/?terms={encoded_keyword}&country=US&end_date={end_date_str}&days={days}&aggregation=2&shouldMock=false&normalize_against_group=true&predicted_days=91"
+
+        def accept(data):
+            if isinstance(data, list) and len(data) > 0:
+                return data[0]
+            return None
+
+        return self._walk_fridays("metrics", build_url, accept)
+
     def fetch_related_terms(self, keyword):
         """Fetch related terms from Pinterest Trends API."""
-        def get_last_friday(date):
-            days_behind = (date.weekday() - 4) % 7
-            return date - timedelta(days=days_behind)
+        encoded_keyword = quote_plus(keyword)
 
-        current_date = get_last_friday(datetime.now())
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
+        def build_url(end_date_str):
+            return f"https://trends.pinterest.com/related_terms/?requestTerm={encoded_keyword}&country=US&endDate={end_date_str}&aggregation=2&lookback=365&shouldMock=false"
 
-        from urllib.parse import quote_plus
-        encoded_keyword = quote_plus(keyword)
-        
-        for _ in range(4):
-            end_date_str = current_date.strftime('%Y-%m-%d')
-            url = f"https://trends.pinterest.com/related_terms/?requestTerm={encoded_keyword}&country=US&endDate={end_date_str}&aggregation=2&lookback=365&shouldMock=false"
-            
-            try:
-                resp = requests.get(url, headers=headers)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    if data:
-                        return data
-            except Exception as e:
-                print(f"Error fetching related terms for date {end_date_str}: {e}")
-            
-            current_date -= timedelta(weeks=1)
-            
-        return None
+        return self._walk_fridays("related_terms", build_url, lambda data: data or None)
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Requests per minute when no <PROVIDER>_RPM env var is set
+DEFAULT_RPM = {
+    'openrouter': 60,
+}
+
+# Calls in flight at once when no <PROVIDER>_MAX_CONCURRENT env var is set
+DEFAULT_MAX_CONCURRENT = {
+    'gemini': 3,
+    'together': 8,
+}
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by every caller of one provider.
+
+    `rpm` requests are allowed per minute with bursts of up to `burst`;
+    acquire() blocks until a token is available. rpm <= 0 disables limiting.
+    """
+
+    def __init__(self, rpm: float, burst: int = None):
+        self.rpm = rpm
+        self.capacity = burst or max(1, int(rpm // 10) if rpm > 0 else 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rpm <= 0:
+            return
+        rate = self.rpm / 60.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / rate
+            time.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """Process-wide limiter for `provider`, configured by <PROVIDER>_RPM (0 disables)."""
+    with _limiters_lock:
+        if provider not in _limiters:
+            rpm = float(os.getenv(f"{provider.upper()}_RPM", DEFAULT_RPM.get(provider, 0)))
+            _limiters[provider] = RateLimiter(rpm)
+        return _limiters[provider]
+
+
+_semaphores = {}
+_semaphores_lock = threading.Lock()
+
+
+def get_concurrency_limit(provider: str):
+    """
+    Process-wide cap on calls in flight to `provider`, configured by
+    <PROVIDER>_MAX_CONCURRENT (0 disables). Use as a context manager.
+    """
+    with _semaphores_lock:
+        if provider not in _semaphores:
+            limit = int(os.getenv(f"{provider.upper()}_MAX_CONCURRENT", DEFAULT_MAX_CONCURRENT.get(provider, 0)))
+            _semaphores[provider] = threading.BoundedSemaphore(limit) if limit > 0 else nullcontext()
+        return _semaphores[provider]
@@ -0,0 +1,139 @@
+from typing import List
+from django.db import transaction
+from ..models import TrendKeyword, TrendSnapshot, TrendSnapshotEntry
+
+
+class TrendHistoryService:
+    """
+    Records Trends scrapes as snapshots and keeps a project's working set of
+    TrendKeyword rows in step with the latest one.
+
+    Keywords are matched case-insensitively. Rows for keywords that are still
+    trending are updated in place, so their ids and selection survive a rescrape.
+    """
+
+    def __init__(self, project):
+        self.project = project
+
+    def record(self, trends: List[dict], queries: List[dict] = None):
+        """
+        Stores a snapshot of `trends` (in rank order) and diffs it against the
+        previous one.
+
+        Returns:
+            (snapshot, diff) where diff is the result of diff_entries().
+
+        Raises:
+            ValueError: `trends` is empty (a failed scrape, not a real result).
+        """
+        if not trends:
+            raise ValueError("Refusing to record an empty trends scrape")
+        previous = self.project.trend_snapshots.first()
+        previous_entries = list(previous.entries.all()) if previous else []
+
+        with transaction.atomic():
+            snapshot = TrendSnapshot.objects.create(
+                project=self.project,
+                queries=queries or [],
+                keyword_count=len(trends),
+            )
+            entries = TrendSnapshotEntry.objects.bulk_create([
+                TrendSnapshotEntry(
+                    snapshot=snapshot,
+                    keyword=t['keyword'],
+                    rank=i,
+                    score=t.get('score', 0),
+                    volume=t.get('volume', ''),
+                )
+                for i, t in enumerate(trends, start=1)
+            ])
+
+        return snapshot, self.diff_entries(previous_entries, entries, has_previous=previous is not None)
+
+    @staticmethod
+    def diff_entries(previous: List[TrendSnapshotEntry], current: List[TrendSnapshotEntry],
+                     has_previous: bool = True) -> dict:
+        """
+        Compares two snapshots' entries by keyword.
+
+        Returns:
+            {'new': [keyword], 'dropped': [keyword],
+             'moved': [{'keyword', 'from', 'to', 'delta'}],
+             'changes': {keyword_lower: {'status': 'new'|'moved'|'same', 'delta': int}}}
+            A positive delta means the keyword climbed. With no previous
+            snapshot nothing is reported as new.
+        """
+        before = {e.keyword.lower(): e for e in previous}
+        after = {e.keyword.lower(): e for e in current}
+
+        diff = {'new': [], 'dropped': [], 'moved': [], 'changes': {}}
+        for key, entry in after.items():
+            old = before.get(key)
+            if old is None:
+                if has_previous:
+                    diff['new'].append(entry.keyword)
+                    diff['changes'][key] = {'status': 'new', 'delta': 0}
+                continue
+            delta = old.rank - entry.rank
+            if delta:
+                diff['moved'].append({'keyword': entry.keyword, 'from': old.rank, 'to': entry.rank, 'delta': delta})
+                diff['changes'][key] = {'status': 'moved', 'delta': delta}
+            else:
+                diff['changes'][key] = {'status': 'same', 'delta': 0}
+        diff['dropped'] = [e.keyword for key, e in before.items() if key not in after]
+        diff['moved'].sort(key=lambda m: -abs(m['delta']))
+        return diff
+
+    def sync_working_set(self, trends: List[dict]) -> dict:
+        """
+        Upserts the project's TrendKeyword rows from a scrape.
+
+        Existing rows are bulk-updated, new keywords bulk-created, and rows no
+        longer trending are removed unless the user selected them (or added
+        them by hand as selected).
+
+        Returns:
+            {'created': n, 'updated': n, 'deleted': n}
+
+        Raises:
+            ValueError: `trends` is empty; syncing it would delete every
+            unselected keyword.
+        """
+        if not trends:
+            raise ValueError("Refusing to sync the working set from an empty trends scrape")
+        existing, duplicate_ids = {}, []
+        for row in self.project.trends.order_by('-selected', 'id'):
+            key = row.keyword.lower()
+            if key in existing:
+                duplicate_ids.append(row.id)
+            else:
+                existing[key] = row
+
+        to_create, to_update, seen = [], [], set()
+        for t in trends:
+            key = t['keyword'].lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            score, volume, sources = t.get('score', 0), t.get('volume', ''), t.get('queries', [])
+            row = existing.get(key)
+            if row is None:
+                to_create.append(TrendKeyword(
+                    project=self.project,
+                    keyword=t['keyword'],
+                    trend_score=score,
+                    volume=volume,
+                    sources=sources,
+                ))
+            elif (row.trend_score, row.volume, row.sources) != (score, volume, sources):
+                row.trend_score, row.volume, row.sources = score, volume, sources
+                to_update.append(row)
+
+        stale_ids = duplicate_ids + [row.id for key, row in existing.items() if key not in seen and not row.selected]
+
+        with transaction.atomic():
+            TrendKeyword.objects.bulk_create(to_create)
+            TrendKeyword.objects.bulk_update(to_update, ['trend_score', 'volume', 'sources'])
+            deleted, _ = TrendKeyword.objects.filter(id__in=stale_ids).delete()
+
+        return {'created': len(to_create), 'updated': len(to_update), 'deleted': deleted}
@@ -0,0 +1,133 @@
+import io
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator, List, Tuple, Union
+
+import requests
+
+CHUNK_SIZE = 64 * 1024
+EXTENSIONS = {'image/jpeg': '.jpg', 'image/jpg': '.jpg', 'image/webp': '.webp', 'image/png': '.png'}
+
+
+class _Sink(io.RawIOBase):
+    """Unseekable file ZipFile writes into; ZipStream hands its bytes out as they arrive."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        self.size = 0
+        return data
+
+
+class ZipStream:
+    """
+    Builds a ZIP on the fly for a StreamingHttpResponse.
+
+    Files given as bytes are written first; remote images are then downloaded
+    ZIP_DOWNLOAD_CONCURRENCY at a time and each is written as soon as its
+    download finishes, so the first bytes go out right away. Downloads are
+    spooled to temporary files (in memory up to ZIP_SPOOL_BYTES each), which
+    bounds memory to roughly concurrency x spool size regardless of how many
+    images there are. Images that fail are listed in missing.txt.
+    """
+
+    def __init__(self, concurrency: int = None, spool_size: int = None):
+        self.concurrency = concurrency or int(os.getenv("ZIP_DOWNLOAD_CONCURRENCY", "6"))
+        self.spool_size = spool_size or int(os.getenv("ZIP_SPOOL_BYTES", str(2 * 1024 * 1024)))
+        self.files: List[Tuple[str, bytes]] = []
+        self.images: List[Tuple[str, str]] = []
+        self.written = 0
+        self.missing: List[str] = []
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def add_file(self, name: str, data: Union[str, bytes]):
+        self.files.append((name, data.encode('utf-8') if isinstance(data, str) else data))
+
+    def add_image(self, name: str, url: str):
+        """`name` without extension; it is taken from the image's Content-Type."""
+        if url:
+            self.images.append((name, url))
+
+    def _download(self, url: str):
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        try:
+            with self.session.get(url, stream=True, timeout=(10, 30)) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    spool.write(chunk)
+                content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        except Exception:
+            spool.close()
+            raise
+        spool.seek(0)
+        return spool, EXTENSIONS.get(content_type, '.png')
+
+    def __iter__(self) -> Iterator[bytes]:
+        start = time.time()
+        sink = _Sink()
+        archive = zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED)
+
+        for name, data in self.files:
+            archive.writestr(name, data, compress_type=zipfile.ZIP_DEFLATED)
+            yield sink.drain()
+
+        pool = ThreadPoolExecutor(max_workers=max(1, self.concurrency))
+        queued = iter(self.images)
+        in_flight = {}
+
+        def refill():
+            # A sliding window, so finished downloads never pile up unwritten
+            while len(in_flight) < self.concurrency:
+                item = next(queued, None)
+                if item is None:
+                    return
+                in_flight[pool.submit(self._download, item[1])] = item
+
+        try:
+            refill()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, url = in_flight.pop(future)
+                    try:
+                        spool, ext = future.result()
+                    except Exception as e:
+                        print(f"  [✗] ZIP download failed: {url[:80]} - {e}")
+                        self.missing.append(f"{name}: {url}")
+                        continue
+                    with spool, archive.open(zipfile.ZipInfo(name + ext, time.localtime()[:6]), 'w') as entry:
+                        for chunk in iter(lambda: spool.read(CHUNK_SIZE), b''):
+                            entry.write(chunk)
+                            if sink.size >= CHUNK_SIZE:
+                                yield sink.drain()
+                    self.written += 1
+                    yield sink.drain()
+                refill()
+
+            if self.missing:
+                archive.writestr('missing.txt', "Images that could not be downloaded:\n" + "\n".join(self.missing) + "\n")
+            archive.close()
+            yield sink.drain()
+            print(f"🏁 ZIP streamed: {self.written}/{len(self.images)} images in {time.time() - start:.2f}s")
+        finally:
+            # Client gone or error: don't keep downloading for nobody
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,212 @@
+"""
+Background tasks run by the django_q cluster (`python manage.py qcluster`).
+Enqueue with django_q.tasks.async_task('wizard.tasks.<name>', ...).
+"""
+import json
+import traceback
+
+from django.core.files.base import ContentFile
+from django_q.tasks import async_task
+
+from .models import BlogGenerationJob, BlogPost, BlogSection, ImageJob
+from .services.blog_batch import BlogBatchService
+from .services.blog_generator import BlogGeneratorService
+from .services.fal_jobs import FalJobService
+from .services.image_mirror import ImageMirrorService
+
+# Sections assumed while the content is still streaming, for progress estimates
+EXPECTED_SECTIONS = 10
+
+
+class BlogProgress:
+    """
+    on_content/on_ready callbacks for BlogGeneratorService.generate_blog_streamed
+    that save the intro, conclusion and each section as they arrive and keep
+    BlogPost.progress / progress_message current for the status endpoint.
+    """
+
+    def __init__(self, blog_post: BlogPost):
+        self.blog_post = blog_post
+        self.items = []
+        self.images_done = 0
+        self.streaming = True
+
+    def update(self, progress: int, message: str, *fields):
+        self.blog_post.progress = progress
+        self.blog_post.progress_message = message[:200]
+        # updated_at doubles as the heartbeat BlogBatchService uses to spot interrupted blogs
+        self.blog_post.save(update_fields=['progress', 'progress_message', 'updated_at', *fields])
+
+    def _report(self, *fields):
+        # Thumbnail + one image per section; until the stream ends the count is a guess
+        images_total = len(self.items) + 1
+        if self.streaming:
+            images_total = max(images_total, EXPECTED_SECTIONS + 1)
+            message = f"Writing: {len(self.items)} sections so far, {self.images_done} images done"
+        else:
+            message = f"Generating images: {self.images_done}/{images_total}"
+        self.update(10 + int(80 * self.images_done / images_total), message, *fields)
+
+    def on_content(self, kind, value):
+        if kind == 'item':
+            self.items.append(value)
+            self._report()
+            return
+        setattr(self.blog_post, kind, value)
+        if kind == 'conclusion':
+            self.streaming = False
+        self._report(kind)
+
+    def on_ready(self, key, prompt, image_url):
+        self.images_done += 1
+        if key == 'thumbnail':
+            self.blog_post.thumbnail_prompt = prompt
+            self.blog_post.thumbnail_url = image_url
+            self._report('thumbnail_prompt', 'thumbnail_url')
+            return
+
+        i = int(key.split('_')[1])
+        BlogSection.objects.create(
+            blog_post=self.blog_post,
+            order=i + 1,
+            title=self.items[i]['title'],
+            description=self.items[i]['description'],
+            image_url=image_url,
+            image_prompt=prompt
+        )
+        self._report()
+
+
+def export_blog_json(blog_post: BlogPost, generator: BlogGeneratorService):
+    """Writes the blog's Pinterest JSON export file from its current content."""
+    blog_data = {
+        'topic': blog_post.topic,
+        'intro': blog_post.intro,
+        'conclusion': blog_post.conclusion,
+        'thumbnail_url': blog_post.thumbnail_url,
+        'sections': [
+            {
+                'title': section.title,
+                'description': section.description,
+                'image_url': section.image_url
+            }
+            for section in blog_post.sections.all()
+        ]
+    }
+
+    json_data = generator.create_pinterest_json(blog_data)
+    blog_post.json_file.save(
+        f'blog_{blog_post.id}.json',
+        ContentFile(json.dumps(json_data, indent=2)),
+        save=False
+    )
+
+
+def generate_blog(blog_post_id: int, bypass_cache: bool = False, force_new_images: bool = False):
+    """
+    Generates (or regenerates) a BlogPost: streamed content, image prompts and
+    images, sections and the JSON export. Progress and the final state are
+    written to the BlogPost; failures are recorded there rather than raised.
+    """
+    blog_post = BlogPost.objects.select_related('article_idea').get(pk=blog_post_id)
+    article = blog_post.article_idea
+
+    # Start clean, so regenerations and re-run tasks don't mix old sections in,
+    # nor images still on Fal from an earlier run
+    blog_post.sections.all().delete()
+    ImageJob.objects.filter(blog_post=blog_post, status__in=('pending', 'submitted')).update(blog_post=None)
+    blog_post.intro = ""
+    blog_post.conclusion = ""
+    blog_post.thumbnail_url = ""
+    blog_post.thumbnail_prompt = ""
+    blog_post.error_message = ""
+    blog_post.generation_status = 'generating'
+    blog_post.progress = 5
+    blog_post.progress_message = "Writing blog content..."
+    blog_post.save()
+
+    try:
+        generator = BlogGeneratorService(bypass_cache=bypass_cache, force_new_images=force_new_images)
+
+        # Content streams from Gemini and is parsed as it arrives; each section's
+        # image prompt and Fal image job start as soon as the section is complete,
+        # and the thumbnail and sections are saved as their images finish
+        print(f"Generating blog content for: {article.title}")
+        tracker = BlogProgress(blog_post)
+        result = generator.generate_blog_streamed(
+            article.title, on_content=tracker.on_content, on_ready=tracker.on_ready, blog_post=blog_post
+        )
+
+        if not result['items']:
+            raise Exception("No blog sections generated")
+
+        # Generate export files
+        print("Generating export files...")
+        tracker.update(95, "Exporting...")
+        # A thumbnail may have been applied by the webhook meanwhile
+        blog_post.refresh_from_db(fields=['thumbnail_url', 'thumbnail_prompt'])
+        export_blog_json(blog_post, generator)
+
+        blog_post.generation_status = 'completed'
+        blog_post.progress = 100
+        blog_post.progress_message = ""
+        # Only the fields this task owns, so images applied meanwhile aren't overwritten
+        blog_post.save(update_fields=['generation_status', 'progress', 'progress_message', 'json_file', 'updated_at'])
+
+        print(f"✓ Blog generation completed for: {article.title}")
+
+    except Exception as e:
+        print(f"✗ Blog generation failed: {e}")
+        traceback.print_exc()
+
+        blog_post.generation_status = 'failed'
+        blog_post.error_message = str(e)
+        blog_post.progress_message = ""
+        blog_post.save(update_fields=['generation_status', 'error_message', 'progress_message', 'updated_at'])
+
+    # Copy the images off Fal's temporary URLs without holding up the blog
+    if blog_post.generation_status == 'completed':
+        async_task('wizard.tasks.mirror_blog_images', blog_post.id,
+                   task_name=f'mirror-blog-{blog_post.id}', group='image-mirror')
+
+    # Part of a bulk job: start the next blog in line
+    if blog_post.job_id:
+        BlogBatchService(blog_post.project).advance(blog_post.job_id)
+
+    return blog_post.generation_status
+
+
+def advance_blog_jobs():
+    """Advances every unfinished bulk blog job; safe to run on a schedule after a crash."""
+    jobs = BlogGenerationJob.objects.filter(status__in=('queued', 'running')).select_related('project')
+    for job in jobs:
+        BlogBatchService(job.project).advance(job.id)
+    return len(jobs)
+
+
+def poll_image_jobs():
+    """Polls unresolved Fal image jobs (for when the webhook can't reach us); safe to schedule."""
+    return FalJobService().poll_pending()
+
+
+def mirror_images(urls):
+    """Copies generated images to R2 and swaps the stored URLs, see ImageMirrorService."""
+    return len(ImageMirrorService().mirror(urls))
+
+
+def mirror_blog_images(blog_post_id: int):
+    """Mirrors a finished blog's images to R2 and rewrites its JSON export with the new URLs."""
+    blog_post = BlogPost.objects.get(pk=blog_post_id)
+    mirror = ImageMirrorService()
+    mirrored = mirror.mirror(mirror.blog_urls(blog_post))
+    if mirrored:
+        blog_post.refresh_from_db()
+        export_blog_json(blog_post, BlogGeneratorService())
+        blog_post.save(update_fields=['json_file', 'updated_at'])
+    return len(mirrored)
+
+
+def mirror_pending_images(limit: int = 200):
+    """Mirrors stored images still on Fal (backfill, or ones resolved after their page left)."""
+    mirror = ImageMirrorService()
+    return len(mirror.mirror(mirror.pending_urls(limit)))
@@ -1,3 +1,1487 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from . import tasks
+from .models import (
+    ArticleIdea, BlogGenerationJob, BlogPost, BlogSection, CacheEntry, ExpandedKeyword, ImageJob, KeywordMetrics, PinIdea, Project,
+    TrendKeyword, TrendSnapshotEntry,
+)
+from .services import browser as browser_module
+from .services.blog_batch import BlogBatchService
+from .services.browser import BrowserPool, PinterestBrowser
+from .services.blog_generator import BlogGeneratorService, BlogStreamParser
+from .services.cache import PersistentCache
+from .services.content_generator import ContentGeneratorService
+from .services.fal_jobs import FalJobService, webhook_token
+from .services.image_cache import ImageCache
+from .services.image_mirror import ImageMirrorService
+from .services.llm_cache import PROMPT_VERSIONS, LLMCache
+from .services.metrics_store import KeywordMetricsStore, local_forecast, split_counts
+from .services.momentum import MomentumScorer, momentum_features, momentum_scores
+from .services.pinterest_scraper import PinterestScraperService, normalize_preset, parse_trends_payload
+from .services.rate_limit import RateLimiter, get_concurrency_limit
+from .services.trend_history import TrendHistoryService
+from .services.zip_stream import ZipStream
+
+
+class StubFal:
+    """
+    Minimal local stand-in for the Fal queue API: accepts submissions and
+    reports each request as completed (or failed) once `finished` says so.
+    """
+
+    def __init__(self):
+        self.submitted = []  # (path, query, body, Authorization header)
+        self.submit_errors = []  # statuses to answer the next submissions with
+        self.finished = set()
+        self.failing = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                path, _, query = self.path.partition('?')
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                if stub.submit_errors:
+                    self.reply(stub.submit_errors.pop(0), {'detail': 'Try again'})
+                    return
+                stub.submitted.append((path, query, body, self.headers.get('Authorization')))
+                request_id = f"req-{len(stub.submitted)}"
+                base = f"{stub.url}{path}/requests/{request_id}"
+                self.reply(200, {'request_id': request_id, 'status_url': f"{base}/status", 'response_url': base})
+
+            def do_GET(self):
+                parts = self.path.strip('/').split('/')
+                request_id = parts[parts.index('requests') + 1]
+                if parts[-1] == 'status':
+                    done = request_id in stub.finished or request_id in stub.failing
+                    self.reply(200, {'status': 'COMPLETED' if done else 'IN_QUEUE'})
+                elif request_id in stub.failing:
+                    self.reply(422, {'detail': 'Unsafe content'})
+                else:
+                    self.reply(200, {'images': [{'url': f"https://fal.media/{request_id}.png"}]})
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FalJobServiceTests(TestCase):
+    def setUp(self):
+        self.fal = StubFal()
+        self.addCleanup(self.fal.close)
+        env = mock.patch.dict('os.environ', {
+            'FAL_KEY': 'test-key',
+            'FAL_QUEUE_URL': self.fal.url,
+            'FAL_WEBHOOK_BASE_URL': 'https://app.example.com',
+            'FAL_POLL_INTERVAL': '0.01',
+        })
+        env.start()
+        self.addCleanup(env.stop)
+
+        self.project = Project.objects.create(name='Test')
+        self.keyword = ExpandedKeyword.objects.create(project=self.project, keyword='fall outfits')
+        self.pins = [
+            PinIdea.objects.create(project=self.project, expanded_keyword=self.keyword, title=f'Pin {i}', description='d')
+            for i in range(3)
+        ]
+
+    def make_blog(self):
+        article = ArticleIdea.objects.create(project=self.project, expanded_keyword=self.keyword, title='Fall outfits')
+        return BlogPost.objects.create(project=self.project, article_idea=article, topic=article.title)
+
+    def test_submit_stores_request_and_webhook(self):
+        job = FalJobService().submit('a red coat', pin_id=self.pins[0].id)
+
+        self.assertEqual(job.status, 'submitted')
+        self.assertEqual(job.request_id, 'req-1')
+        path, query, body, auth = self.fal.submitted[0]
+        self.assertEqual(path, '/fal-ai/nano-banana')
+        self.assertEqual(body['prompt'], 'a red coat')
+        self.assertEqual(auth, 'Key test-key')
+        self.assertIn(f'fal%2Fwebhook%2F{job.id}%2F', query)
+
+    @mock.patch.object(FalJobService._post.retry, 'sleep', lambda seconds: None)
+    def test_submit_retries_transient_errors(self):
+        self.fal.submit_errors = [429, 503]
+
+        job = FalJobService().submit('a red coat', pin_id=self.pins[0].id)
+
+        self.assertEqual(job.status, 'submitted')
+        self.assertEqual(job.request_id, 'req-1')
+
+    @mock.patch.object(FalJobService._post.retry, 'sleep', lambda seconds: None)
+    def test_submit_fails_fast_on_client_errors(self):
+        self.fal.submit_errors = [422, 422]
+
+        job = FalJobService().submit('a red coat', pin_id=self.pins[0].id)
+
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(self.fal.submit_errors, [422])
+
+    def test_poll_applies_image_to_pin(self):
+        service = FalJobService()
+        job = service.submit('a red coat', pin_id=self.pins[0].id)
+        self.assertEqual(service.poll(job).status, 'submitted')
+
+        self.fal.finished.add(job.request_id)
+        job = service.poll(job)
+
+        self.assertEqual(job.status, 'completed')
+        self.pins[0].refresh_from_db()
+        self.assertEqual(self.pins[0].image_url, 'https://fal.media/req-1.png')
+        self.assertEqual(self.pins[0].image_prompt, 'a red coat')
+
+    def test_poll_records_fal_error(self):
+        service = FalJobService()
+        job = service.submit('a red coat', pin_id=self.pins[0].id)
+        self.fal.failing.add(job.request_id)
+
+        job = service.poll(job)
+
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Unsafe content', job.error_message)
+        self.pins[0].refresh_from_db()
+        self.assertEqual(self.pins[0].image_url, '')
+
+    def test_webhook_resolves_job_once(self):
+        job = FalJobService().submit('a red coat', pin_id=self.pins[0].id)
+        url = reverse('wizard:fal_webhook', args=[job.id]) + f'?token={webhook_token(job.id)}'
+        payload = {'request_id': job.request_id, 'status': 'OK',
+                   'payload': {'images': [{'url': 'https://fal.media/hook.png'}]}}
+
+        response = self.client.post(url, json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.json(), {'status': 'completed'})
+
+        # A late poll result doesn't overwrite it
+        self.fal.finished.add(job.request_id)
+        FalJobService().poll(ImageJob.objects.get(pk=job.pk))
+        self.pins[0].refresh_from_db()
+        self.assertEqual(self.pins[0].image_url, 'https://fal.media/hook.png')
+
+    def test_webhook_rejects_bad_token(self):
+        job = FalJobService().submit('a red coat')
+        url = reverse('wizard:fal_webhook', args=[job.id]) + '?token=nope'
+        response = self.client.post(url, '{}', content_type='application/json')
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(ImageJob.objects.get(pk=job.pk).status, 'submitted')
+
+    def test_poll_pending_resumes_jobs(self):
+        jobs = [FalJobService().submit(f'prompt {i}', pin_id=pin.id) for i, pin in enumerate(self.pins)]
+        self.fal.finished.update({jobs[0].request_id, jobs[1].request_id})
+
+        counts = FalJobService().poll_pending()
+
+        self.assertEqual(counts, {'completed': 2, 'failed': 0, 'pending': 1})
+
+    def test_pin_images_stream_without_blocking_threads(self):
+        # Everything the stub receives is finished right away
+        self.fal.finished.update(f'req-{i}' for i in range(1, 10))
+        generator = BlogGeneratorService()
+        pins = [{'id': pin.id, 'title': pin.title, 'description': pin.description, 'topic': 'fall'} for pin in self.pins]
+
+        with mock.patch.object(BlogGeneratorService, 'generate_image_prompt', return_value='prompt'):
+            results = list(generator.generate_pin_images_streamed(pins, project=self.project))
+
+        self.assertEqual(sorted(r['id'] for r in results), sorted(pin.id for pin in self.pins))
+        self.assertTrue(all(r['image_url'].startswith('https://fal.media/') for r in results))
+        self.assertEqual(PinIdea.objects.filter(project=self.project, image_url='').count(), 0)
+
+    def test_pin_images_left_pending_after_timeout(self):
+        generator = BlogGeneratorService()
+        pins = [{'id': self.pins[0].id, 'title': 't', 'description': 'd', 'topic': 'fall'}]
+
+        with mock.patch.dict('os.environ', {'FAL_WAIT_TIMEOUT': '0'}), \
+                mock.patch.object(BlogGeneratorService, 'generate_image_prompt', return_value='prompt'):
+            results = list(generator.generate_pin_images_streamed(pins))
+
+        self.assertEqual(results[0]['id'], self.pins[0].id)
+        self.assertIn('pending', results[0])
+
+    def test_blog_images_go_through_the_queue(self):
+        self.fal.finished.update(f'req-{i}' for i in range(1, 10))
+        blog = self.make_blog()
+        events = [('intro', 'Intro'), ('item', {'title': 'Coats', 'description': 'c'}),
+                  ('item', {'title': 'Boots', 'description': 'b'}), ('conclusion', 'Bye')]
+        ready = []
+
+        with mock.patch.object(BlogGeneratorService, 'stream_blog_events', return_value=iter(events)), \
+                mock.patch.object(BlogGeneratorService, 'generate_image_prompt', side_effect=lambda **kw: kw['title']):
+            result = BlogGeneratorService().generate_blog_streamed(
+                blog.topic, on_ready=lambda *args: ready.append(args), blog_post=blog)
+
+        self.assertEqual(sorted(key for key, _, _ in ready), ['item_0', 'item_1', 'thumbnail'])
+        self.assertTrue(all(image['image_url'].startswith('https://fal.media/') for image in result['images'].values()))
+        self.assertEqual(sorted(body['aspect_ratio'] for _, _, body, _ in self.fal.submitted), ['16:9', '2:3', '2:3'])
+        self.assertEqual(ImageJob.objects.filter(blog_post=blog, status='completed').count(), 3)
+
+    def test_late_blog_images_applied_to_blog(self):
+        blog = self.make_blog()
+        BlogSection.objects.create(blog_post=blog, order=2, title='Boots', description='b')
+        service = FalJobService()
+        thumbnail = service.submit('cover', aspect_ratio='16:9', blog_post_id=blog.id, blog_key='thumbnail')
+        section = service.submit('boots', blog_post_id=blog.id, blog_key='item_1')
+
+        self.fal.finished.update({thumbnail.request_id, section.request_id})
+        service.poll_pending()
+
+        blog.refresh_from_db()
+        self.assertEqual(blog.thumbnail_url, f'https://fal.media/{thumbnail.request_id}.png')
+        self.assertEqual(blog.sections.get().image_url, f'https://fal.media/{section.request_id}.png')
+        self.assertEqual(blog.sections.get().image_prompt, 'boots')
+
+    def test_late_image_rewrites_completed_blog_export(self):
+        blog = self.make_blog()
+        BlogSection.objects.create(blog_post=blog, order=1, title='Coats', description='c')
+        service = FalJobService()
+        section = service.submit('coats', blog_post_id=blog.id, blog_key='item_0')
+        BlogPost.objects.filter(pk=blog.id).update(generation_status='completed')
+
+        self.fal.finished.add(section.request_id)
+        service.poll(section)
+
+        blog.refresh_from_db()
+        with blog.json_file.open() as f:
+            export = json.load(f)
+        self.assertEqual(export['features'][0]['image_url'], f'https://fal.media/{section.request_id}.png')
+
+    @mock.patch.dict('os.environ', {'R2_BASE_URL': 'https://cdn.example.com'})
+    def test_identical_prompt_reuses_mirrored_image(self):
+        first = FalJobService().submit('a red coat', pin_id=self.pins[0].id)
+        self.fal.finished.add(first.request_id)
+        FalJobService().poll(first)
+        ImageMirrorService.swap('https://fal.media/req-1.png', 'https://cdn.example.com/req-1.png')
+
+        second = FalJobService().submit('a red coat', pin_id=self.pins[1].id)
+
+        self.assertEqual(second.status, 'completed')
+        self.assertEqual(len(self.fal.submitted), 1)
+        self.pins[1].refresh_from_db()
+        self.assertEqual(self.pins[1].image_url, 'https://cdn.example.com/req-1.png')
+        self.assertEqual(ImageCache().stats(), {'entries': 1, 'saved_generations': 1})
+
+    @mock.patch.dict('os.environ', {'R2_BASE_URL': 'https://cdn.example.com'})
+    def test_unmirrored_image_is_not_reused(self):
+        first = FalJobService().submit('a red coat')
+        self.fal.finished.add(first.request_id)
+        FalJobService().poll(first)
+
+        second = FalJobService().submit('a red coat')
+
+        self.assertEqual(second.status, 'submitted')
+        self.assertEqual(len(self.fal.submitted), 2)
+
+    def test_force_new_skips_image_cache(self):
+        first = FalJobService().submit('a red coat')
+        self.fal.finished.add(first.request_id)
+        FalJobService().poll(first)
+
+        second = FalJobService(force_new=True).submit('a red coat')
+
+        self.assertEqual(second.status, 'submitted')
+        self.assertEqual(len(self.fal.submitted), 2)
+
+    @mock.patch('wizard.services.blog_generator.BlogGeneratorService')
+    def test_pin_images_view_passes_force_new(self, generator_class):
+        generator_class.return_value.generate_pin_images_streamed.return_value = iter([])
+        url = reverse('wizard:generate_pin_images', args=[self.project.id])
+
+        for force_new in (False, True):
+            response = self.client.post(url, json.dumps({'pin_ids': [self.pins[0].id], 'force_new': force_new}),
+                                        content_type='application/json')
+            lines = b''.join(response.streaming_content).decode().splitlines()
+
+            self.assertEqual(json.loads(lines[-1])['type'], 'done')
+            self.assertEqual(generator_class.call_args.kwargs['force_new_images'], force_new)
+
+
+@mock.patch.dict('os.environ', {'R2_BASE_URL': 'https://img'})
+class ImageCacheTests(TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = ImageCache()
+        cache.max_entries = 2
+        keys = [ImageCache.make_key('fal-ai/nano-banana', f'prompt {i}', '2:3') for i in range(3)]
+        cache.store(keys[0], 'https://img/0.png', 'fal-ai/nano-banana', 'prompt 0', '2:3')
+        cache.store(keys[1], 'https://img/1.png', 'fal-ai/nano-banana', 'prompt 1', '2:3')
+        self.assertEqual(cache.lookup(keys[0]), 'https://img/0.png')
+
+        cache.store(keys[2], 'https://img/2.png', 'fal-ai/nano-banana', 'prompt 2', '2:3')
+
+        self.assertIsNone(cache.lookup(keys[1]))
+        self.assertEqual(cache.lookup(keys[0]), 'https://img/0.png')
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_key_covers_aspect_ratio(self):
+        self.assertNotEqual(
+            ImageCache.make_key('fal-ai/nano-banana', 'a red coat', '2:3'),
+            ImageCache.make_key('fal-ai/nano-banana', 'a red coat', '16:9'),
+        )
+
+
+class StubCDN:
+    """
+    Local image host: /expired/... is a 404, /slow/... answers after a
+    delay, .jpg paths are served as JPEG and everything else as PNG. The body
+    is a signature plus the path, so tests can tell images apart.
+    """
+
+    def __init__(self, delay: float = 0.5):
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.startswith('/expired'):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                if self.path.startswith('/slow'):
+                    time.sleep(delay)
+                jpeg = self.path.endswith('.jpg')
+                data = (b'\xff\xd8' if jpeg else b'\x89PNG') + self.path.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg' if jpeg else 'image/png')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ImageMirrorTests(TestCase):
+    def setUp(self):
+        cdn = StubCDN()
+        self.addCleanup(cdn.close)
+        self.cdn = cdn.url
+
+        self.mirror = ImageMirrorService()
+        self.mirror.s3.s3 = object()  # configured
+        self.mirror.s3.base_url = 'https://r2.example.com'
+        self.uploads = {}
+
+        def upload_file(file_obj, filename, content_type=None):
+            self.uploads[filename] = (file_obj.read(), content_type)
+            return f"https://r2.example.com/{filename}"
+        self.mirror.s3.upload_file = upload_file
+
+        project = Project.objects.create(name='Test')
+        keyword = ExpandedKeyword.objects.create(project=project, keyword='fall outfits')
+        article = ArticleIdea.objects.create(project=project, expanded_keyword=keyword, title='Fall outfits')
+        self.image_url = f"{self.cdn}/files/a.png"
+        self.blog = BlogPost.objects.create(
+            project=project, article_idea=article, topic='Fall outfits', intro='', conclusion='',
+            thumbnail_url=f"{self.cdn}/files/thumb.png", generation_status='completed',
+            structured_content={'images': [self.image_url]},
+        )
+        BlogSection.objects.create(blog_post=self.blog, order=1, title='One', description='d', image_url=self.image_url)
+        self.pin = PinIdea.objects.create(project=project, expanded_keyword=keyword, title='Pin', description='d',
+                                          image_url=self.image_url)
+
+    def test_mirror_swaps_stored_urls(self):
+        mirrored = self.mirror.mirror(self.mirror.blog_urls(self.blog))
+
+        self.assertEqual(set(mirrored), {self.blog.thumbnail_url, self.image_url})
+        self.assertEqual(self.uploads['a.png'], (b'\x89PNG/files/a.png', 'image/png'))
+        self.blog.refresh_from_db()
+        self.pin.refresh_from_db()
+        self.assertEqual(self.blog.thumbnail_url, 'https://r2.example.com/thumb.png')
+        self.assertEqual(self.blog.sections.get().image_url, 'https://r2.example.com/a.png')
+        self.assertEqual(self.pin.image_url, 'https://r2.example.com/a.png')
+        self.assertEqual(self.blog.structured_content, {'images': ['https://r2.example.com/a.png']})
+        self.assertEqual(self.mirror.pending_urls(), [])
+
+    def test_failed_download_keeps_original_url(self):
+        expired = f"{self.cdn}/expired/b.png"
+        self.pin.image_url = expired
+        self.pin.save()
+
+        self.assertEqual(self.mirror.mirror([expired, 'https://r2.example.com/c.png']), {})
+        self.pin.refresh_from_db()
+        self.assertEqual(self.pin.image_url, expired)
+        self.assertEqual(self.uploads, {})
+
+
+class ZipStreamTests(TestCase):
+    def setUp(self):
+        self.cdn = StubCDN(delay=0.5)
+        self.addCleanup(self.cdn.close)
+
+    def test_entries_stream_as_downloads_finish(self):
+        zip_stream = ZipStream(concurrency=3)
+        zip_stream.add_file('content.json', '{}')
+        zip_stream.add_image('slow', f"{self.cdn.url}/slow/a.png")
+        zip_stream.add_image('fast', f"{self.cdn.url}/files/b.jpg")
+        zip_stream.add_image('gone', f"{self.cdn.url}/expired/c.png")
+
+        start = time.monotonic()
+        chunks, first_image_at = [], None
+        for chunk in zip_stream:
+            chunks.append(chunk)
+            if first_image_at is None and zip_stream.written:
+                first_image_at = time.monotonic() - start
+
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        self.assertIsNone(archive.testzip())
+        # The fast image goes out before the slow one has even finished downloading
+        self.assertEqual(archive.namelist(), ['content.json', 'fast.jpg', 'slow.png', 'missing.txt'])
+        self.assertLess(first_image_at, 0.4)
+        self.assertEqual(archive.read('fast.jpg'), b'\xff\xd8/files/b.jpg')
+        self.assertIn('expired/c.png', archive.read('missing.txt').decode())
+
+    def test_download_blog_images_view(self):
+        project = Project.objects.create(name='Test')
+        keyword = ExpandedKeyword.objects.create(project=project, keyword='fall outfits')
+        article = ArticleIdea.objects.create(project=project, expanded_keyword=keyword, title='Fall outfits')
+        blog = BlogPost.objects.create(project=project, article_idea=article, topic='Fall outfits',
+                                       intro='', conclusion='', generation_status='completed')
+        for i in range(1, 4):
+            BlogSection.objects.create(blog_post=blog, order=i, title=f'S{i}', description='d',
+                                       image_url=f"{self.cdn.url}/files/{i}.png")
+
+        response = self.client.get(reverse('wizard:download_blog_images', args=[blog.id]))
+
+        self.assertTrue(response.streaming)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(sorted(archive.namelist()), ['section_1.png', 'section_2.png', 'section_3.png'])
+
+        response = self.client.get(reverse('wizard:export_zip', args=[project.id]))
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIn(f'blogs/{blog.id}/section_2.png', archive.namelist())
+        self.assertIn('content.csv', archive.namelist())
+
+
+class TrendHistoryTests(TestCase):
+    def setUp(self):
+        self.project = Project.objects.create(name='Test')
+
+    @staticmethod
+    def entries(*keywords):
+        return [TrendSnapshotEntry(keyword=keyword, rank=i) for i, keyword in enumerate(keywords, start=1)]
+
+    def test_diff_entries(self):
+        diff = TrendHistoryService.diff_entries(
+            self.entries('Fall Outfits', 'pumpkin soup', 'cozy cardigans', 'apple pie'),
+            self.entries('apple pie', 'fall outfits', 'Halloween nails', 'pumpkin soup'),
+        )
+
+        self.assertEqual(diff['new'], ['Halloween nails'])
+        self.assertEqual(diff['dropped'], ['cozy cardigans'])
+        # Biggest moves first; matched case-insensitively
+        self.assertEqual(diff['moved'], [
+            {'keyword': 'apple pie', 'from': 4, 'to': 1, 'delta': 3},
+            {'keyword': 'pumpkin soup', 'from': 2, 'to': 4, 'delta': -2},
+            {'keyword': 'fall outfits', 'from': 1, 'to': 2, 'delta': -1},
+        ])
+        self.assertEqual(diff['changes']['halloween nails'], {'status': 'new', 'delta': 0})
+
+    def test_first_snapshot_reports_nothing_new(self):
+        diff = TrendHistoryService.diff_entries([], self.entries('fall outfits'), has_previous=False)
+
+        self.assertEqual(diff['new'], [])
+        self.assertEqual(diff['changes'], {})
+
+    def test_record_diffs_against_previous_snapshot(self):
+        service = TrendHistoryService(self.project)
+        service.record([{'keyword': 'fall outfits'}, {'keyword': 'pumpkin soup'}])
+
+        snapshot, diff = service.record([{'keyword': 'pumpkin soup'}, {'keyword': 'apple pie'}])
+
+        self.assertEqual(snapshot.keyword_count, 2)
+        self.assertEqual(diff['new'], ['apple pie'])
+        self.assertEqual(diff['dropped'], ['fall outfits'])
+
+    def test_empty_scrape_is_rejected(self):
+        TrendKeyword.objects.create(project=self.project, keyword='fall outfits')
+        service = TrendHistoryService(self.project)
+
+        with self.assertRaises(ValueError):
+            service.record([])
+        with self.assertRaises(ValueError):
+            service.sync_working_set([])
+
+        self.assertFalse(self.project.trend_snapshots.exists())
+        self.assertEqual(self.project.trends.count(), 1)
+
+
+def weeks_from(start, count):
+    return np.datetime64(start) + np.arange(count) * np.timedelta64(7, 'D')
+
+
+def trends_payload(start, values, predicted=()):
+    """Trends API counts: weekly `values` from `start`, then (value, upper, lower) predictions."""
+    dates = weeks_from(start, len(values) + len(predicted))
+    counts = [{'date': str(d), 'normalizedCount': v} for d, v in zip(dates, values)]
+    counts += [
+        {'date': str(d), 'normalizedCount': v, 'predictedUpperBoundNormalizedCount': upper,
+         'predictedLowerBoundNormalizedCount': lower}
+        for d, (v, upper, lower) in zip(dates[len(values):], predicted)
+    ]
+    return {'counts': counts}
+
+
+class KeywordMetricsStoreTests(TestCase):
+    def setUp(self):
+        self.store = KeywordMetricsStore(service=mock.Mock())
+
+    def test_merge_stores_history_and_forecast(self):
+        record = KeywordMetrics(keyword='fall outfits')
+        self.store._merge(record, split_counts(trends_payload('2026-01-05', [10, 20, 30], [(40, 50, 30)])))
+
+        dates, values = self.store.history(record)
+        self.assertEqual(list(dates), list(weeks_from('2026-01-05', 3)))
+        self.assertEqual(list(values), [10, 20, 30])
+        self.assertEqual(str(record.last_date), '2026-01-19')
+        self.assertEqual(record.forecast, {'dates': ['2026-01-26'], 'values': [40.0], 'upper': [50.0], 'lower': [30.0]})
+
+    def test_merge_appends_rescaled_to_stored_series(self):
+        record = KeywordMetrics(keyword='fall outfits')
+        self.store._merge(record, split_counts(trends_payload('2026-01-05', [50] * 8)))
+
+        # The new window overlaps the last 4 stored weeks at twice the scale
+        update = trends_payload('2026-02-02', [100, 100, 100, 100, 100, 120], [(140, 160, 120)])
+        self.store._merge(record, split_counts(update))
+
+        dates, values = self.store.history(record)
+        self.assertEqual(list(dates), list(weeks_from('2026-01-05', 10)))
+        self.assertEqual(list(values), [50] * 8 + [50, 60])
+        self.assertEqual(record.forecast['values'], [70.0])
+        self.assertEqual(record.forecast['upper'], [80.0])
+
+    def test_merge_ignores_zero_overlap(self):
+        record = KeywordMetrics(keyword='fall outfits')
+        self.store._merge(record, split_counts(trends_payload('2026-01-05', [15, 20, 25, 20, 0, 0, 0, 0])))
+
+        # A zero ratio would flatten every new week to 0; the scale is left alone instead
+        self.store._merge(record, split_counts(trends_payload('2026-02-02', [30, 30, 30, 35, 40, 45], [(50, 60, 40)])))
+
+        _, values = self.store.history(record)
+        self.assertEqual(list(values[-2:]), [40, 45])
+        self.assertEqual(record.forecast['values'], [50.0])
+
+    def test_merge_matches_overlap_by_date(self):
+        record = KeywordMetrics(keyword='fall outfits')
+        old = split_counts(trends_payload('2026-01-05', [10, 20, 30, 40, 50]))
+        # A week missing from the stored series
+        keep = old['dates'] != np.datetime64('2026-01-19')
+        old.update(dates=old['dates'][keep], values=old['values'][keep])
+        self.store._merge(record, old)
+
+        # Overlaps from 2026-01-12, at twice the scale, with one date repeated
+        update = trends_payload('2026-01-12', [40, 60, 80, 100, 200])
+        update['counts'].insert(2, dict(update['counts'][2], normalizedCount=999))
+        self.store._merge(record, split_counts(update))
+
+        dates, values = self.store.history(record)
+        self.assertEqual(len(dates), len(set(dates.tolist())))
+        self.assertEqual(list(values), [10, 20, 40, 50, 100])
+
+    def test_merge_keeps_values_on_the_0_100_scale(self):
+        record = KeywordMetrics(keyword='fall outfits')
+        self.store._merge(record, split_counts(trends_payload('2026-01-05', [50, 100], [(150, 200, 100)])))
+
+        _, values = self.store.history(record)
+        self.assertEqual(list(values), [25, 50])
+        self.assertEqual(record.forecast['upper'], [100.0])
+
+    def test_local_forecast_extends_linear_trend(self):
+        dates = weeks_from('2026-01-05', 10)
+        forecast = local_forecast(dates, np.arange(10, 60, 5, dtype=float), weeks=3)
+
+        self.assertEqual(list(forecast['dates']), list(weeks_from('2026-03-16', 3)))
+        # Exact fit, so no band
+        np.testing.assert_allclose(forecast['values'], [60, 65, 70])
+        np.testing.assert_allclose(forecast['upper'], forecast['lower'])
+
+        # Clipped to the 0-100 scale
+        steep = local_forecast(dates, np.arange(10, 110, 10, dtype=float), weeks=2)
+        np.testing.assert_allclose(steep['values'], [100, 100])
+
+    def test_local_forecast_needs_three_points(self):
+        forecast = local_forecast(weeks_from('2026-01-05', 2), np.array([10.0, 20.0]))
+
+        self.assertEqual(len(forecast['values']), 0)
+
+
+@mock.patch('wizard.services.metrics_store.KeywordMetricsStore')
+class BulkAnalysisViewTests(TestCase):
+    def setUp(self):
+        self.growth = {}
+
+    def stub(self, store_class):
+        store = store_class.return_value
+        store.get_many.side_effect = lambda keywords, refresh=False: {
+            'records': {k: k for k in keywords}, 'errors': []}
+        store.growth.side_effect = lambda record: {'month': self.growth.get(record, 0)}
+        store.to_chart.side_effect = lambda record: {'dates': [], 'history': [record]}
+        return store
+
+    def test_ranked_order_is_sent_as_a_list(self, store_class):
+        self.stub(store_class)
+        # Integer-like keys would be reordered by a JSON object
+        self.growth = {'2': 5, '10': 30, 'fall outfits': 10}
+
+        response = self.client.get(reverse('wizard:analysis_bulk'), {'keywords': '2,10,fall outfits', 'format': 'json'})
+
+        payload = response.json()
+        self.assertEqual(payload['ranked'], ['10', 'fall outfits', '2'])
+        self.assertEqual(payload['keywords'], ['2', '10', 'fall outfits'])
+        self.assertEqual(payload['omitted'], 0)
+
+    def test_reports_keywords_past_the_limit(self, store_class):
+        store = self.stub(store_class)
+        keywords = [f'keyword {i}' for i in range(103)]
+
+        response = self.client.get(reverse('wizard:analysis_bulk'), {'keywords': ','.join(keywords + keywords[:5])})
+
+        self.assertEqual(len(store.get_many.call_args.args[0]), 100)
+        self.assertContains(response, '3 more keywords omitted')
+
+
+class MomentumTests(TestCase):
+
+    def test_features_match_row_by_row(self):
+        histories = [np.arange(20, 72, dtype=float), np.full(30, 40.0), np.linspace(80, 20, 8), np.array([5.0, 6.0])]
+        forecasts = [np.array([75.0, 80.0, 78.0]), np.array([]), np.array([10.0]), np.array([])]
+
+        together = momentum_features(histories, forecasts)
+        for i in range(len(histories)):
+            alone = momentum_features([histories[i]], [forecasts[i]])
+            for name, values in together.items():
+                np.testing.assert_allclose(values[i:i + 1], alone[name], err_msg=name)
+
+    def test_features(self):
+        features = momentum_features(
+            [np.arange(20, 72, dtype=float), np.full(30, 40.0), np.array([5.0, 6.0])],
+            [np.array([75.0, 80.0, 78.0]), np.array([30.0]), np.array([])],
+        )
+
+        # +1/week against a recent mean of 65.5
+        np.testing.assert_allclose(features['slope'], [1 / 65.5, 0, 0])
+        np.testing.assert_allclose(features['acceleration'], [0, 0, 0], atol=1e-12)
+        np.testing.assert_allclose(features['level'], [71, 40, 6])
+        np.testing.assert_allclose(features['seasonality'], [1 - 45.5 / 71, 0, 1 - 5.5 / 6])
+        # Peak two weeks out; no rise predicted for the others
+        self.assertEqual(features['peak_weeks'][0], 2)
+        self.assertTrue(np.isnan(features['peak_weeks'][1:]).all())
+
+    def test_scores_rank_rising_above_flat_above_falling(self):
+        features = momentum_features(
+            [np.linspace(20, 80, 52), np.full(52, 50.0), np.linspace(80, 20, 52)],
+            [np.linspace(82, 95, 13), np.full(13, 50.0), np.linspace(18, 5, 13)],
+        )
+
+        rising, flat, falling = momentum_scores(features)
+
+        self.assertGreater(rising, flat)
+        self.assertGreater(flat, falling)
+        self.assertTrue(all(0 <= score <= 100 for score in (rising, flat, falling)))
+
+    def test_score_project_keeps_scraped_growth(self):
+        project = Project.objects.create(name='Test')
+        trend = TrendKeyword.objects.create(project=project, keyword='Fall Outfits', trend_score=250)
+        store = KeywordMetricsStore(service=mock.Mock())
+        record = KeywordMetrics(keyword='fall outfits')
+        store._merge(record, split_counts(trends_payload('2026-01-05', list(range(20, 72)))))
+        record.save()
+
+        result = MomentumScorer(store=store).score_project(project)
+
+        trend.refresh_from_db()
+        self.assertEqual(result, {'scored': 1, 'missing': 0})
+        self.assertEqual(trend.trend_score, 250)
+        self.assertIsNotNone(trend.momentum_score)
+        store.service.fetch_trends_data.assert_not_called()
+
+
+class FakeClock:
+    """Stands in for the time module; sleep() just moves the clock."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch('wizard.services.rate_limit.time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_limiter_allows_a_burst_then_paces_to_rpm(self):
+        limiter = RateLimiter(rpm=60, burst=3)
+
+        for _ in range(6):
+            limiter.acquire()
+
+        # Three from the bucket, then one a second
+        self.assertEqual(self.clock.sleeps, [1.0, 1.0, 1.0])
+        self.assertEqual(self.clock.now, 3.0)
+
+    def test_limiter_refills_up_to_the_burst_only(self):
+        limiter = RateLimiter(rpm=120, burst=2)
+        limiter.acquire()
+        limiter.acquire()
+
+        self.clock.now += 60
+        for _ in range(3):
+            limiter.acquire()
+
+        self.assertEqual(self.clock.sleeps, [0.5])
+
+    def test_zero_rpm_disables_limiting(self):
+        limiter = RateLimiter(rpm=0)
+        for _ in range(100):
+            limiter.acquire()
+        self.assertEqual(self.clock.sleeps, [])
+
+    @mock.patch.dict('os.environ', {'CAPTEST_MAX_CONCURRENT': '2', 'NOCAPTEST_MAX_CONCURRENT': '0'})
+    def test_concurrency_limit_caps_calls_in_flight(self):
+        limit = get_concurrency_limit('captest')
+        self.assertIs(get_concurrency_limit('captest'), limit)
+        lock = threading.Lock()
+        in_flight, peak = [0], [0]
+
+        def call(_):
+            with limit:
+                with lock:
+                    in_flight[0] += 1
+                    peak[0] = max(peak[0], in_flight[0])
+                threading.Event().wait(0.02)
+                with lock:
+                    in_flight[0] -= 1
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(call, range(12)))
+
+        self.assertEqual(peak[0], 2)
+        # 0 turns the cap off
+        with get_concurrency_limit('nocaptest'):
+            with get_concurrency_limit('nocaptest'):
+                pass
+
+
+class ContentBatchTests(TestCase):
+    jobs = [{'id': i, 'keyword': keyword} for i, keyword in enumerate(
+        ['fall outfits', 'Pumpkin Soup', 'cozy  cardigans', 'apple pie', 'halloween nails'])]
+
+    def test_split_keyed_maps_items_back_to_jobs(self):
+        data = {
+            'FALL OUTFITS': [{'title': 'A'}, {'title': 'B'}, {'title': 'C'}],
+            'pumpkin soup': [{'title': ''}, 'junk', {'title': 'D'}],
+            'cozy cardigans ': [{'title': 'E'}],
+            'apple pie': 'not a list',
+        }
+
+        results = ContentGeneratorService._split_keyed(self.jobs, data, 2, required=('title',))
+
+        self.assertEqual(results, {0: [{'title': 'A'}, {'title': 'B'}], 1: [{'title': 'D'}], 2: [{'title': 'E'}]})
+        self.assertEqual(ContentGeneratorService._split_keyed(self.jobs, ['nope'], 2, required=('title',)), {})
+
+    def test_run_stage_retries_missing_keywords_individually(self):
+        service = ContentGeneratorService()
+        service.client = mock.Mock()
+        batches = []
+
+        def batch_fn(batch):
+            batches.append([job['id'] for job in batch])
+            # The model skipped 'apple pie'
+            return {job['id']: [f"batch {job['id']}"] for job in batch if job['id'] != 3}
+
+        results = {job['id']: {'articles': [], 'error': None} for job in self.jobs}
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            service._run_stage(executor, self.jobs, results, 'articles', batch_fn,
+                               lambda job: [f"single {job['id']}"], batch_size=2)
+
+        # The leftover fifth keyword goes through the single-keyword prompt
+        self.assertEqual(sorted(batches), [[0, 1], [2, 3]])
+        self.assertEqual([results[i]['articles'] for i in range(5)], [
+            ['batch 0'], ['batch 1'], ['batch 2'], ['single 3'], ['single 4'],
+        ])
+
+    def test_generate_for_keywords_runs_at_most_concurrency_requests(self):
+        service = ContentGeneratorService()
+        service.client = mock.Mock()
+        service.llm_cache.enabled = False
+        lock = threading.Lock()
+        in_flight, peak = [0], [0]
+
+        def complete(prompt):
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            threading.Event().wait(0.02)
+            with lock:
+                in_flight[0] -= 1
+            return json.dumps([{'title': 'T', 'hook': 'H'}])
+
+        with mock.patch.object(service, '_complete', side_effect=complete):
+            results = service.generate_for_keywords(self.jobs, article_count=1, gen_type='articles',
+                                                    concurrency=2, batch_size=1)
+
+        self.assertEqual(peak[0], 2)
+        self.assertEqual({i: r['articles'] for i, r in results.items()}, {i: [{'title': 'T', 'hook': 'H'}] for i in range(5)})
+        self.assertTrue(all(r['error'] is None for r in results.values()))
+
+
+BLOG_TEXT = """---INTRO---
+Fall is here.
+---IDEAS---
+1. Cozy Cardigans
+Soft knits.
+Layer them.
+2) Plaid Skirts
+Classic.
+---CONCLUSION---
+Enjoy fall!
+---IDEAS---
+"""
+
+
+class BlogStreamParserTests(TestCase):
+    @staticmethod
+    def parse(chunks):
+        parser = BlogStreamParser()
+        events = []
+        for chunk in chunks:
+            events += parser.feed(chunk)
+        return events + parser.close()
+
+    def test_whole_text(self):
+        self.assertEqual(self.parse([BLOG_TEXT]), [
+            ('intro', 'Fall is here.'),
+            ('item', {'title': 'Cozy Cardigans', 'description': 'Soft knits. Layer them.'}),
+            ('item', {'title': 'Plaid Skirts', 'description': 'Classic.'}),
+            ('conclusion', 'Enjoy fall!'),
+        ])
+
+    def test_any_chunk_boundary(self):
+        expected = self.parse([BLOG_TEXT])
+        for text in (BLOG_TEXT, BLOG_TEXT.rsplit('---IDEAS---', 1)[0]):
+            for i in range(len(text) + 1):
+                self.assertEqual(self.parse([text[:i], text[i:]]), expected, f"split at {i}")
+            self.assertEqual(self.parse(list(text)), expected)
+
+    def test_item_emitted_once_the_next_starts(self):
+        parser = BlogStreamParser()
+        parser.feed(BLOG_TEXT.split('2) Plaid')[0])
+
+        events = parser.feed('2) Plaid Skirts\n')
+
+        self.assertEqual(events, [('item', {'title': 'Cozy Cardigans', 'description': 'Soft knits. Layer them.'})])
+
+
+@mock.patch('django_q.tasks.async_task')
+class BlogBatchTests(TestCase):
+    def setUp(self):
+        self.project = Project.objects.create(name='Test')
+        keyword = ExpandedKeyword.objects.create(project=self.project, keyword='fall outfits')
+        self.articles = [
+            ArticleIdea.objects.create(project=self.project, expanded_keyword=keyword, title=f'Article {i}')
+            for i in range(4)
+        ]
+
+    def blog(self, article, status, **fields):
+        return BlogPost.objects.create(project=self.project, article_idea=article, topic=article.title,
+                                       intro='', conclusion='', generation_status=status, **fields)
+
+    @staticmethod
+    def enqueued(async_task):
+        return [call.args[1] for call in async_task.call_args_list]
+
+    @staticmethod
+    def finish(blog_id, status='completed'):
+        BlogPost.objects.filter(pk=blog_id).update(generation_status=status)
+
+    def test_skips_done_and_in_flight_blogs(self, async_task):
+        self.blog(self.articles[0], 'completed')
+        self.blog(self.articles[1], 'generating')
+
+        job = BlogBatchService(self.project, concurrency=1).start()
+
+        self.assertEqual(job.skipped, 2)
+        self.assertEqual(job.article_ids, [self.articles[2].id, self.articles[3].id])
+        first = self.enqueued(async_task)
+        self.assertEqual(len(first), 1)
+
+        # Advancing again (e.g. from the status endpoint) doesn't enqueue it twice
+        BlogBatchService(self.project, concurrency=1).advance(job.id)
+        self.assertEqual(self.enqueued(async_task), first)
+
+        self.finish(first[0])
+        BlogBatchService(self.project, concurrency=1).advance(job.id)
+        self.assertEqual(len(self.enqueued(async_task)), 2)
+
+        self.finish(self.enqueued(async_task)[1])
+        BlogBatchService(self.project, concurrency=1).advance(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+
+    def test_waits_for_blog_generated_elsewhere(self, async_task):
+        job = BlogGenerationJob.objects.create(project=self.project, article_ids=[self.articles[0].id])
+        other = self.blog(self.articles[0], 'generating')
+
+        BlogBatchService(self.project).advance(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'running')
+        async_task.assert_not_called()
+
+        self.finish(other.id)
+        BlogBatchService(self.project).advance(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+
+    def test_resumes_after_interrupted_blog(self, async_task):
+        job = BlogGenerationJob.objects.create(project=self.project, article_ids=[a.id for a in self.articles[:3]])
+        crashed = self.blog(self.articles[0], 'generating', job=job)
+        queued = self.blog(self.articles[1], 'pending', job=job)
+        long_ago = timezone.now() - timedelta(days=1)
+        BlogPost.objects.filter(pk__in=[crashed.id, queued.id]).update(updated_at=long_ago)
+
+        BlogBatchService(self.project, concurrency=2).advance(job.id)
+
+        crashed.refresh_from_db()
+        self.assertEqual(crashed.generation_status, 'failed')
+        self.assertEqual(crashed.error_message, 'Interrupted before finishing')
+        # A queued blog is still waiting on a worker, not interrupted
+        self.assertEqual(BlogPost.objects.get(pk=queued.id).generation_status, 'pending')
+        self.assertEqual(self.enqueued(async_task), [BlogPost.objects.get(article_idea=self.articles[2]).id])
+
+    def test_summary_counts_blogs_generated_elsewhere_by_status(self, async_task):
+        job = BlogGenerationJob.objects.create(project=self.project, article_ids=[a.id for a in self.articles],
+                                               status='running', started_at=timezone.now() - timedelta(seconds=100))
+        self.blog(self.articles[0], 'completed')
+        self.blog(self.articles[1], 'generating', progress=50)
+        # Failed outside the job: advance() will generate it again
+        self.blog(self.articles[2], 'failed')
+        self.blog(self.articles[3], 'failed', job=job)
+
+        summary = BlogBatchService.summary(job)
+
+        self.assertEqual({k: summary[k] for k in ('completed', 'generating', 'queued', 'failed')},
+                         {'completed': 1, 'generating': 1, 'queued': 1, 'failed': 1})
+        # 250 of 400 progress units in 100s
+        self.assertEqual(summary['percent'], 62)
+        self.assertEqual(summary['eta_seconds'], 60)
+
+    def test_summary_eta(self, async_task):
+        job = BlogGenerationJob.objects.create(project=self.project, article_ids=[a.id for a in self.articles[:2]],
+                                               status='running', started_at=timezone.now() - timedelta(seconds=30))
+        self.assertIsNone(BlogBatchService.summary(job)['eta_seconds'])
+
+        self.blog(self.articles[0], 'completed', job=job)
+        self.blog(self.articles[1], 'completed', job=job)
+        self.assertEqual(BlogBatchService.summary(job)['eta_seconds'], 0)
+
+        job.status = 'completed'
+        summary = BlogBatchService.summary(job)
+        self.assertIsNone(summary['eta_seconds'])
+        self.assertEqual(summary['percent'], 100)
+
+
+@mock.patch('django_q.tasks.async_task')
+class BlogGenerationTests(TestCase):
+    def setUp(self):
+        self.project = Project.objects.create(name='Test')
+        keyword = ExpandedKeyword.objects.create(project=self.project, keyword='fall outfits')
+        self.article = ArticleIdea.objects.create(project=self.project, expanded_keyword=keyword, title='Fall outfits')
+
+    def test_repeated_generate_reuses_blog_in_flight(self, async_task):
+        url = reverse('wizard:generate_blog_htmx', args=[self.article.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url)
+
+        self.assertEqual(BlogPost.objects.filter(article_idea=self.article).count(), 1)
+        self.assertEqual(async_task.call_count, 1)
+
+    def test_regenerate_ignored_while_in_flight(self, async_task):
+        blog = BlogPost.objects.create(project=self.project, article_idea=self.article, topic='t',
+                                       intro='', conclusion='', generation_status='completed')
+        url = reverse('wizard:regenerate_blog_htmx', args=[blog.id])
+
+        self.client.post(url)
+        self.client.post(url)
+        self.assertEqual(async_task.call_count, 1)
+
+        # A generating blog that stopped reporting progress may be restarted
+        BlogPost.objects.filter(pk=blog.pk).update(generation_status='generating',
+                                                   updated_at=timezone.now() - timedelta(days=1))
+        self.client.post(url)
+        self.assertEqual(async_task.call_count, 2)
+
+    @mock.patch('wizard.tasks.async_task')
+    def test_task_keeps_thumbnail_applied_meanwhile(self, task_async, async_task):
+        blog = BlogPost.objects.create(project=self.project, article_idea=self.article, topic='t',
+                                       intro='', conclusion='')
+
+        def streamed(topic, on_content=None, on_ready=None, blog_post=None):
+            on_content('intro', 'Intro')
+            on_content('item', {'title': 'Coats', 'description': 'c'})
+            on_content('conclusion', 'Bye')
+            # The webhook applies the thumbnail after the blog stopped waiting for it
+            BlogPost.objects.filter(pk=blog.pk).update(thumbnail_url='https://fal.media/late.png')
+            return {'intro': 'Intro', 'items': [{'title': 'Coats', 'description': 'c'}], 'conclusion': 'Bye', 'images': {}}
+
+        with mock.patch.object(BlogGeneratorService, 'generate_blog_streamed', side_effect=streamed):
+            self.assertEqual(tasks.generate_blog(blog.id), 'completed')
+
+        blog.refresh_from_db()
+        self.assertEqual(blog.thumbnail_url, 'https://fal.media/late.png')
+        self.assertIn('https://fal.media/late.png', blog.json_file.read().decode())
+
+
+# Shaped like the Trends table's top_trends response: the rows sit a few
+# levels down, next to unrelated lists the parser has to skip
+TRENDS_PAYLOAD = {
+    "resource_response": {
+        "status": "success",
+        "filters": [{"id": "918105274631", "label": "Fashion"}],
+        "data": {
+            "trends": [
+                {"term": "fall outfits", "weeklyChange": 120.4, "monthlyChange": 310, "yearlyChange": 45},
+                {"term": "  pumpkin soup ", "weeklyChange": None, "monthlyChange": "85.6", "yearlyChange": 12},
+                {"term": "halloween nails", "weeklyChange": 40, "searchVolume": "1.2M"},
+                {"term": "", "weeklyChange": 99},
+                {"keyword": "cozy cardigans", "score": 7},
+            ],
+        },
+    },
+}
+
+
+class FakePage:
+    """
+    Stands in for a Playwright page: goto() replays canned network responses,
+    and each selector is attached after its delay in `selectors` (None: never;
+    an exception: raised instead).
+    """
+
+    def __init__(self, responses=(), selectors=None):
+        self.responses = responses
+        self.selectors = selectors or {}
+        self.listeners = []
+        self.cancelled = []
+
+    async def wait_for_selector(self, selector, state=None, timeout=None):
+        delay = self.selectors[selector]
+        if isinstance(delay, Exception):
+            raise delay
+        try:
+            await asyncio.sleep(3600 if delay is None else delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(selector)
+            raise
+        return selector
+
+    def on(self, event, handler):
+        self.listeners.append(handler)
+
+    def remove_listener(self, event, handler):
+        self.listeners.remove(handler)
+
+    async def goto(self, url, wait_until=None):
+        for response in self.responses:
+            for handler in list(self.listeners):
+                await handler(response)
+
+
+class FakeResponse:
+    def __init__(self, url, data):
+        self.url = url
+        self.data = data
+
+    async def json(self):
+        if isinstance(self.data, Exception):
+            raise self.data
+        return self.data
+
+
+class TrendsPayloadTests(TestCase):
+    def test_extracts_rows(self):
+        trends = parse_trends_payload(TRENDS_PAYLOAD, preset="3")
+
+        self.assertEqual([t['keyword'] for t in trends],
+                         ['fall outfits', 'pumpkin soup', 'halloween nails', 'cozy cardigans'])
+        self.assertEqual(trends[0], {'keyword': 'fall outfits', 'score': 120, 'volume': 'W +120% / M +310% / Y +45%'})
+        self.assertEqual(trends[2]['volume'], '1.2M')
+        # No growth columns at all: the row's own score
+        self.assertEqual(trends[3]['score'], 7)
+
+    def test_score_follows_preset(self):
+        def scores(preset):
+            return [t['score'] for t in parse_trends_payload(TRENDS_PAYLOAD, preset=preset)]
+
+        self.assertEqual(scores("1"), [310, 86, 40, 7])  # monthly; a missing column falls back
+        self.assertEqual(scores("2"), [45, 12, 40, 7])  # yearly
+        self.assertEqual(scores("3"), [120, 86, 40, 7])  # growing: weekly
+        self.assertEqual(scores(normalize_preset("Seasonal")), scores("4"))
+
+    def test_no_rows(self):
+        self.assertEqual(parse_trends_payload({"resource_response": {"data": []}}), [])
+        self.assertEqual(parse_trends_payload([{"id": 1}, {"id": 2}]), [])
+
+    def test_captures_only_trends_api_responses(self):
+        page = FakePage([
+            FakeResponse("https://trends.pinterest.com/resource/UserResource/get/", {"data": [{"term": "not a trend"}]}),
+            FakeResponse("https://trends.pinterest.com/top_trends_filtered/?country=US", ValueError("not JSON")),
+            FakeResponse("https://trends.pinterest.com/top_trends_filtered/?country=US&trendsPreset=1", TRENDS_PAYLOAD),
+        ])
+        browser = mock.Mock(page=page)
+        service = PinterestScraperService(use_pool=False)
+
+        trends = asyncio.run(service._capture_trends_payload(browser, "https://trends.pinterest.com/search/", "1"))
+
+        self.assertEqual(trends[0], {'keyword': 'fall outfits', 'score': 310, 'volume': 'W +120% / M +310% / Y +45%'})
+        self.assertEqual(page.listeners, [])
+
+
+class TrendGridTests(TestCase):
+    queries = [
+        {'country': 'US', 'trend_type': 'growing'},
+        {'country': 'GB', 'trend_type': '3'},
+        {'country': 'CA', 'trend_type': '3'},
+        {'country': 'US', 'trend_type': '1'},
+        # Same country and preset as the first query
+        {'country': 'US', 'trend_type': '3', 'interests': '918'},
+    ]
+    results = {
+        ('US', 'growing'): [{'keyword': 'Fall Outfits', 'score': 50, 'volume': 'a'},
+                            {'keyword': 'pumpkin soup', 'score': 90, 'volume': 'b'}],
+        ('GB', '3'): [{'keyword': 'fall outfits', 'score': 80, 'volume': 'c'}],
+        ('US', '1'): [{'keyword': 'FALL OUTFITS', 'score': 60, 'volume': 'd'},
+                      {'keyword': 'apple pie', 'score': 95, 'volume': 'e'}],
+        ('US', '3'): [{'keyword': 'fall outfits', 'score': 40, 'volume': 'f'}],
+    }
+
+    async def get_top_trends(self, country, trend_type, force_refresh=False, **filters):
+        if country == 'CA':
+            raise RuntimeError('blocked')
+        return self.results[(country, trend_type)]
+
+    def test_merges_and_dedupes_across_queries(self):
+        service = PinterestScraperService(use_pool=False)
+        stub = mock.AsyncMock(side_effect=self.get_top_trends)
+
+        with mock.patch.object(service, 'get_top_trends', stub):
+            merged = asyncio.run(service.get_top_trends_many(self.queries, concurrency=2, force_refresh=True))
+
+        self.assertEqual(stub.await_count, 5)
+        self.assertTrue(all(call.kwargs['force_refresh'] for call in stub.await_args_list))
+        self.assertEqual([t['keyword'] for t in merged['trends']], ['Fall Outfits', 'apple pie', 'pumpkin soup'])
+        self.assertEqual(merged['trends'][0], {
+            'keyword': 'Fall Outfits', 'score': 80, 'volume': 'c',
+            'queries': [{'country': 'US', 'preset': '3'}, {'country': 'GB', 'preset': '3'}, {'country': 'US', 'preset': '1'}],
+        })
+        self.assertEqual(merged['trends'][2]['queries'], [{'country': 'US', 'preset': '3'}])
+        self.assertEqual(merged['errors'], [{'query': {'country': 'CA', 'trend_type': '3'}, 'error': 'blocked'}])
+
+
+class FakeBrowser:
+    """Stands in for a launched Chromium."""
+
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        context = mock.AsyncMock()
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.closed = True
+        self.connected = False
+
+
+class BrowserPoolTests(TestCase):
+    def pool(self, **options):
+        pool = BrowserPool(auth_file='missing-auth.json', **options)
+        self.launched = []
+
+        async def launch():
+            self.launched.append(FakeBrowser())
+            return self.launched[-1]
+
+        pool._launch = launch
+        return pool
+
+    def test_browser_recycled_after_max_uses(self):
+        pool = self.pool(size=1, max_uses=2)
+
+        async def scenario():
+            for _ in range(2):
+                await pool.release_context(await pool.acquire_context())
+            return await pool.acquire_context()
+
+        context = asyncio.run(scenario())
+
+        self.assertEqual(len(self.launched), 2)
+        self.assertTrue(self.launched[0].closed)
+        self.assertIs(pool._leases[id(context)].browser, self.launched[1])
+
+    def test_retired_browser_closed_once_idle(self):
+        pool = self.pool(size=1, max_uses=1)
+
+        async def scenario():
+            context = await pool.acquire_context()
+            await pool._prune()
+            # Its last lease is still open
+            self.assertFalse(self.launched[0].closed)
+            await pool.release_context(context)
+
+        asyncio.run(scenario())
+
+        self.assertTrue(self.launched[0].closed)
+        self.assertEqual(pool._browsers, [])
+
+    def test_contexts_per_browser_caps_sharing(self):
+        pool = self.pool(size=1, contexts_per_browser=2)
+
+        async def scenario():
+            first = await pool.acquire_context()
+            second = await pool.acquire_context()
+            third = asyncio.ensure_future(pool.acquire_context())
+            await asyncio.sleep(0.01)
+            self.assertFalse(third.done())
+
+            await pool.release_context(first)
+            await asyncio.wait_for(third, 1)
+            await pool.release_context(second)
+
+        asyncio.run(scenario())
+
+        self.assertEqual(len(self.launched), 1)
+        self.assertEqual(len(self.launched[0].contexts), 3)
+        self.assertEqual([c.close.await_count for c in self.launched[0].contexts], [1, 1, 0])
+        self.assertEqual(pool._browsers[0].active, 1)
+
+    def test_grows_before_sharing_a_busy_browser(self):
+        pool = self.pool(size=2, contexts_per_browser=4)
+
+        async def scenario():
+            await pool.acquire_context()
+            await pool.acquire_context()
+            await pool.acquire_context()
+
+        asyncio.run(scenario())
+
+        self.assertEqual(len(self.launched), 2)
+        self.assertEqual(sorted(b.active for b in pool._browsers), [1, 2])
+
+    def test_prune_drops_disconnected_browser(self):
+        pool = self.pool(size=1)
+
+        async def scenario():
+            await pool.release_context(await pool.acquire_context())
+            self.launched[0].connected = False
+            await pool.acquire_context()
+
+        asyncio.run(scenario())
+
+        self.assertEqual(len(self.launched), 2)
+        self.assertEqual([b.browser for b in pool._browsers], [self.launched[1]])
+
+    @mock.patch.dict('os.environ', {'SCRAPER_POOL_SIZE': '3', 'SCRAPER_POOL_MAX_USES': '7'})
+    def test_shutdown_browser_pools(self):
+        with mock.patch.dict(browser_module._pools, clear=True):
+            pool = browser_module.get_browser_pool(auth_file='missing-auth.json')
+            self.assertIs(browser_module.get_browser_pool(auth_file='missing-auth.json'), pool)
+            self.assertEqual((pool.size, pool.max_uses), (3, 7))
+            pool._launch = self.pool()._launch
+
+            # Leased on the pool's own loop, from another one
+            asyncio.run(pool.run(pool.acquire_context()))
+            thread = pool._thread
+
+            browser_module.shutdown_browser_pools()
+
+            self.assertEqual(browser_module._pools, {})
+            self.assertTrue(self.launched[0].closed)
+            self.assertFalse(thread.is_alive())
+            self.assertIsNone(pool._loop)
+            # A second shutdown is a no-op
+            pool.shutdown()
+
+
+class WaitForAnyTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(browser_module._selector_wins, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wait(self, selectors, timeout=1, key=None):
+        browser = PinterestBrowser()
+        browser.page = FakePage(selectors=selectors)
+        winner = asyncio.run(browser.wait_for_any(list(selectors), timeout=timeout, key=key))
+        return winner, browser.page
+
+    def test_first_attached_selector_wins(self):
+        winner, page = self.wait({'.slow': 0.2, '.fast': 0, '.never': None})
+
+        self.assertEqual(winner, '.fast')
+        self.assertEqual(sorted(page.cancelled), ['.never', '.slow'])
+
+    def test_failed_selectors_are_ignored(self):
+        winner, _ = self.wait({'.broken': RuntimeError('detached'), '.table': 0.01})
+
+        self.assertEqual(winner, '.table')
+
+    def test_timeout_returns_none(self):
+        winner, page = self.wait({'.never': None}, timeout=0.05, key='trends')
+
+        self.assertIsNone(winner)
+        self.assertEqual(page.cancelled, ['.never'])
+        self.assertNotIn('trends', browser_module._selector_wins)
+
+    def test_remembered_winner_preferred_on_ties(self):
+        # Without history, a tie goes to the first selector given
+        self.assertEqual(self.wait({'.a': 0, '.b': 0})[0], '.a')
+
+        self.assertEqual(self.wait({'.a': 0.2, '.b': 0}, key='suggestions')[0], '.b')
+        self.assertEqual(browser_module._selector_wins, {'suggestions': '.b'})
+
+        self.assertEqual(self.wait({'.a': 0, '.b': 0}, key='suggestions')[0], '.b')
+        # Other keys keep their own order
+        self.assertEqual(self.wait({'.a': 0, '.b': 0}, key='trends')[0], '.a')
+
+
+class PersistentCacheTests(TestCase):
+    def test_entry_expires_after_ttl(self):
+        cache = PersistentCache('test', ttl=60)
+        cache.set({'q': 'fall'}, ['a'])
+        self.assertEqual(cache.get({'q': 'fall'}), ['a'])
+
+        CacheEntry.objects.update(created_at=timezone.now() - timedelta(seconds=61))
+
+        self.assertIsNone(cache.get({'q': 'fall'}))
+        cache.set({'q': 'fall'}, ['b'])
+        self.assertEqual(cache.get({'q': 'fall'}), ['b'])
+
+    def test_evicts_least_recently_used(self):
+        cache = PersistentCache('test', max_entries=2)
+        cache.set({'q': 1}, 1)
+        cache.set({'q': 2}, 2)
+        CacheEntry.objects.update(last_accessed_at=timezone.now() - timedelta(minutes=1))
+        cache.get({'q': 1})
+
+        cache.set({'q': 3}, 3)
+
+        self.assertEqual(cache.get({'q': 1}), 1)
+        self.assertIsNone(cache.get({'q': 2}))
+        self.assertEqual(cache.get({'q': 3}), 3)
+
+    def test_stats_are_shared_between_instances(self):
+        first, second = PersistentCache('test'), PersistentCache('test')
+        self.assertIsNone(first.get({'q': 'fall'}))
+        first.set({'q': 'fall'}, ['a'])
+        second.get({'q': 'fall'})
+        second.get({'q': 'fall'})
+
+        self.assertEqual(PersistentCache('test').stats(), {'hits': 2, 'misses': 1, 'hit_rate': 0.667, 'entries': 1})
+        self.assertEqual(PersistentCache('other').stats()['entries'], 0)
+
+
+class LLMCacheTests(TestCase):
+    def params(self, **overrides):
+        args = {'provider': 'openrouter', 'model': 'model-a', 'template': 'article_titles',
+                'inputs': {'keyword': 'fall outfits', 'count': 5}}
+        args.update(overrides)
+        return LLMCache.params(**args)
+
+    def test_key_covers_provider_model_version_and_inputs(self):
+        cache = LLMCache()
+        cache.store(self.params(), ['stored'])
+        self.assertEqual(self.params()['version'], PROMPT_VERSIONS['article_titles'])
+        self.assertEqual(cache.lookup(self.params()), ['stored'])
+
+        self.assertIsNone(cache.lookup(self.params(provider='gemini')))
+        self.assertIsNone(cache.lookup(self.params(model='model-b')))
+        self.assertIsNone(cache.lookup(self.params(template='pin_ideas')))
+        self.assertIsNone(cache.lookup(self.params(inputs={'keyword': 'fall outfits', 'count': 6})))
+        self.assertIsNone(cache.lookup(self.params(sampling={'temperature': 0.2})))
+        with mock.patch.dict(PROMPT_VERSIONS, {'article_titles': PROMPT_VERSIONS['article_titles'] + 1}):
+            self.assertIsNone(cache.lookup(self.params()))
+
+    def test_bypass_skips_lookup(self):
+        LLMCache().store(self.params(), ['stored'])
+        compute = mock.Mock(return_value=['fresh'])
+
+        self.assertIsNone(LLMCache(bypass=True).lookup(self.params()))
+        self.assertEqual(LLMCache(bypass=True).cached(self.params(), compute), ['fresh'])
+        compute.assert_called_once_with()
+
+    def test_regeneration_replaces_stored_entry(self):
+        LLMCache().cached(self.params(), lambda: ['first'])
+        LLMCache(bypass=True).cached(self.params(), lambda: ['second'])
+
+        self.assertEqual(LLMCache().cached(self.params(), lambda: ['third']), ['second'])
+        self.assertEqual(CacheEntry.objects.filter(namespace=LLMCache.namespace).count(), 1)
+
+    def test_empty_response_is_not_stored(self):
+        cache = LLMCache()
+        self.assertEqual(cache.cached(self.params(), lambda: []), [])
+        self.assertIsNone(cache.lookup(self.params()))
+
+
+class ScraperCacheTests(TransactionTestCase):
+    # The scraper reaches the cache through sync_to_async, i.e. from another thread
+    def test_force_refresh_bypasses_trends_cache(self):
+        service = PinterestScraperService(use_pool=False)
+        scrape = mock.AsyncMock(side_effect=[[{'keyword': 'old'}], [{'keyword': 'new'}]])
+
+        with mock.patch.object(PinterestScraperService, '_scrape_top_trends', scrape):
+            self.assertEqual(asyncio.run(service.get_top_trends('us', '3')), [{'keyword': 'old'}])
+            # Same normalized query: served from the cache
+            self.assertEqual(asyncio.run(service.get_top_trends('US', 'growing')), [{'keyword': 'old'}])
+            self.assertEqual(asyncio.run(service.get_top_trends('US', '3', force_refresh=True)), [{'keyword': 'new'}])
+            self.assertEqual(asyncio.run(service.get_top_trends('US', '3')), [{'keyword': 'new'}])
+
+        self.assertEqual(scrape.await_count, 2)
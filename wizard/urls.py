@@ -47,11 +47,15 @@ urlpatterns = [
     path('<int:project_id>/export/', views.ExportView.as_view(), name='export'),
     path('<int:project_id>/export/csv/', views.export_csv, name='export_csv'),
     path('<int:project_id>/export/json/', views.export_json, name='export_json'),
+    path('<int:project_id>/export/zip/', views.export_project_zip, name='export_zip'),
     
     # Step 7: Blog Generation
     path('<int:project_id>/blog/', views.BlogGenView.as_view(), name='blog_gen'),
     path('article/<int:article_id>/generate-blog/', views.generate_blog_htmx, name='generate_blog_htmx'),
     path('blog/<int:blog_id>/regenerate/', views.regenerate_blog_htmx, name='regenerate_blog_htmx'),
+    path('blog/<int:blog_id>/status/', views.blog_status_htmx, name='blog_status_htmx'),
+    path('<int:project_id>/blog/bulk/', views.bulk_generate_blogs_htmx, name='bulk_generate_blogs'),
+    path('blog/bulk/<int:job_id>/status/', views.bulk_blog_status_htmx, name='bulk_blog_status'),
     path('blog/<int:blog_id>/detail/', views.blog_detail_htmx, name='blog_detail_htmx'),
     path('blog/<int:blog_id>/edit/', views.blog_edit, name='blog_edit'),
     path('blog/<int:blog_id>/update/', views.blog_update, name='blog_update'),
@@ -68,11 +72,13 @@ urlpatterns = [
     path('<int:project_id>/blog/publish/', views.publish_blog_api, name='publish_blog_api'),
     path('<int:project_id>/pin-setup/', views.PinSetupView.as_view(), name='pin_setup'),
     path('<int:project_id>/pin-setup/generate-images/', views.generate_pin_images, name='generate_pin_images'),
+    path('fal/webhook/<int:job_id>/', views.fal_webhook, name='fal_webhook'),
     path('<int:project_id>/pin-setup/post-pinterest/', views.post_pins_pinterest, name='post_pins_pinterest'),
     
     # Analysis
     path('analysis/', views.AnalysisView.as_view(), name='analysis'),
     path('analysis/fetch/', views.fetch_analysis_data, name='analysis_fetch'),
+    path('analysis/bulk/', views.bulk_analysis_data, name='analysis_bulk'),
     path('analysis/project-keywords/', views.project_keywords_htmx, name='project_keywords_htmx'),
     path('blog/<int:blog_id>/download-images/', views.download_blog_images, name='download_blog_images'),
 ]
@@ -1,6 +1,6 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import TemplateView, CreateView, View
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.conf import settings
 from django.contrib import messages
 from django.utils import timezone
@@ -9,15 +9,15 @@ from django.views.decorators.csrf import csrf_exempt
 import json
 import requests
 import base64
-import zipfile
 import io
 from django.template.loader import render_to_string
 from django.views.generic import CreateView, TemplateView, View
 from django.urls import reverse
-from django.db.models import Count
+from django.db import transaction
+from django.db.models import Count, F
 from django.http import HttpResponse, JsonResponse
 from django.views.decorators.http import require_POST
-from .models import Project, TrendKeyword, Suggestion, ExpandedKeyword, Content, ArticleIdea, PinIdea, BlogPost, BlogSection
+from .models import Project, TrendKeyword, Suggestion, ExpandedKeyword, Content, ArticleIdea, PinIdea, BlogPost, BlogSection, BlogGenerationJob
 
 # ... (rest of imports)
 
@@ -272,51 +272,75 @@ class TrendFetchView(TemplateView):
 
 def scrape_trends_htmx(request, project_id):
     """HTMX triggered view to run scraper and return HTML partial of trends."""
-    from .services.pinterest_scraper import PinterestScraperService
+    from .services.pinterest_scraper import PinterestScraperService, build_trend_queries
+    from .services.trend_history import TrendHistoryService
     
-    # Parse filter parameters
-    country = request.GET.get('country', 'US')
-    trend_type = request.GET.get('type', '3')
+    # Parse filter parameters; country and type may each be multi-select
+    countries = request.GET.getlist('country') or ['US']
+    trend_types = request.GET.getlist('type') or ['3']
     age = request.GET.get('age', '')  # e.g., '18-24'
     gender = request.GET.get('gender', '')  # e.g., 'female'
     
     # Interests are multi-select, join with %7C (URL-encoded |)
     interests = request.GET.getlist('interests')  # List of interest IDs
     interests_str = '%7C'.join(interests) if interests else ''
+    force_refresh = request.GET.get('refresh') == '1'
+    
+    queries = build_trend_queries(countries, trend_types, interests_str, age, gender)
     
     scraper = PinterestScraperService(headless=True)
     try:
-        trends = async_to_sync(scraper.get_top_trends)(
-            country=country, 
-            trend_type=trend_type,
-            interests=interests_str,
-            age=age,
-            gender=gender
-        )
+        if len(queries) == 1:
+            trends = async_to_sync(scraper.get_top_trends)(**queries[0], force_refresh=force_refresh)
+            errors = []
+        else:
+            # Fan out over every country x type combination and merge the results
+            fanout = async_to_sync(scraper.get_top_trends_many)(queries, force_refresh=force_refresh)
+            trends, errors = fanout['trends'], fanout['errors']
+            if errors and len(errors) == len(queries):
+                raise Exception(errors[0]['error'])
         
-        project = get_object_or_404(Project, pk=project_id)
+        # An empty scrape is almost always a transient failure; recording it
+        # would mark every keyword dropped and clear the working set
+        if not trends:
+            raise Exception("No trends were returned. Pinterest may be unavailable; please try again.")
         
-        # Clear ALL existing trends before adding new ones
-        project.trends.all().delete()
+        project = get_object_or_404(Project, pk=project_id)
         
-        for t in trends:
-            kw = t['keyword']
-            TrendKeyword.objects.create(
-                project=project,
-                keyword=kw,
-                trend_score=0
-            )
+        # Snapshot the scrape for history, then upsert the working set in place
+        history = TrendHistoryService(project)
+        snapshot, diff = history.record(trends, queries)
+        history.sync_working_set(trends)
                 
-        all_trends = project.trends.all()
+        all_trends = list(project.trends.all())
+        for trend in all_trends:
+            trend.change = diff['changes'].get(trend.keyword.lower())
         return render(request, 'wizard/partials/trend_list.html', {
             'trends': all_trends,
-            'country': country,
-            'trend_type': trend_type
+            'diff': diff,
+            'country': ', '.join(countries),
+            'trend_type': ', '.join(trend_types),
+            'query_count': len(queries),
+            'errors': errors
         })
         
     except Exception as e:
         return render(request, 'wizard/partials/error.html', {'error': str(e)})
 
+def _score_momentum(request, project):
+    """Scores all of a project's keywords from real Trends series and reports the outcome."""
+    from .services.momentum import MomentumScorer
+    
+    try:
+        result = MomentumScorer().score_project(project)
+    except Exception as e:
+        messages.error(request, f"Momentum scoring failed: {e}")
+        return
+    if result['missing']:
+        messages.warning(request, f"Scored {result['scored']} keywords; {result['missing']} have no trend data.")
+    else:
+        messages.success(request, f"Scored {result['scored']} keywords by momentum.")
+
 # ============= STEP 2: Keyword Review =============
 class KeywordReviewView(TemplateView):
     template_name = 'wizard/keyword_review.html'
@@ -326,9 +350,10 @@ class KeywordReviewView(TemplateView):
         project_id = self.kwargs['project_id']
         project = get_object_or_404(Project, pk=project_id)
         context['project'] = project
+        # Scored keywords by momentum first, then the rest by scraped growth
         context['selected_keywords'] = TrendKeyword.objects.filter(
             project_id=project_id, selected=True
-        )
+        ).order_by(F('momentum_score').desc(nulls_last=True), '-trend_score', 'keyword')
         context['active_sidebar'] = 'review'
         context['blog_count'] = BlogPost.objects.filter(project=project).count()
         context['pin_count'] = PinIdea.objects.filter(project=project).count()
@@ -348,6 +373,10 @@ class KeywordReviewView(TemplateView):
             )
             return redirect('wizard:keyword_review', project_id=project_id)
         
+        if 'score' in request.POST:
+            _score_momentum(request, project)
+            return redirect('wizard:keyword_review', project_id=project_id)
+        
         # Handle proceed to next step
         if 'proceed' in request.POST:
             return redirect('wizard:suggestion_fetch', project_id=project_id)
@@ -399,37 +428,39 @@ def fetch_suggestions_htmx(request, project_id):
     Suggestion.objects.filter(project=project).delete()
     
     scraper = PinterestScraperService(headless=True)
+    keywords = list(base_keywords.values_list('keyword', flat=True))
+    try:
+        scraped = async_to_sync(scraper.get_suggestions_many)(
+            keywords, force_refresh=request.GET.get('refresh') == '1'
+        )
+    except Exception as e:
+        return render(request, 'wizard/partials/error.html', {'error': str(e)})
+    
     results = []
+    new_suggestions = []
+    for keyword in dict.fromkeys(keywords):
+        if keyword in scraped['errors']:
+            results.append({'keyword': keyword, 'count': 0, 'status': 'error', 'error': scraped['errors'][keyword]})
+            continue
+        
+        scraped_suggestions = scraped['results'].get(keyword, [])
+        # Truncate to max_length to prevent DB errors, dedupe after truncation
+        clean_suggestions = list(dict.fromkeys(
+            s.strip()[:255] for s in scraped_suggestions if s and s.strip()
+        ))
+        new_suggestions.extend(
+            Suggestion(project=project, base_keyword=keyword, suggestion=s)
+            for s in clean_suggestions
+        )
+        
+        results.append({
+            'keyword': keyword, 
+            'count': len(clean_suggestions), 
+            'status': 'success' if clean_suggestions else 'error'
+        })
+        print(f"Keyword '{keyword}': scraped={len(scraped_suggestions)}, saved={len(clean_suggestions)}")
     
-    for kw in base_keywords:
-        try:
-            scraped_suggestions = async_to_sync(scraper.get_suggestions)(kw.keyword)
-            saved_count = 0
-            for s in scraped_suggestions:
-                try:
-                    # Truncate to max_length to prevent DB errors
-                    clean_suggestion = s.strip()[:255] if s else ''
-                    if not clean_suggestion:
-                        continue
-                    Suggestion.objects.get_or_create(
-                        project=project,
-                        base_keyword=kw.keyword,
-                        suggestion=clean_suggestion
-                    )
-                    saved_count += 1
-                except Exception as save_err:
-                    print(f"Error saving suggestion '{s[:50]}...' for '{kw.keyword}': {save_err}")
-                    continue
-            
-            results.append({
-                'keyword': kw.keyword, 
-                'count': saved_count, 
-                'status': 'success' if saved_count > 0 else 'error'
-            })
-            print(f"Keyword '{kw.keyword}': scraped={len(scraped_suggestions)}, saved={saved_count}")
-        except Exception as e:
-            print(f"Scraper error for '{kw.keyword}': {e}")
-            results.append({'keyword': kw.keyword, 'count': 0, 'status': 'error', 'error': str(e)})
+    Suggestion.objects.bulk_create(new_suggestions)
     
     all_suggestions = Suggestion.objects.filter(project=project)
     return render(request, 'wizard/partials/suggestion_list.html', {
@@ -448,8 +479,8 @@ class ExpansionView(TemplateView):
         project = get_object_or_404(Project, pk=project_id)
         context['project'] = project
         
-        # Get expanded keywords, ordered by base_keyword for regrouping
-        context['expanded_keywords'] = ExpandedKeyword.objects.filter(project=project).order_by('base_keyword')
+        # Get expanded keywords, grouped by base_keyword, strongest momentum first
+        context['expanded_keywords'] = ExpandedKeyword.objects.filter(project=project).order_by('base_keyword', '-score')
         
         # Source data for display
         context['base_keywords'] = TrendKeyword.objects.filter(project=project, selected=True)
@@ -463,6 +494,10 @@ class ExpansionView(TemplateView):
     def post(self, request, *args, **kwargs):
         project_id = self.kwargs['project_id']
         
+        if 'score' in request.POST:
+            _score_momentum(request, get_object_or_404(Project, pk=project_id))
+            return redirect('wizard:expansion', project_id=project_id)
+        
         if 'proceed' in request.POST:
             return redirect('wizard:content_gen', project_id=project_id)
         
@@ -479,8 +514,10 @@ def expand_keywords_htmx(request, project_id):
         project=project, selected=True
     ).values_list('keyword', flat=True))
     
-    # Clear old expanded keywords
-    ExpandedKeyword.objects.filter(project=project).delete()
+    # Clear old expanded keywords; re-expanding asks for fresh results
+    existing = ExpandedKeyword.objects.filter(project=project)
+    is_rerun = existing.exists()
+    existing.delete()
 
     # Prepare items for grouped processing
     items_to_process = []
@@ -502,7 +539,7 @@ def expand_keywords_htmx(request, project_id):
         count = 10
 
     try:
-        generator = ContentGeneratorService()
+        generator = ContentGeneratorService(bypass_cache=is_rerun)
         expanded = generator.expand_keywords_with_ai(
             items=items_to_process,
             niche=project.niche or "",
@@ -520,7 +557,7 @@ def expand_keywords_htmx(request, project_id):
                 selected=False  # User requested deselect by default
             )
         
-        all_expanded = ExpandedKeyword.objects.filter(project=project).order_by('base_keyword')
+        all_expanded = ExpandedKeyword.objects.filter(project=project).order_by('base_keyword', '-score')
         return render(request, 'wizard/partials/expanded_list.html', {
             'project': project,
             'expanded_keywords': all_expanded,
@@ -645,7 +682,8 @@ def generate_content_htmx(request, project_id):
     # Specific keyword ID (optional)
     keyword_id = request.GET.get('keyword_id')
     
-    generator = ContentGeneratorService()
+    # Regenerate buttons send fresh=1 to skip cached LLM responses
+    generator = ContentGeneratorService(bypass_cache=request.GET.get('fresh') == '1')
 
     try:
         # Determine scope: Single keyword or All selected keywords
@@ -668,72 +706,73 @@ def generate_content_htmx(request, project_id):
                 suggestions_map[s.base_keyword] = []
             suggestions_map[s.base_keyword].append(s.suggestion)
             
-        generated_count = 0
+        keywords = list(expanded_keywords)
         
-        for kw_obj in expanded_keywords:
-            
-            # 1. Generate Articles if requested
-            if gen_type in ['all', 'articles']:
-                # Clear existing articles for this keyword
-                ArticleIdea.objects.filter(expanded_keyword=kw_obj).delete()
-                
-                articles = generator.generate_article_titles(
-                    keyword=kw_obj.keyword,
-                    count=article_count
-                )
-                
-                # Save Articles
-                saved_articles = []
-                for a in articles:
-                    saved_articles.append(ArticleIdea(
+        # Pin context when articles aren't being regenerated: each keyword's first article
+        existing_titles = {}
+        if gen_type == 'pins':
+            for article in ArticleIdea.objects.filter(expanded_keyword__in=keywords).order_by('id'):
+                existing_titles.setdefault(article.expanded_keyword_id, article.title)
+        
+        # All keywords are generated concurrently (rate limited per provider)
+        results = generator.generate_for_keywords(
+            [
+                {
+                    'id': kw_obj.id,
+                    'keyword': kw_obj.keyword,
+                    'suggestions': suggestions_map.get(kw_obj.base_keyword, []),
+                    'article_title': existing_titles.get(kw_obj.id),
+                }
+                for kw_obj in keywords
+            ],
+            article_count=article_count,
+            pin_count=pin_count,
+            gen_type=gen_type,
+        )
+        stats = generator.cache_stats()
+        print(f"LLM cache: {stats['hits']} hits / {stats['misses']} misses (hit rate {stats['hit_rate']:.0%}, {stats['entries']} entries)")
+        
+        # Batched writes: only keywords that succeeded have their old content replaced
+        succeeded = [kw_obj for kw_obj in keywords if not results[kw_obj.id]['error']]
+        new_articles, new_pins = [], []
+        for kw_obj in succeeded:
+            for a in results[kw_obj.id]['articles']:
+                if isinstance(a, dict):
+                    new_articles.append(ArticleIdea(
                         project=project,
                         expanded_keyword=kw_obj,
                         title=a.get('title', ''),
                         hook=a.get('hook', '')
                     ))
-                ArticleIdea.objects.bulk_create(saved_articles)
-
-            # 2. Generate Pins if requested
-            if gen_type in ['all', 'pins']:
-                # Clear existing pins for this keyword
-                PinIdea.objects.filter(expanded_keyword=kw_obj).delete()
-
-                # Context for pins:
-                # Use existing articles if we didn't just generate them
-                # OR use the ones we just generated
-                context_title = kw_obj.keyword # Default fallback
-                
-                # If we have articles (either just generated or existing), use the first one
-                first_article = ArticleIdea.objects.filter(expanded_keyword=kw_obj).first()
-                if first_article:
-                    context_title = first_article.title
-                
-                context_suggestions = suggestions_map.get(kw_obj.base_keyword, [])
-                
-                pins = generator.generate_pin_ideas(
-                    keyword=kw_obj.keyword,
-                    article_title=context_title,
-                    suggestions=context_suggestions,
-                    count=pin_count
-                )
-                
-                # Save Pins
-                saved_pins = []
-                for p in pins:
-                    saved_pins.append(PinIdea(
+            for p in results[kw_obj.id]['pins']:
+                if isinstance(p, dict):
+                    new_pins.append(PinIdea(
                         project=project,
                         expanded_keyword=kw_obj,
                         title=p.get('title', ''),
                         description=p.get('description', '')
                     ))
-                PinIdea.objects.bulk_create(saved_pins)
-            
-            generated_count += 1
+        
+        with transaction.atomic():
+            if gen_type in ['all', 'articles']:
+                ArticleIdea.objects.filter(expanded_keyword__in=succeeded).delete()
+                ArticleIdea.objects.bulk_create(new_articles)
+            if gen_type in ['all', 'pins']:
+                PinIdea.objects.filter(expanded_keyword__in=succeeded).delete()
+                PinIdea.objects.bulk_create(new_pins)
+        
+        generated_count = len(succeeded)
+        failed_keywords = [
+            {'keyword': kw_obj.keyword, 'error': results[kw_obj.id]['error']}
+            for kw_obj in keywords if results[kw_obj.id]['error']
+        ]
         
         # Return Response
         
         # Case A: Single Keyword Update (return just the card)
         if keyword_id:
+            if failed_keywords:
+                return render(request, 'wizard/partials/error.html', {'error': failed_keywords[0]['error']})
             kw = expanded_keywords.first() # We filtered by ID, so should be one
              # Refresh from DB to get new relations
             kw_refreshed = ExpandedKeyword.objects.prefetch_related('article_ideas', 'pin_ideas').get(pk=kw.id)
@@ -755,7 +794,8 @@ def generate_content_htmx(request, project_id):
         content_html = render_to_string('wizard/partials/content_list.html', {
             'project': project,
             'keywords_with_content': keywords_with_content,
-            'total_generated': generated_count, # This might need better tracking if partial updates happen
+            'total_generated': generated_count,
+            'failed_keywords': failed_keywords,
             'article_count': article_count,
             'pin_count': pin_count
         }, request=request)
@@ -799,7 +839,10 @@ def export_csv(request, project_id):
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="{project.name}_content.csv"'
     
-    writer = csv.writer(response)
+    _write_content_csv(csv.writer(response), project)
+    return response
+
+def _write_content_csv(writer, project):
     writer.writerow(['Keyword', 'Type', 'Title', 'Details (Hook/Description)'])
     
     keywords = ExpandedKeyword.objects.filter(project=project, selected=True).prefetch_related('article_ideas', 'pin_ideas')
@@ -809,14 +852,8 @@ def export_csv(request, project_id):
             writer.writerow([kw.keyword, 'Article', article.title, article.hook])
         for pin in kw.pin_ideas.all():
             writer.writerow([kw.keyword, 'Pin', pin.title, pin.description])
-    
-    return response
 
-def export_json(request, project_id):
-    """Export all content as JSON."""
-    import json
-    project = get_object_or_404(Project, pk=project_id)
-    
+def _project_content_data(project):
     keywords = ExpandedKeyword.objects.filter(project=project, selected=True).prefetch_related('article_ideas', 'pin_ideas')
     
     content_data = []
@@ -827,12 +864,18 @@ def export_json(request, project_id):
             'pins': [{'title': p.title, 'description': p.description} for p in kw.pin_ideas.all()]
         })
     
-    data = {
+    return {
         'project': project.name,
         'niche': project.niche,
         'content': content_data
     }
+
+def export_json(request, project_id):
+    """Export all content as JSON."""
+    import json
+    project = get_object_or_404(Project, pk=project_id)
     
+    data = _project_content_data(project)
     response = HttpResponse(json.dumps(data, indent=2), content_type='application/json')
     response['Content-Disposition'] = f'attachment; filename="{project.name}_content.json"'
     return response
@@ -908,17 +951,25 @@ class AnalysisView(TemplateView):
 
 def fetch_analysis_data(request):
     """HTMX endpoint to fetch analysis data."""
+    from concurrent.futures import ThreadPoolExecutor
     from .services.prediction_service import PredictionService
+    from .services.metrics_store import KeywordMetricsStore
     
     keyword = request.GET.get('keyword', '').strip()
     if not keyword:
         return render(request, 'wizard/partials/analysis_results_v2.html', {'error': 'Please enter a keyword.'})
     
     service = PredictionService()
-    data = service.fetch_trends_data(keyword)
-    
-    # Fetch related terms
-    related_terms_data = service.fetch_related_terms(keyword)
+    store = KeywordMetricsStore(service=service)
+    # Related terms are fetched while the metrics come from the local store
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        related_future = executor.submit(service.fetch_related_terms, keyword)
+        try:
+            data = store.get(keyword, refresh=request.GET.get('refresh') == '1')
+        except Exception as e:
+            print(f"Metrics error for '{keyword}': {e}")
+            data = None
+        related_terms_data = related_future.result()
     related_terms = []
     print(f"Related terms raw data for '{keyword}': {type(related_terms_data)} - {str(related_terms_data)[:200]}")
     if related_terms_data and isinstance(related_terms_data, list):
@@ -944,78 +995,86 @@ def fetch_analysis_data(request):
             })
         return render(request, 'wizard/partials/analysis_results_v2.html', {'error': 'Could not fetch data for this keyword. It might not be trending or API is unavailable.'})
         
-    # Process data for Chart.js
-    counts = data.get('counts', [])
-    
+    # Chart arrays are built in NumPy from the stored columns
     try:
-        sorted_data = sorted(counts, key=lambda x: x.get('date', ''))
-        
-        labels = []
-        historical_values = []
-        prediction_values = []
-        
-        from datetime import datetime
-        
-        last_history_idx = -1
-        
-        upper_bounds = []
-        lower_bounds = []
-
-        for i, point in enumerate(sorted_data):
-            date_str = point.get('date')
-            
-            val = point.get('normalizedCount')
-            if val is None:
-                val = point.get('count', 0)
-            
-            is_prediction = point.get('predictedUpperBoundNormalizedCount') is not None
-            
-            upper = point.get('predictedUpperBoundNormalizedCount')
-            lower = point.get('predictedLowerBoundNormalizedCount')
-            
-            if date_str:
-                try:
-                    dt = datetime.strptime(date_str, '%Y-%m-%d')
-                    labels.append(dt.strftime('%b %d, %Y'))
-                except:
-                    labels.append(date_str)
-            else:
-                labels.append('')
-
-            if is_prediction:
-                prediction_values.append(val)
-                historical_values.append(None)
-                upper_bounds.append(upper if upper is not None else val)
-                lower_bounds.append(lower if lower is not None else val)
-            else:
-                historical_values.append(val)
-                prediction_values.append(None)
-                upper_bounds.append(None)
-                lower_bounds.append(None)
-                last_history_idx = i
-        
-        # Connect the lines
-        if last_history_idx != -1 and last_history_idx + 1 < len(prediction_values):
-             prediction_values[last_history_idx] = historical_values[last_history_idx]
-             if len(upper_bounds) > last_history_idx:
-                 upper_bounds[last_history_idx] = historical_values[last_history_idx]
-                 lower_bounds[last_history_idx] = historical_values[last_history_idx]
+        series = store.to_chart(data)
+        labels = series['labels']
         
         import json
         return render(request, 'wizard/partials/analysis_results_v2.html', {
             'keyword': keyword,
             'display_title': keyword.title(),
             'labels': json.dumps(labels),
-            'history': json.dumps(historical_values),
-            'prediction': json.dumps(prediction_values),
-            'upper': json.dumps(upper_bounds),
-            'lower': json.dumps(lower_bounds),
-            'separation_index': last_history_idx if last_history_idx != -1 else -1,
+            'history': json.dumps(series['history']),
+            'prediction': json.dumps(series['prediction']),
+            'upper': json.dumps(series['upper']),
+            'lower': json.dumps(series['lower']),
+            'separation_index': series['separation_index'],
             'related_terms': json.dumps(related_terms),
         })
     except Exception as e:
         return render(request, 'wizard/partials/analysis_results_v2.html', {'error': f'Error processing data: {str(e)}'})
 
+# Upper bound on keywords per bulk analysis request
+BULK_ANALYSIS_LIMIT = 100
+
+def bulk_analysis_data(request):
+    """
+    Fetch trend curves for many keywords in one request.
+    
+    Keywords come from `keywords` (repeated or comma-separated) or from a
+    `project` with `source=trends|expanded`. Returns the small-multiples
+    partial, or the raw payload with `format=json`.
+    """
+    from .services.metrics_store import KeywordMetricsStore
+    
+    keywords = []
+    for value in request.GET.getlist('keywords'):
+        keywords.extend(k.strip() for k in value.split(',') if k.strip())
+    
+    project_id = request.GET.get('project')
+    source = request.GET.get('source', 'trends')
+    if not keywords and project_id:
+        if source == 'expanded':
+            qs = ExpandedKeyword.objects.filter(project_id=project_id, selected=True)
+        else:
+            qs = TrendKeyword.objects.filter(project_id=project_id)
+        keywords = list(qs.values_list('keyword', flat=True))
+    
+    keywords = list(dict.fromkeys(keywords))
+    omitted = max(0, len(keywords) - BULK_ANALYSIS_LIMIT)
+    keywords = keywords[:BULK_ANALYSIS_LIMIT]
+    if not keywords:
+        if request.GET.get('format') == 'json':
+            return JsonResponse({'error': 'No keywords given'}, status=400)
+        return render(request, 'wizard/partials/analysis_results_v2.html', {'error': 'No keywords to analyze.'})
+    
+    store = KeywordMetricsStore()
+    result = store.get_many(keywords, refresh=request.GET.get('refresh') == '1')
+    
+    # Fastest-growing first
+    growth = {k: store.growth(r) for k, r in result['records'].items()}
+    ranked = sorted(growth, key=lambda k: -growth[k]['month'])
+    payload = {
+        'keywords': keywords,
+        # JSON objects don't keep key order for integer-like keys; charts follow this list
+        'ranked': ranked,
+        'series': {k: store.to_chart(result['records'][k]) for k in ranked},
+        'growth': growth,
+        'errors': result['errors'],
+        'omitted': omitted,
+    }
+    
+    if request.GET.get('format') == 'json':
+        return JsonResponse(payload)
+    return render(request, 'wizard/partials/analysis_small_multiples.html', {
+        'payload': payload,
+        'cards': [{'keyword': k, 'growth': growth[k]} for k in ranked],
+        'keyword_count': len(keywords),
+        'error_count': len(payload['errors']),
+        'limit': BULK_ANALYSIS_LIMIT,
+    })
+
 def project_keywords_htmx(request):
     """HTMX endpoint to fetch keywords for a selected project."""
     project_id = request.GET.get('project')
@@ -1025,7 +1084,11 @@ def project_keywords_htmx(request):
     from .models import TrendKeyword
     keywords = TrendKeyword.objects.filter(project_id=project_id)
     
-    return render(request, 'wizard/partials/project_keywords.html', {'keywords': keywords})
+    return render(request, 'wizard/partials/project_keywords.html', {
+        'keywords': keywords,
+        'project_id': project_id,
+        'has_expanded': ExpandedKeyword.objects.filter(project_id=project_id, selected=True).exists(),
+    })
 
 
 
@@ -1049,6 +1112,14 @@ class BlogGenView(TemplateView):
             project=project
         ).prefetch_related('sections').order_by('-created_at')
         
+        # Unfinished bulk job, so its progress card keeps polling after a reload
+        context['blog_job'] = BlogGenerationJob.objects.filter(
+            project=project, status__in=('queued', 'running')
+        ).first()
+        if context['blog_job']:
+            from .services.blog_batch import BlogBatchService
+            context['blog_job_summary'] = BlogBatchService.summary(context['blog_job'])
+        
         context['active_sidebar'] = 'blog_gen'
         context['blog_count'] = context['blog_posts'].count()
         context['pin_count'] = PinIdea.objects.filter(project=project).count()
@@ -1062,144 +1133,149 @@ class BlogGenView(TemplateView):
         
         return redirect('wizard:blog_gen', project_id=project_id)
 
+def _blog_in_flight():
+    """Blogs queued or generating; a generating one gone quiet (crashed worker) may be restarted."""
+    from .services.blog_batch import stale_after
+    
+    return Q(generation_status='pending') | Q(
+        generation_status='generating', updated_at__gte=timezone.now() - stale_after()
+    )
+
+def _start_blog_task(blog_post_id, bypass_cache=False, force_new_images=False):
+    """Enqueues wizard.tasks.generate_blog for an already queued blog."""
+    from django_q.tasks import async_task
+    
+    async_task('wizard.tasks.generate_blog', blog_post_id, bypass_cache, force_new_images,
+               task_name=f'blog-{blog_post_id}', group='blog-generation')
+
+def _enqueue_blog_generation(blog_post, bypass_cache=False, force_new_images=False) -> bool:
+    """
+    Marks the blog as queued and hands generation to the django_q cluster,
+    unless it is already queued or generating (a double click or repeated
+    regenerate), in which case nothing is enqueued. Returns whether it was.
+    """
+    # One conditional update, so two requests can't both claim the blog
+    claimed = BlogPost.objects.filter(pk=blog_post.pk).exclude(_blog_in_flight()).update(
+        generation_status='pending',
+        progress=0,
+        progress_message="Queued...",
+        error_message="",
+        updated_at=timezone.now()
+    )
+    if not claimed:
+        return False
+    _start_blog_task(blog_post.id, bypass_cache, force_new_images)
+    return True
+
 def generate_blog_htmx(request, article_id):
-    """HTMX endpoint - Generate a complete blog from an article idea."""
-    from django.core.files.base import ContentFile
-    from .services.blog_generator import BlogGeneratorService
+    """HTMX endpoint - Queue generation of a complete blog from an article idea."""
     import json as json_module
-    import traceback
     
     article = get_object_or_404(ArticleIdea, pk=article_id)
-    from django.views.decorators.http import require_POST
     project = article.project
     
-    # Create blog post record
-    blog_post = BlogPost.objects.create(
-        project=project,
-        article_idea=article,
-        topic=article.title,
-        intro="",
-        conclusion="",
-        generation_status='generating'
-    )
-    
-    try:
-        generator = BlogGeneratorService()
-        
-        # Step 1: Generate blog content
-        print(f"Generating blog content for: {article.title}")
-        blog_content = generator.generate_blog_content(article.title)
-        
-        # Step 2: Parse content
-        intro, items, conclusion = generator.parse_blog_content(blog_content)
-        
-        if not items:
-            raise Exception("No blog sections generated")
-        
-        # Update blog post with text content
-        blog_post.intro = intro
-        blog_post.conclusion = conclusion
-        blog_post.save()
-        
-        # Step 3: Generate image prompts
-        print("Generating image prompts...")
-        thumbnail_prompt = generator.generate_image_prompt(
-            title=article.title,
-            description=intro,
-            prompt_type="thumbnail"
-        )
-        
-        blog_post.thumbnail_prompt = thumbnail_prompt
-        blog_post.save()
-        
-        item_prompts = {}
-        for i, item in enumerate(items):
-            prompt = generator.generate_image_prompt(
-                title=item['title'],
-                description=item['description'],
-                prompt_type="image",
-                blog_topic=article.title
-            )
-            item_prompts[f'item_{i}'] = prompt
-        
-        # Step 4: Generate all images in parallel
-        print("Generating images in parallel...")
-        all_prompts = {'thumbnail': thumbnail_prompt}
-        all_prompts.update(item_prompts)
-        
-        images = generator.generate_all_images_parallel(all_prompts)
-        
-        # Update thumbnail URL
-        blog_post.thumbnail_url = images.get('thumbnail', '')
-        blog_post.save()
-        
-        # Step 5: Create blog sections with images
-        for i, item in enumerate(items):
-            BlogSection.objects.create(
-                blog_post=blog_post,
-                order=i + 1,
-                title=item['title'],
-                description=item['description'],
-                image_url=images.get(f'item_{i}', ''),
-                image_prompt=item_prompts.get(f'item_{i}', '')
+    with transaction.atomic():
+        # Serializes clicks on the same article; a blog already on its way is shown instead
+        ArticleIdea.objects.select_for_update().get(pk=article.pk)
+        blog_post = BlogPost.objects.filter(_blog_in_flight(), article_idea=article).order_by('-id').first()
+        if blog_post is None:
+            # Create blog post record
+            blog_post = BlogPost.objects.create(
+                project=project,
+                article_idea=article,
+                topic=article.title,
+                intro="",
+                conclusion="",
+                generation_status='pending',
+                progress_message="Queued..."
             )
-        
-        # Step 6: Generate export files
-        print("Generating export files...")
-        blog_data = {
-            'topic': blog_post.topic,
-            'intro': blog_post.intro,
-            'conclusion': blog_post.conclusion,
-            'thumbnail_url': blog_post.thumbnail_url,
-            'sections': [
-                {
-                    'title': section.title,
-                    'description': section.description,
-                    'image_url': section.image_url
-                }
-                for section in blog_post.sections.all()
-            ]
-        }
-        
-        # Generate JSON
-        json_data = generator.create_pinterest_json(blog_data)
-        blog_post.json_file.save(
-            f'blog_{blog_post.id}.json',
-            ContentFile(json_module.dumps(json_data, indent=2)),
-            save=False
-        )
-        
-        # Mark as completed
-        blog_post.generation_status = 'completed'
-        blog_post.save()
-        
-        print(f"✓ Blog generation completed for: {article.title}")
-        
-        # Return success partial with triggers to refresh stats and the article card
-        response = render(request, 'wizard/partials/blog_success.html', {
+            transaction.on_commit(lambda: _start_blog_task(blog_post.id))
+    blog_post.refresh_from_db()
+    
+    # Progress card polls blog_status_htmx until the task finishes
+    response = render(request, 'wizard/partials/blog_progress.html', {'blog_post': blog_post})
+    response['HX-Trigger'] = json_module.dumps({f"refreshArticle-{article.id}": ""})
+    return response
+
+def blog_status_htmx(request, blog_id):
+    """
+    Polled while a blog generates. Returns the progress card until the task
+    finishes, then the success card (or the error). ?format=json returns the
+    raw status instead.
+    """
+    import json as json_module
+    
+    blog_post = get_object_or_404(BlogPost.objects.select_related('article_idea'), pk=blog_id)
+    
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'id': blog_post.id,
+            'status': blog_post.generation_status,
+            'progress': blog_post.progress,
+            'message': blog_post.progress_message,
+            'sections': blog_post.sections.count(),
+            'error': blog_post.error_message,
+        })
+    
+    if blog_post.generation_status in ('pending', 'generating'):
+        return render(request, 'wizard/partials/blog_progress.html', {
             'blog_post': blog_post,
-            'project': project
+            'regenerate': request.GET.get('regenerate') == '1'
         })
-        
-        # Add HTMX triggers as JSON-serialized dict
-        triggers = {
-            "refreshStats": "",
-            f"refreshArticle-{article.id}": ""
-        }
-        response['HX-Trigger'] = json_module.dumps(triggers)
-        return response
-        
-    except Exception as e:
-        print(f"✗ Blog generation failed: {e}")
-        traceback.print_exc()
-        
-        blog_post.generation_status = 'failed'
-        blog_post.error_message = str(e)
-        blog_post.save()
-        
+    
+    if blog_post.generation_status == 'failed':
         return render(request, 'wizard/partials/error.html', {
-            'error': f'Blog generation failed: {str(e)}'
+            'error': f'Blog generation failed: {blog_post.error_message}'
         })
+    
+    response = render(request, 'wizard/partials/blog_success.html', {
+        'blog_post': blog_post,
+        'project': blog_post.project
+    })
+    response['HX-Trigger'] = json_module.dumps({
+        "refreshStats": "",
+        f"refreshArticle-{blog_post.article_idea_id}": ""
+    })
+    if request.GET.get('regenerate') == '1':
+        # Render toast notification (OOB swap)
+        toast = render(request, 'wizard/partials/toast_success.html')
+        response.content = response.content + toast.content
+    return response
+
+@require_POST
+def bulk_generate_blogs_htmx(request, project_id):
+    """HTMX endpoint - Start (or resume) generating blogs for every article idea of a project."""
+    from .services.blog_batch import BlogBatchService
+    
+    project = get_object_or_404(Project, pk=project_id)
+    job = BlogBatchService(project).start()
+    return render(request, 'wizard/partials/blog_bulk_progress.html', {
+        'job': job,
+        'summary': BlogBatchService.summary(job)
+    })
+
+def bulk_blog_status_htmx(request, job_id):
+    """
+    Polled while a bulk blog job runs; returns the aggregate progress card
+    (or ?format=json). Also advances the job, so one interrupted by a worker
+    crash carries on.
+    """
+    import json as json_module
+    from .services.blog_batch import BlogBatchService
+    
+    job = get_object_or_404(BlogGenerationJob.objects.select_related('project'), pk=job_id)
+    if job.status in ('queued', 'running'):
+        BlogBatchService(job.project).advance(job.id)
+        job.refresh_from_db()
+    summary = BlogBatchService.summary(job)
+    
+    if request.GET.get('format') == 'json':
+        return JsonResponse(summary)
+    
+    response = render(request, 'wizard/partials/blog_bulk_progress.html', {'job': job, 'summary': summary})
+    if job.status not in ('queued', 'running'):
+        response['HX-Trigger'] = json_module.dumps({"refreshStats": ""})
+    return response
 
 def blog_detail_htmx(request, blog_id):
     """HTMX endpoint - Show blog preview."""
@@ -1226,143 +1302,19 @@ def toggle_blog_selection_htmx(request, blog_id):
     })
 
 def regenerate_blog_htmx(request, blog_id):
-    """HTMX endpoint - Regenerate a blog post with new AI content."""
-    from django.core.files.base import ContentFile
-    from .services.blog_generator import BlogGeneratorService
-    import json as json_module
-    import traceback
-    
+    """HTMX endpoint - Queue regeneration of a blog post with new AI content."""
     blog_post = get_object_or_404(BlogPost, pk=blog_id)
-    project = blog_post.project
-    article = blog_post.article_idea
-    
-    # Delete old sections
-    blog_post.sections.all().delete()
     
-    # Reset blog post
-    blog_post.intro = ""
-    blog_post.conclusion = ""
-    blog_post.thumbnail_url = ""
-    blog_post.thumbnail_prompt = ""
-    blog_post.generation_status = 'generating'
-    blog_post.error_message = ""
-    blog_post.save()
+    # A deliberate regeneration should not get the cached content back; images
+    # are only reused for identical prompts, unless new ones were asked for.
+    # A blog already queued or generating just keeps going.
+    _enqueue_blog_generation(blog_post, bypass_cache=True, force_new_images=request.POST.get('new_images') == '1')
+    blog_post.refresh_from_db()
     
-    try:
-        generator = BlogGeneratorService()
-        
-        # Step 1: Generate blog content
-        print(f"Regenerating blog content for: {article.title}")
-        blog_content = generator.generate_blog_content(article.title)
-        
-        # Step 2: Parse content
-        intro, items, conclusion = generator.parse_blog_content(blog_content)
-        
-        if not items:
-            raise Exception("No blog sections generated")
-        
-        # Update blog post with text content
-        blog_post.intro = intro
-        blog_post.conclusion = conclusion
-        blog_post.save()
-        
-        # Step 3: Generate image prompts
-        print("Generating image prompts...")
-        thumbnail_prompt = generator.generate_image_prompt(
-            title=article.title,
-            description=intro,
-            prompt_type="thumbnail"
-        )
-        
-        blog_post.thumbnail_prompt = thumbnail_prompt
-        blog_post.save()
-        
-        item_prompts = {}
-        for i, item in enumerate(items):
-            prompt = generator.generate_image_prompt(
-                title=item['title'],
-                description=item['description'],
-                prompt_type="image",
-                blog_topic=article.title
-            )
-            item_prompts[f'item_{i}'] = prompt
-        
-        # Step 4: Generate all images in parallel
-        print("Generating images in parallel...")
-        all_prompts = {'thumbnail': thumbnail_prompt}
-        all_prompts.update(item_prompts)
-        
-        images = generator.generate_all_images_parallel(all_prompts)
-        
-        # Update thumbnail URL
-        blog_post.thumbnail_url = images.get('thumbnail', '')
-        blog_post.save()
-        
-        # Step 5: Create blog sections with images
-        for i, item in enumerate(items):
-            BlogSection.objects.create(
-                blog_post=blog_post,
-                order=i + 1,
-                title=item['title'],
-                description=item['description'],
-                image_url=images.get(f'item_{i}', ''),
-                image_prompt=item_prompts.get(f'item_{i}', '')
-            )
-        
-        # Step 6: Generate export files
-        print("Generating export files...")
-        blog_data = {
-            'topic': blog_post.topic,
-            'intro': blog_post.intro,
-            'conclusion': blog_post.conclusion,
-            'thumbnail_url': blog_post.thumbnail_url,
-            'sections': [
-                {
-                    'title': section.title,
-                    'description': section.description,
-                    'image_url': section.image_url
-                }
-                for section in blog_post.sections.all()
-            ]
-        }
-        
-        # Generate JSON
-        json_data = generator.create_pinterest_json(blog_data)
-        blog_post.json_file.save(
-            f'blog_{blog_post.id}.json',
-            ContentFile(json_module.dumps(json_data, indent=2)),
-            save=False
-        )
-        
-        # Mark as completed
-        blog_post.generation_status = 'completed'
-        blog_post.save()
-        
-        print(f"✓ Blog regeneration completed for: {article.title}")
-        
-        # Render success content
-        response = render(request, 'wizard/partials/blog_success.html', {
-            'blog_post': blog_post,
-            'project': project
-        })
-        
-        # Render toast notification (OOB swap)
-        toast = render(request, 'wizard/partials/toast_success.html')
-        
-        # Combine responses
-        return HttpResponse(response.content + toast.content)
-        
-    except Exception as e:
-        print(f"✗ Blog regeneration failed: {e}")
-        traceback.print_exc()
-        
-        blog_post.generation_status = 'failed'
-        blog_post.error_message = str(e)
-        blog_post.save()
-        
-        return render(request, 'wizard/partials/error.html', {
-            'error': f'Blog regeneration failed: {str(e)}'
-        })
+    return render(request, 'wizard/partials/blog_progress.html', {
+        'blog_post': blog_post,
+        'regenerate': True
+    })
 
 def blog_edit(request, blog_id):
     """Full page endpoint - Show blog edit form."""
@@ -1477,35 +1429,40 @@ def blog_update(request, blog_id):
     return HttpResponse(status=400)
 
 
+def _blog_export_data(blog_post, generator=None):
+    """The blog's Pinterest JSON: the stored structured_content, or built from its sections."""
+    from .services.blog_generator import BlogGeneratorService
+    
+    # Use stored structured_content if available
+    if blog_post.structured_content:
+        return blog_post.structured_content
+    
+    # Fallback re-generation (shouldn't be needed after migration)
+    generator = generator or BlogGeneratorService()
+    blog_data = {
+        'topic': blog_post.topic,
+        'intro': blog_post.intro,
+        'conclusion': blog_post.conclusion,
+        'thumbnail_url': blog_post.thumbnail_url,
+        'sections': [
+            {
+                'title': section.title,
+                'description': section.description,
+                'image_url': section.image_url
+            }
+            for section in blog_post.sections.all()
+        ]
+    }
+    return generator.create_pinterest_json(blog_data)
+
 def export_blog_json(request, blog_id):
     """Download blog as Pinterest JSON (Generated on-demand)."""
     import json as json_module
-    from .services.blog_generator import BlogGeneratorService
     
     blog_post = get_object_or_404(BlogPost, pk=blog_id)
     
     try:
-        # Use stored structured_content if available
-        if blog_post.structured_content:
-            json_data = blog_post.structured_content
-        else:
-            # Fallback re-generation (shouldn't be needed after migration)
-            generator = BlogGeneratorService()
-            blog_data = {
-                'topic': blog_post.topic,
-                'intro': blog_post.intro,
-                'conclusion': blog_post.conclusion,
-                'thumbnail_url': blog_post.thumbnail_url,
-                'sections': [
-                    {
-                        'title': section.title,
-                        'description': section.description,
-                        'image_url': section.image_url
-                    }
-                    for section in blog_post.sections.all()
-                ]
-            }
-            json_data = generator.create_pinterest_json(blog_data)
+        json_data = _blog_export_data(blog_post)
         
         # Serve JSON directly
         response = HttpResponse(
@@ -1520,84 +1477,75 @@ def export_blog_json(request, blog_id):
         return HttpResponse(f"Error serving JSON: {str(e)}", status=500)
 
 
+def _absolute_image_url(request, url):
+    """Stored image URLs may be local (/media/...); downloads need them absolute."""
+    if url and url.startswith('/') and not url.startswith('//'):
+        return request.build_absolute_uri(url)
+    return url
+
+def _zip_response(zip_stream, filename):
+    response = StreamingHttpResponse(zip_stream, content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['X-Content-Type-Options'] = 'nosniff'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 def download_blog_images(request, blog_id):
-    """Gathers all section images in parallel with connection pooling and profiling."""
-    from concurrent.futures import ThreadPoolExecutor
-    from django.http import StreamingHttpResponse
-    import time
-    
-    start_time = time.time()
-    print(f"\n🚀 DOWNLOAD START: Blog {blog_id}")
+    """Streams a ZIP of the blog's section images, each entry sent as soon as its download finishes."""
+    from .services.zip_stream import ZipStream
     
     blog_post = get_object_or_404(BlogPost, pk=blog_id)
-    sections = blog_post.sections.all()
+    sections = [section for section in blog_post.sections.all() if section.image_url]
     
     if not sections:
         return HttpResponse("No images found in this blog.", status=404)
-        
-    session = requests.Session()
-    # Adapter for more retries/connections if needed
-    adapter = requests.adapters.HTTPAdapter(pool_connections=20, pool_maxsize=20)
-    session.mount('http://', adapter)
-    session.mount('https://', adapter)
-
-    def download_image(section):
-        if not section.image_url:
-            return None
-        img_start = time.time()
-        try:
-            url = section.image_url
-            if url.startswith('/') and not url.startswith('//'):
-                url = request.build_absolute_uri(url)
-            
-            print(f"  [~] Worker starting: {url[:60]}...")
-            
-            # Using session for connection reuse
-            response = session.get(url, timeout=12, stream=True)
-            if response.status_code == 200:
-                content = response.content # Fully download
-                content_type = response.headers.get('Content-Type', '').lower()
-                ext = ".png"
-                if 'jpeg' in content_type or 'jpg' in content_type:
-                    ext = ".jpg"
-                elif 'webp' in content_type:
-                    ext = ".webp"
-                
-                filename = f"section_{section.order}{ext}"
-                elapsed = time.time() - img_start
-                print(f"  [✓] Worker finished: {filename} ({len(content)} bytes) - {elapsed:.2f}s")
-                return filename, content
-            else:
-                print(f"  [✗] Worker failed: {url} (Status: {response.status_code})")
-        except Exception as e:
-            print(f"  [!] Worker error: {section.image_url} - {str(e)}")
-        return None
-
-    zip_buffer = io.BytesIO()
     
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_STORED) as zip_file:
-        # Increase workers to handle more concurrent external requests
-        with ThreadPoolExecutor(max_workers=12) as executor:
-            valid_sections = [s for s in sections if s.image_url]
-            results = list(executor.map(download_image, valid_sections))
-            
-            for result in results:
-                if result:
-                    filename, content = result
-                    zip_file.writestr(filename, content)
-                    
-    total_duration = time.time() - start_time
-    zip_size = zip_buffer.tell()
-    print(f"🏁 DOWNLOAD READY: Blog {blog_id} (Total: {total_duration:.2f}s, Size: {zip_size/1024/1024:.2f} MB)")
-    
-    if zip_size == 0:
-        return HttpResponse("Could not download any images. They might have expired or be temporarily unavailable.", status=400)
-        
-    zip_buffer.seek(0)
-    response = StreamingHttpResponse(zip_buffer, content_type='application/zip')
-    response['Content-Disposition'] = f'attachment; filename="blog_{blog_id}_images.zip"'
-    response['X-Content-Type-Options'] = 'nosniff'
-    return response
+    print(f"\n🚀 DOWNLOAD START: Blog {blog_id} ({len(sections)} images)")
+    zip_stream = ZipStream()
+    for section in sections:
+        zip_stream.add_image(f"section_{section.order}", _absolute_image_url(request, section.image_url))
+    return _zip_response(zip_stream, f"blog_{blog_id}_images.zip")
+
+def export_project_zip(request, project_id):
+    """
+    Streams one ZIP with everything for a project: the content CSV/JSON,
+    each completed blog's JSON with its thumbnail and section images, and
+    every pin image.
+    """
+    import csv
+    from .services.blog_generator import BlogGeneratorService
+    from .services.zip_stream import ZipStream
+    
+    project = get_object_or_404(Project, pk=project_id)
+    zip_stream = ZipStream()
+    generator = None
+    
+    data = _project_content_data(project)
+    zip_stream.add_file('content.json', json.dumps(data, indent=2))
+    csv_buffer = io.StringIO()
+    _write_content_csv(csv.writer(csv_buffer), project)
+    zip_stream.add_file('content.csv', csv_buffer.getvalue())
+    
+    blogs = BlogPost.objects.filter(project=project, generation_status='completed').prefetch_related('sections')
+    for blog_post in blogs:
+        if not blog_post.structured_content and generator is None:
+            generator = BlogGeneratorService()
+        folder = f"blogs/{blog_post.id}-{blog_post.slug}" if blog_post.slug else f"blogs/{blog_post.id}"
+        zip_stream.add_file(f"{folder}/blog.json", json.dumps(_blog_export_data(blog_post, generator), indent=2))
+        zip_stream.add_image(f"{folder}/thumbnail", _absolute_image_url(request, blog_post.thumbnail_url))
+        for section in blog_post.sections.all():
+            zip_stream.add_image(f"{folder}/section_{section.order}", _absolute_image_url(request, section.image_url))
+    
+    pins = PinIdea.objects.filter(project=project).exclude(image_url='').order_by('id')
+    zip_stream.add_file('pins/pins.json', json.dumps([
+        {'id': pin.id, 'title': pin.title, 'description': pin.description, 'image_url': pin.image_url}
+        for pin in pins
+    ], indent=2))
+    for pin in pins:
+        zip_stream.add_image(f"pins/pin_{pin.id}", _absolute_image_url(request, pin.image_url))
+    
+    print(f"\n🚀 EXPORT START: Project {project_id} ({len(zip_stream.images)} images)")
+    return _zip_response(zip_stream, f"{project.name}_export.zip")
 
 
 # ============= Blog Setup & Pin Setup =============
@@ -1847,6 +1795,7 @@ class PinSetupView(TemplateView):
 
 def generate_pin_images(request, project_id):
     """API endpoint - Generate images for selected pin ideas."""
+    from django_q.tasks import async_task
     from .services.blog_generator import BlogGeneratorService
     
     if request.method != 'POST':
@@ -1855,6 +1804,7 @@ def generate_pin_images(request, project_id):
     try:
         data = json.loads(request.body)
         pin_ids = data.get('pin_ids', [])
+        force_new = bool(data.get('force_new'))
     except (json.JSONDecodeError, KeyError):
         return JsonResponse({'success': False, 'error': 'Invalid request body'}, status=400)
     
@@ -1862,42 +1812,83 @@ def generate_pin_images(request, project_id):
         return JsonResponse({'success': False, 'error': 'No pins selected'}, status=400)
     
     project = get_object_or_404(Project, pk=project_id)
-    pins = PinIdea.objects.filter(id__in=pin_ids, project=project)
+    pins = {pin.id: pin for pin in PinIdea.objects.filter(id__in=pin_ids, project=project).select_related('expanded_keyword')}
     
-    if not pins.exists():
+    if not pins:
         return JsonResponse({'success': False, 'error': 'No matching pins found'}, status=404)
     
-    generator = BlogGeneratorService()
-    results = []
+    # Pins that already have images are being regenerated; skip cached prompts.
+    # Images are reused for identical prompts unless force_new is set.
+    generator = BlogGeneratorService(
+        bypass_cache=any(pin.image_url for pin in pins.values()),
+        force_new_images=force_new
+    )
+    jobs = [
+        {
+            'id': pin.id,
+            'title': pin.title,
+            'description': pin.description,
+            'topic': pin.expanded_keyword.keyword if pin.expanded_keyword else pin.title,
+        }
+        for pin in pins.values()
+    ]
+    
+    def stream():
+        # One JSON line per pin as it finishes, then a summary line. Images are
+        # saved to the pins by the Fal job layer, which also finishes any
+        # still pending when this gives up waiting.
+        generated, pending = 0, 0
+        image_urls = []
+        for result in generator.generate_pin_images_streamed(jobs, project=project):
+            if 'error' in result:
+                line = {'type': 'pin', 'id': result['id'], 'status': 'error', 'error': result['error']}
+            elif 'pending' in result:
+                pending += 1
+                line = {'type': 'pin', 'id': result['id'], 'status': 'pending', 'job_id': result['pending']}
+            else:
+                generated += 1
+                image_urls.append(result['image_url'])
+                line = {'type': 'pin', 'id': result['id'], 'status': 'success', 'image_url': result['image_url']}
+            yield json.dumps(line) + "\n"
+        if image_urls:
+            # Copy the new images off Fal's temporary URLs in the background
+            async_task('wizard.tasks.mirror_images', image_urls, group='image-mirror')
+        yield json.dumps({'type': 'done', 'success': True, 'generated': generated, 'pending': pending, 'total': len(jobs)}) + "\n"
+    
+    response = StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # don't let a proxy hold lines back
+    return response
+
+
+@csrf_exempt
+@require_POST
+def fal_webhook(request, job_id):
+    """Fal calls this when a queued image finishes; see services/fal_jobs.py."""
+    from django_q.tasks import async_task
+    from .models import ImageJob
+    from .services.fal_jobs import FalJobService, check_webhook_token
     
-    for pin in pins:
-        try:
-            # Generate image prompt
-            prompt = generator.generate_image_prompt(
-                title=pin.title,
-                description=pin.description,
-                prompt_type="pin",
-                blog_topic=pin.expanded_keyword.keyword if pin.expanded_keyword else pin.title
-            )
-            pin.image_prompt = prompt
-            
-            # Generate image
-            image_url = generator.generate_image(prompt, aspect_ratio="2:3")
-            pin.image_url = image_url
-            pin.save()
-            
-            results.append({'id': pin.id, 'status': 'success', 'image_url': image_url})
-        except Exception as e:
-            print(f"Error generating image for pin {pin.id}: {e}")
-            results.append({'id': pin.id, 'status': 'error', 'error': str(e)})
-    
-    success_count = sum(1 for r in results if r['status'] == 'success')
-    return JsonResponse({
-        'success': True,
-        'generated': success_count,
-        'total': len(results),
-        'results': results
-    })
+    if not check_webhook_token(job_id, request.GET.get('token')):
+        return JsonResponse({'error': 'Invalid token'}, status=403)
+    job = get_object_or_404(ImageJob, pk=job_id)
+    
+    try:
+        payload = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    
+    try:
+        job = FalJobService().handle_webhook(job, payload)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    if job.status == 'completed' and job.blog_post_id and job.blog_post.generation_status == 'completed':
+        # Arrived after the blog finished; the mirror also refreshes its JSON export
+        async_task('wizard.tasks.mirror_blog_images', job.blog_post_id, group='image-mirror')
+    elif job.status == 'completed':
+        async_task('wizard.tasks.mirror_images', [job.image_url], group='image-mirror')
+    return JsonResponse({'status': job.status})
 
 
 def post_pins_pinterest(request, project_id):